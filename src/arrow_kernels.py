@@ -0,0 +1,126 @@
+"""
+Kernels Arrow (pyarrow.compute) da limpeza Silver.
+
+Usados por transformation.py com config.SILVER_ARROW_KERNELS ativo. As
+colunas de texto são convertidas para arrays Arrow sem passar por objetos
+Python (colunas string do pandas já são arrays Arrow) e:
+- normalize aplica utf8_upper / utf8_lower e utf8_trim_whitespace;
+- map_values traduz valores por um dicionário com index_in + take;
+- duplicated marca linhas repetidas a partir dos códigos de
+  dictionary_encode de cada coluna, combinados coluna a coluna. Linhas cuja
+  combinação das colunas já lidas é única não podem se repetir e deixam de
+  ser lidas: com uma coluna de ID, as colunas seguintes só são lidas nas
+  (poucas) linhas candidatas, e nenhuma se não houver repetições.
+
+O resultado é o mesmo de .str.upper().str.strip(), .map(dicionário) e
+DataFrame.duplicated() (primeira ocorrência mantida, nulos iguais entre
+si). Colunas que o Arrow não converte (ex.: objetos de tipos misturados)
+seguem pelo pandas.
+"""
+
+from typing import Dict
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+
+_ARROW_ERRORS = (pa.ArrowInvalid, pa.ArrowTypeError, pa.ArrowNotImplementedError)
+
+
+def _to_series(values, like: pd.Series) -> pd.Series:
+    result = values.to_pandas()
+    result.index = like.index
+    result.name = like.name
+    return result.astype(like.dtype, copy=False)
+
+
+def normalize(series: pd.Series, case: str) -> pd.Series:
+    """
+    Caixa alta ("upper") ou baixa ("lower") e espaços das pontas removidos.
+    """
+    if not pd.api.types.is_string_dtype(series):
+        return _normalize_pandas(series, case)
+    try:
+        values = pa.array(series, from_pandas=True)
+        values = pc.utf8_upper(values) if case == "upper" else pc.utf8_lower(values)
+        return _to_series(pc.utf8_trim_whitespace(values), series)
+    except _ARROW_ERRORS:
+        return _normalize_pandas(series, case)
+
+
+def _normalize_pandas(series: pd.Series, case: str) -> pd.Series:
+    series = series.str.upper() if case == "upper" else series.str.lower()
+    return series.str.strip()
+
+
+def map_values(series: pd.Series, mapping: Dict[str, str]) -> pd.Series:
+    """
+    Equivalente a series.map(mapping) (valores fora do dicionário viram nulos).
+    Colunas object seguem pelo pandas, que infere o tipo do resultado.
+    """
+    if not isinstance(series.dtype, pd.StringDtype):
+        return series.map(mapping)
+    try:
+        values = pa.array(series, from_pandas=True)
+        positions = pc.index_in(values, value_set=pa.array(list(mapping), type=values.type))
+        return _to_series(pa.array(list(mapping.values())).take(positions), series)
+    except _ARROW_ERRORS:
+        return series.map(mapping)
+
+
+def _dense_codes(values) -> tuple:
+    """
+    Códigos 0..k-1 na ordem da primeira ocorrência (nulos formam um valor).
+    """
+    encoded = pc.dictionary_encode(values, null_encoding="encode")
+    if isinstance(encoded, pa.ChunkedArray):
+        encoded = encoded.combine_chunks()
+    codes = encoded.indices.to_numpy(zero_copy_only=False).astype(np.int64, copy=False)
+    return codes, len(encoded.dictionary)
+
+
+def duplicated(df: pd.DataFrame) -> pd.Series:
+    """
+    Equivalente a df.duplicated(): True nas repetições de linhas inteiras.
+    """
+    n_rows = len(df)
+    if n_rows == 0 or df.shape[1] == 0:
+        return df.duplicated()
+    try:
+        # Linhas candidatas (posições em `df`) e o código da combinação das
+        # colunas já lidas em cada uma.
+        rows = np.arange(n_rows)
+        codes = np.zeros(n_rows, dtype=np.int64)
+        for i in range(df.shape[1]):
+            # Cada coluna é convertida só quando lida, e só nas candidatas.
+            values = df.iloc[:, i]
+            if len(rows) < n_rows:
+                values = values.iloc[rows]
+            column = pa.array(values, from_pandas=True)
+            if pa.types.is_floating(column.type):
+                # -0.0 + 0.0 == 0.0: o pandas trata os dois zeros como iguais.
+                column = pc.add(column, 0.0)
+            column_codes, size = _dense_codes(column)
+            # codes < n_rows e column_codes < size <= n_rows: o código
+            # combinado cabe em int64 e é recompactado a cada coluna.
+            codes, n_distinct = _dense_codes(pa.array(codes * size + column_codes))
+
+            # Linhas com código único não se repetem, quaisquer que sejam as
+            # colunas restantes: só as demais seguem para a próxima coluna.
+            repeats = np.bincount(codes, minlength=n_distinct)[codes] > 1
+            if not repeats.any():
+                return pd.Series(False, index=df.index)
+            if not repeats.all():
+                rows = rows[repeats]
+                codes, _ = _dense_codes(pa.array(codes[repeats]))
+    except _ARROW_ERRORS:
+        return df.duplicated()
+
+    # Os códigos seguem a ordem da primeira ocorrência: uma linha é repetição
+    # quando o seu código não é maior que todos os anteriores.
+    seen = np.maximum.accumulate(codes)
+    repeated = np.zeros(n_rows, dtype=bool)
+    repeated[rows[1:]] = codes[1:] <= seen[:-1]
+    return pd.Series(repeated, index=df.index)
@@ -0,0 +1,284 @@
+"""
+Benchmark das etapas do pipeline em várias escalas de dados sintéticos.
+
+Para cada escala, o dataset de synthetic.py é gerado (ou reaproveitado) em
+BENCHMARK_DIR/data/sf_<escala>_seed_<seed> e cada etapa roda, em ordem, em
+um processo novo apontado para esse diretório:
+- ingest         : ingestion.ingest_bronze()
+- transform      : transformation.transform_to_silver(load_bronze())
+- gold           : gold_metrics.build_gold_tables() (lê a Silver gravada)
+- visualizations : visualizations.generate_all_visualizations() (sem cache)
+
+Cada etapa registra o tempo de parede da chamada (a leitura das entradas
+fica de fora, exceto na gold, que lê a própria Silver), o pico de memória
+residente do processo, as linhas de entrada e linhas/s. Os registros são
+acrescentados a BENCHMARK_DIR/results.csv com o commit atual, para
+comparar versões com compare():
+
+    python -m src.benchmark --scales 1 10 --stages ingest transform gold
+    python -m src.benchmark --set GOLD_ENGINE='"duckdb"' --scales 10
+    python -m src.benchmark --compare a907af8 HEAD
+"""
+
+import argparse
+import contextlib
+import csv
+import json
+import os
+import platform
+import subprocess
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from multiprocessing import get_context
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence
+
+import pandas as pd
+
+from . import cli, config, metrics, synthetic
+
+
+STAGES = ["ingest", "transform", "gold", "visualizations"]
+
+RESULT_COLUMNS = [
+    "timestamp",
+    "commit",
+    "scale",
+    "seed",
+    "stage",
+    "rows",
+    "wall_s",
+    "peak_rss_mb",
+    "rows_per_s",
+    "overrides",
+    "python",
+    "pandas",
+]
+
+
+def results_path() -> Path:
+    return config.BENCHMARK_DIR / "results.csv"
+
+
+def dataset_dir(scale: float, seed: int) -> Path:
+    return config.BENCHMARK_DIR / "data" / f"sf_{scale:g}_seed_{seed}"
+
+
+def prepare_dataset(scale: float, seed: int) -> Dict[str, int]:
+    """
+    Gera o dataset sintético da escala, a menos que já exista.
+    Retorna as linhas de cada tabela.
+    """
+    path = dataset_dir(scale, seed)
+    summary = path / synthetic.SUMMARY_FILE
+    if summary.exists():
+        with open(summary, encoding="utf-8") as fh:
+            return json.load(fh)["rows"]
+    return synthetic.generate(path, scale, seed)
+
+
+def _silver_rows() -> int:
+    import pyarrow.parquet as pq
+
+    return sum(
+        pq.ParquetFile(config.SILVER_DIR / f"{table}_silver.parquet").metadata.num_rows
+        for table in ["customers", "orders", "order_items", "products"]
+    )
+
+
+def _gold_rows() -> int:
+    from . import visualizations
+
+    tables = {table for inputs, _ in visualizations.FIGURES.values() for table in inputs}
+    return sum(
+        len(pd.read_csv(config.GOLD_DIR / f"{table}.csv"))
+        for table in tables
+        if (config.GOLD_DIR / f"{table}.csv").exists()
+    )
+
+
+def _run_stage(stage: str, data_dir: Path, overrides: Dict[str, Any], raw_rows: int) -> dict:
+    """
+    Executa uma etapa no processo atual (um processo novo por etapa).
+    """
+    config.DATA_DIR = data_dir
+    config.BRONZE_DIR = data_dir / "bronze"
+    config.SILVER_DIR = data_dir / "silver"
+    config.GOLD_DIR = data_dir / "gold"
+    # Mede o trabalho completo, não os atalhos de reaproveitamento.
+    config.INCREMENTAL_INGESTION = False
+    config.FIGURE_CACHE = False
+    for name, value in overrides.items():
+        setattr(config, name, value)
+    config.ensure_dirs()
+
+    from . import gold_metrics, ingestion, layer_writer, transformation, visualizations
+
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        if stage == "ingest":
+            rows = raw_rows
+            start = time.perf_counter()
+            ingestion.ingest_bronze()
+        elif stage == "transform":
+            dfs_bronze = ingestion.load_bronze()
+            rows = sum(len(df) for df in dfs_bronze.values())
+            start = time.perf_counter()
+            transformation.transform_to_silver(dfs_bronze)
+        elif stage == "gold":
+            rows = _silver_rows()
+            start = time.perf_counter()
+            gold_metrics.build_gold_tables()
+        elif stage == "visualizations":
+            rows = _gold_rows()
+            start = time.perf_counter()
+            visualizations.generate_all_visualizations()
+        else:
+            raise ValueError(f"Etapa desconhecida: {stage!r} (use uma de {STAGES})")
+        # Com LAYER_WRITER, a etapa só termina quando a camada é publicada.
+        layer_writer.flush()
+        wall_s = time.perf_counter() - start
+
+    return {
+        "rows": rows,
+        "wall_s": round(wall_s, 4),
+        "peak_rss_mb": metrics.peak_rss_mb(),
+        "rows_per_s": round(rows / wall_s, 1) if wall_s > 0 else float("nan"),
+    }
+
+
+def _git_commit() -> str:
+    """
+    Commit atual (abreviado), com "+dirty" se src/ tiver alterações.
+    """
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=config.BASE_DIR, capture_output=True, text=True, check=True,
+        ).stdout.strip()
+        dirty = subprocess.run(
+            ["git", "status", "--porcelain", "--", "src"],
+            cwd=config.BASE_DIR, capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+    return f"{commit}+dirty" if dirty else commit
+
+
+def _append_results(records: List[dict]) -> None:
+    path = results_path()
+    path.parent.mkdir(parents=True, exist_ok=True)
+    new_file = not path.exists()
+    with open(path, "a", newline="", encoding="utf-8") as fh:
+        writer = csv.DictWriter(fh, fieldnames=RESULT_COLUMNS)
+        if new_file:
+            writer.writeheader()
+        writer.writerows(records)
+
+
+def run_benchmark(
+    scales: Optional[Sequence[float]] = None,
+    stages: Optional[Sequence[str]] = None,
+    seed: Optional[int] = None,
+    overrides: Optional[Dict[str, Any]] = None,
+) -> pd.DataFrame:
+    """
+    Roda as etapas em cada escala e acrescenta os resultados a results.csv.
+
+    `overrides` altera parâmetros de config nos processos das etapas
+    (ex.: {"GOLD_ENGINE": "duckdb"}). Etapas dependem das saídas das
+    anteriores já gravadas no diretório do dataset.
+    """
+    scales = scales or config.BENCHMARK_SCALES
+    stages = stages or STAGES
+    seed = config.BENCHMARK_SEED if seed is None else seed
+    overrides = overrides or {}
+
+    unknown = [stage for stage in stages if stage not in STAGES]
+    if unknown:
+        raise ValueError(f"Etapas desconhecidas: {unknown} (use {STAGES})")
+
+    commit = _git_commit()
+    records = []
+    for scale in scales:
+        raw_rows = sum(prepare_dataset(scale, seed).values())
+        data_dir = dataset_dir(scale, seed)
+        print(f"\n=== BENCHMARK scale={scale:g} ({raw_rows} linhas brutas) ===")
+        for stage in STAGES:
+            if stage not in stages:
+                continue
+            with ProcessPoolExecutor(max_workers=1, mp_context=get_context("spawn")) as pool:
+                result = pool.submit(_run_stage, stage, data_dir, overrides, raw_rows).result()
+            records.append(
+                {
+                    "timestamp": datetime.now().isoformat(timespec="seconds"),
+                    "commit": commit,
+                    "scale": scale,
+                    "seed": seed,
+                    "stage": stage,
+                    **result,
+                    "overrides": json.dumps(overrides, sort_keys=True) if overrides else "",
+                    "python": platform.python_version(),
+                    "pandas": pd.__version__,
+                }
+            )
+            print(
+                f"  {stage:<15}: {result['wall_s']:>9.2f}s  "
+                f"{result['peak_rss_mb']:>9.1f} MB  {result['rows_per_s']:>12.0f} linhas/s"
+            )
+
+    _append_results(records)
+    print(f"\nResultados acrescentados a {results_path()}")
+    return pd.DataFrame(records, columns=RESULT_COLUMNS)
+
+
+def load_results() -> pd.DataFrame:
+    return pd.read_csv(results_path(), dtype={"commit": str}, keep_default_na=False)
+
+
+def compare(commit_a: str, commit_b: str) -> pd.DataFrame:
+    """
+    Compara dois commits de results.csv: mediana de tempo e de memória por
+    escala, etapa e overrides, com a razão b / a (< 1: b mais rápido).
+    Aceita "HEAD" como o commit atual.
+    """
+    results = load_results()
+    commits = {}
+    for label, commit in (("a", commit_a), ("b", commit_b)):
+        commit = _git_commit() if commit == "HEAD" else commit
+        matches = results["commit"].str.startswith(commit)
+        if not matches.any():
+            raise ValueError(f"Commit {commit!r} não encontrado em {results_path()}")
+        commits[label] = results[matches]
+
+    keys = ["scale", "stage", "overrides"]
+    summary = [
+        df.groupby(keys)[["wall_s", "peak_rss_mb"]].median().add_suffix(f"_{label}")
+        for label, df in commits.items()
+    ]
+    table = summary[0].join(summary[1], how="inner")
+    table["wall_ratio"] = (table["wall_s_b"] / table["wall_s_a"]).round(3)
+    table["rss_ratio"] = (table["peak_rss_mb_b"] / table["peak_rss_mb_a"]).round(3)
+    return table.reset_index()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark das etapas do pipeline.")
+    parser.add_argument("--scales", type=float, nargs="+", default=None)
+    parser.add_argument("--stages", nargs="+", choices=STAGES, default=None)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument(
+        "--set", dest="overrides", action="append", default=[], metavar="NOME=VALOR",
+        help="altera um parâmetro de config (valor como literal Python)",
+    )
+    parser.add_argument("--compare", nargs=2, metavar=("COMMIT_A", "COMMIT_B"))
+    args = parser.parse_args()
+
+    if args.compare:
+        print(compare(*args.compare).to_string(index=False))
+        return
+    run_benchmark(args.scales, args.stages, args.seed, cli.parse_overrides(args.overrides))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+Linha de comando do pipeline.
+
+    python -m src                           # pipeline completo
+    python -m src gold viz                  # só as etapas listadas
+    python -m src --from silver             # silver, gold e viz
+    python -m src --from ingest --to gold   # sem as visualizações
+    python -m src gold --set GOLD_ENGINE='"duckdb"'
+
+Etapas: ingest, silver, gold e viz (pipeline.STAGES). Uma etapa executada
+sem a anterior lê a camada anterior já gravada (Bronze, Silver Parquet ou
+CSVs Gold). Os módulos do pipeline só são importados depois da leitura
+dos argumentos, e as dependências pesadas (matplotlib / seaborn, scipy,
+DuckDB) só pelas etapas que as usam.
+"""
+
+import argparse
+import ast
+from typing import Any, Dict, List, Optional, Sequence
+
+from . import config
+
+
+# Duplicado de pipeline.STAGES para não importar o pipeline no --help.
+STAGE_CHOICES = ["ingest", "silver", "gold", "viz"]
+
+
+def parse_overrides(items: Sequence[str]) -> Dict[str, Any]:
+    """
+    Converte "NOME=VALOR" (VALOR como literal Python) em {NOME: valor},
+    validando que NOME existe em config.
+    """
+    overrides = {}
+    for item in items:
+        name, _, value = item.partition("=")
+        if not hasattr(config, name):
+            raise ValueError(f"Parâmetro de config desconhecido: {name!r}")
+        overrides[name] = ast.literal_eval(value)
+    return overrides
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="python -m src",
+        description="Pipeline Olist (Bronze / Silver / Gold).",
+    )
+    parser.add_argument(
+        "stages", nargs="*", metavar="ETAPA",
+        help=f"etapas a executar ({', '.join(STAGE_CHOICES)}); padrão: todas",
+    )
+    parser.add_argument("--from", dest="first", choices=STAGE_CHOICES, help="primeira etapa")
+    parser.add_argument("--to", dest="last", choices=STAGE_CHOICES, help="última etapa")
+    parser.add_argument(
+        "--set", dest="overrides", action="append", default=[], metavar="NOME=VALOR",
+        help="altera um parâmetro de config (valor como literal Python)",
+    )
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    unknown = [stage for stage in args.stages if stage not in STAGE_CHOICES]
+    if unknown:
+        parser.error(f"etapas desconhecidas: {unknown} (use {', '.join(STAGE_CHOICES)})")
+    if args.stages and (args.first or args.last):
+        parser.error("use ETAPA ... ou --from / --to, não os dois")
+
+    try:
+        overrides = parse_overrides(args.overrides)
+    except (ValueError, SyntaxError) as e:
+        parser.error(str(e))
+    for name, value in overrides.items():
+        setattr(config, name, value)
+
+    from . import pipeline
+
+    try:
+        selected = pipeline.select_stages(args.stages, args.first, args.last)
+    except ValueError as e:
+        parser.error(str(e))
+    if selected == pipeline.STAGES:
+        pipeline.run_full_pipeline()
+    else:
+        pipeline.run_pipeline_stages(selected)
+
+
+if __name__ == "__main__":
+    main()
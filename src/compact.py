@@ -0,0 +1,144 @@
+"""
+Representação compacta dos DataFrames da camada Silver:
+- Colunas de baixa cardinalidade como `category`
+- Downcast de numéricos (inteiros sempre; floats só quando não há perda)
+- IDs hexadecimais como chaves substitutas int32, via dicionários
+  persistidos em SILVER_DIR/dictionaries/
+
+Os dicionários só crescem: um ID recebe sempre o mesmo código entre
+execuções. O código -1 representa ID ausente.
+"""
+
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from . import config
+
+
+CATEGORICAL_COLUMNS = [
+    "customer_state",
+    "customer_region",
+    "order_status",
+    "product_category_name",
+]
+
+ENCODED_KEYS = [
+    "order_id",
+    "customer_id",
+    "customer_unique_id",
+    "product_id",
+]
+
+
+def _dictionary_path(key: str) -> Path:
+    return config.SILVER_DIR / "dictionaries" / f"{key}.csv"
+
+
+def load_dictionary(key: str) -> pd.Index:
+    """
+    Dicionário persistido de uma chave: a posição de cada ID é o seu código.
+    """
+    path = _dictionary_path(key)
+    if not path.exists():
+        return pd.Index([], dtype=object)
+    return pd.Index(pd.read_csv(path, dtype={key: str})[key])
+
+
+def _update_dictionary(key: str, values: pd.Series) -> pd.Index:
+    dictionary = load_dictionary(key)
+    unique = pd.Index(values.dropna().unique())
+    new_values = unique[dictionary.get_indexer(unique) == -1]
+    if len(new_values) > 0:
+        dictionary = dictionary.append(new_values)
+        path = _dictionary_path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        pd.DataFrame({key: dictionary}).to_csv(path, index=False)
+    return dictionary
+
+
+def encode_keys(dfs: Dict[str, pd.DataFrame]) -> Dict[str, pd.DataFrame]:
+    """
+    Substitui os IDs hexadecimais por códigos int32.
+
+    Cada chave usa um único dicionário compartilhado entre as tabelas
+    (ex.: order_id em orders e order_items), preservando os joins.
+    """
+    dfs = dict(dfs)
+    for key in ENCODED_KEYS:
+        tables = [
+            name for name, df in dfs.items()
+            if key in df.columns and not pd.api.types.is_integer_dtype(df[key])
+        ]
+        if not tables:
+            continue
+        dictionary = _update_dictionary(
+            key, pd.concat([dfs[name][key] for name in tables], ignore_index=True)
+        )
+        for name in tables:
+            df = dfs[name].copy()
+            df[key] = dictionary.get_indexer(df[key]).astype(np.int32)
+            dfs[name] = df
+    return dfs
+
+
+def decode_keys(df: pd.DataFrame, sort_by: Optional[List[str]] = None) -> pd.DataFrame:
+    """
+    Converte de volta para os IDs originais as chaves codificadas presentes em `df`.
+
+    `sort_by` reordena o resultado pelas chaves decodificadas, reproduzindo a
+    ordem que um groupby sobre os IDs originais teria produzido.
+    """
+    encoded = [
+        key for key in ENCODED_KEYS
+        if key in df.columns and pd.api.types.is_integer_dtype(df[key])
+    ]
+    if not encoded:
+        return df
+    df = df.copy()
+    for key in encoded:
+        dictionary = load_dictionary(key).to_numpy(dtype=object)
+        codes = df[key].to_numpy()
+        values = np.full(len(codes), np.nan, dtype=object)
+        valid = codes >= 0
+        values[valid] = dictionary[codes[valid]]
+        df[key] = values
+    if sort_by:
+        df = df.sort_values(sort_by).reset_index(drop=True)
+    return df
+
+
+def _downcast(series: pd.Series) -> pd.Series:
+    if pd.api.types.is_integer_dtype(series):
+        return pd.to_numeric(series, downcast="integer")
+    if pd.api.types.is_float_dtype(series):
+        narrow = series.astype(np.float32)
+        # Só reduz para float32 se os valores sobrevivem à ida e volta
+        # (evita alterar preços e somas monetárias).
+        if narrow.astype(series.dtype).equals(series):
+            return narrow
+    return series
+
+
+def compact_frame(df: pd.DataFrame) -> pd.DataFrame:
+    df = df.copy()
+    for col in df.columns:
+        if col in CATEGORICAL_COLUMNS:
+            df[col] = df[col].astype("category")
+        elif col not in ENCODED_KEYS:
+            df[col] = _downcast(df[col])
+    return df
+
+
+def compact_silver(dfs_silver: Dict[str, pd.DataFrame]) -> Dict[str, pd.DataFrame]:
+    """
+    Aplica a representação compacta a todas as tabelas Silver.
+    """
+    dfs = encode_keys(dfs_silver)
+    return {name: compact_frame(df) for name, df in dfs.items()}
+
+
+def memory_usage_mb(dfs: Dict[str, pd.DataFrame]) -> float:
+    return sum(df.memory_usage(deep=True).sum() for df in dfs.values()) / 1024**2
@@ -1,3 +1,4 @@
+import os
 from pathlib import Path
 
 BASE_DIR = Path(__file__).resolve().parents[1]
@@ -8,10 +9,190 @@ BRONZE_DIR = DATA_DIR / "bronze"
 SILVER_DIR = DATA_DIR / "silver"
 GOLD_DIR = DATA_DIR / "gold"
 
-for d in [DATA_DIR, BRONZE_DIR, SILVER_DIR, GOLD_DIR]:
-    d.mkdir(parents=True, exist_ok=True)
+
+def ensure_dirs() -> None:
+    """
+    Cria os diretórios das camadas. Chamado pelas etapas que gravam dados
+    (e não na importação), já que os diretórios podem ser redefinidos antes.
+    """
+    for d in [DATA_DIR, BRONZE_DIR, SILVER_DIR, GOLD_DIR]:
+        d.mkdir(parents=True, exist_ok=True)
+
 
 CUSTOMERS_FILE = "olist_customers_dataset.csv"
 ORDERS_FILE = "olist_orders_dataset.csv"
 ORDER_ITEMS_FILE = "olist_order_items_dataset.csv"
 PRODUCTS_FILE = "olist_products_dataset.csv"
+
+# Ingestão em streaming: lê cada fonte em blocos de INGESTION_CHUNK_SIZE
+# linhas e grava a Bronze bloco a bloco (memória de pico da ingestão
+# constante). A transformação lê da Bronze uma tabela inteira por vez.
+STREAMING_INGESTION = False
+INGESTION_CHUNK_SIZE = 100_000
+
+# Ingestão incremental: o manifesto da Bronze guarda tamanho, mtime e hash
+# de cada fonte; fontes inalteradas reaproveitam o arquivo Bronze existente.
+INCREMENTAL_INGESTION = True
+BRONZE_MANIFEST_FILE = "_manifest.json"
+
+# Formato de armazenamento da Bronze:
+#   "csv"      -> CSV regravado pelo pandas (padrão)
+#   "copy"     -> cópia byte a byte do arquivo bruto
+#   "hardlink" -> hardlink do arquivo bruto (cópia se não for possível)
+#   "parquet"  -> Parquet tipado
+#   "arrow"    -> Arrow IPC (Feather v2) tipado
+BRONZE_FORMAT = "csv"
+
+# Ingestão paralela: as fontes são lidas simultaneamente por um pool de
+# threads e cada CSV é analisado pelo leitor multithread do pyarrow.csv.
+# CSV_PARSE_THREADS = None mantém o pool de CPU padrão do pyarrow.
+PARALLEL_INGESTION = False
+INGESTION_WORKERS = min(4, os.cpu_count() or 1)
+CSV_PARSE_THREADS = None
+
+# Representação compacta da Silver repassada à Gold: categorias, downcast de
+# numéricos e IDs como chaves int32 (dicionários em SILVER_DIR/dictionaries).
+SILVER_COMPACT_DTYPES = False
+
+# Limpeza Silver com kernels Arrow (arrow_kernels.py): normalização de texto,
+# mapeamento de região e remoção de duplicados sem objetos Python, com a
+# mesma saída do caminho pandas. Sem pyarrow, usa o caminho pandas.
+SILVER_ARROW_KERNELS = False
+
+# Orçamento de memória (MB) da junção que monta a tabela fato no motor
+# pandas. Se a estimativa da junção em memória passar do orçamento, a fato
+# é montada por hash join particionado com spill em Parquet (spill.py), em
+# partições que cabem no orçamento, gravadas em FACT_SPILL_DIR (None:
+# diretório temporário do sistema). None: junção sempre em memória.
+FACT_JOIN_MEMORY_MB = None
+FACT_SPILL_DIR = None
+
+# Gold incremental: agregados parciais por year_month em GOLD_DIR/partials;
+# apenas as partições novas ou alteradas são recalculadas a cada execução.
+INCREMENTAL_GOLD = False
+
+# Contagens distintas (pedidos / clientes) nas tabelas de recomendação:
+#   "exact" -> nunique
+#   "hll"   -> HyperLogLog com 2**HLL_PRECISION registradores (combinável)
+# HLL_VALIDATION_SAMPLE grupos são comparados com a contagem exata.
+DISTINCT_COUNT_MODE = "exact"
+HLL_PRECISION = 12
+HLL_VALIDATION_SAMPLE = 1000
+
+# Cubo OLAP (cube.py): região x estado x categoria x status x mês de compra,
+# com dimensões codificadas como inteiros, medidas aditivas e sketches HLL
+# (precisão HLL_PRECISION), gravado em GOLD_DIR/cube e consultado com
+# OlapCube.query. Com OLAP_CUBE, a Gold (motor pandas) constrói o cubo e
+# publica a partir dele os pedidos por mês, a distribuição por status e o
+# ticket médio por região (receita somada em centavos).
+OLAP_CUBE = False
+
+# Motor de cálculo da Gold: "pandas" (padrão) ou "duckdb" (embarcado,
+# multithread, lê a Silver em Parquet). GOLD_ENGINE_THREADS = None usa
+# todos os núcleos disponíveis.
+GOLD_ENGINE = "pandas"
+GOLD_ENGINE_THREADS = None
+
+# Agregação paralela (sharding.py) das tabelas de recomendação no motor
+# pandas com contagem exata: a fato é particionada por hash da chave de
+# agrupamento em GOLD_WORKERS shards, trocados com o pool de processos como
+# arquivos Arrow IPC em GOLD_SHARD_DIR (None: diretório temporário do
+# sistema; "/dev/shm" mantém os shards em memória compartilhada no Linux).
+PARALLEL_GOLD = False
+GOLD_WORKERS = min(4, os.cpu_count() or 1)
+GOLD_SHARD_DIR = None
+
+# Visualizações: figuras geradas a partir das tabelas Gold persistidas, em
+# um pool de processos (backend Agg). Com FIGURE_CACHE, uma figura só é
+# redesenhada quando o hash das suas tabelas de entrada muda.
+VISUALIZATION_WORKERS = min(4, os.cpu_count() or 1)
+FIGURE_CACHE = True
+
+# Execução do pipeline como DAG de etapas (stages.py / dag.py): etapas
+# independentes rodam em paralelo e etapas cujas entradas não mudaram são
+# puladas, com as saídas lidas do cache em DATA_DIR/cache.
+DAG_PIPELINE = False
+DAG_WORKERS = min(4, os.cpu_count() or 1)
+
+# Silver particionada (estilo hive) em SILVER_DIR/partitioned/<tabela>/,
+# lida com pushdown de filtros e colunas por silver_store.read_silver.
+SILVER_PARTITIONED = False
+SILVER_PARTITION_BY = {
+    "orders": "year_month",
+    "order_items": "year_month",
+    "customers": "customer_state",
+}
+
+# Recomendação item-item (recommendation.py): vizinhos mantidos por
+# produto, tamanho da lista por cliente e clientes pontuados por lote.
+# GOLD_RECOMMENDATIONS grava gold_item_similarity.csv e
+# gold_customer_recommendations.csv ao final da Gold.
+GOLD_RECOMMENDATIONS = False
+RECO_NEIGHBORS = 50
+RECO_TOP_K = 10
+RECO_BATCH_SIZE = 5000
+
+# Índice de consulta pontual da Gold (lookup.py) em GOLD_DIR/index, com
+# cache LRU de LOOKUP_CACHE_SIZE chaves por tabela. GOLD_LOOKUP_INDEX
+# reconstrói os índices desatualizados ao final do pipeline.
+GOLD_LOOKUP_INDEX = False
+LOOKUP_CACHE_SIZE = 10_000
+
+# Benchmark das etapas (benchmark.py) sobre dados sintéticos (synthetic.py):
+# datasets em BENCHMARK_DIR/data/sf_<escala>_seed_<seed> (reaproveitados) e
+# resultados acumulados em BENCHMARK_DIR/results.csv, um registro por
+# etapa, escala e commit.
+BENCHMARK_DIR = BASE_DIR / "benchmarks"
+BENCHMARK_SCALES = [1, 10]
+BENCHMARK_SEED = 42
+
+# Métricas por etapa (metrics.py): tempo de parede e de CPU, pico de memória,
+# linhas de entrada / saída e bytes gravados de cada etapa e métrica Gold,
+# gravadas em GOLD_DIR/RUN_REPORT_FILE ao final de cada execução.
+# PROFILER: None, "cprofile" (GOLD_DIR/profiles/<etapa>.prof) ou
+# "tracemalloc" (pico de alocações e PROFILE_TOP_ALLOCATIONS maiores pontos
+# de alocação). PROFILE_STAGES restringe o profiling a algumas etapas
+# (ex.: ["gold", "silver"]); None perfila todas.
+RUN_REPORT_FILE = "run_report.json"
+PROFILER = None
+PROFILE_STAGES = None
+PROFILE_TOP_ALLOCATIONS = 15
+
+# Validação de qualidade da Silver (quality.py) com as regras declaradas em
+# cada DataSource; relatório em SILVER_DIR/QUALITY_REPORT_FILE.
+# QUALITY_SAMPLE_ROWS avalia só uma amostra fixa das tabelas maiores que o
+# limite (None: todas as linhas). QUALITY_FAIL_ON_ERROR interrompe o
+# pipeline quando uma regra de severidade "error" falha.
+QUALITY_CHECKS = True
+QUALITY_SAMPLE_ROWS = None
+QUALITY_SAMPLE_SEED = 0
+QUALITY_FAIL_ON_ERROR = False
+QUALITY_REPORT_FILE = "quality_report.csv"
+
+# Micro-batch (microbatch.py): arquivos <tabela>*.csv de pedidos e itens
+# colocados em INBOX_DIR são acrescentados à Bronze e à Silver (só as linhas
+# novas, sem chaves já existentes) e os meses afetados da Gold são
+# recalculados. MICROBATCH_KEYS define as tabelas aceitas, na ordem de
+# processamento, e as colunas-chave usadas na deduplicação.
+INBOX_DIR = DATA_DIR / "inbox"
+MICROBATCH_INTERVAL_SECONDS = 60
+MICROBATCH_KEYS = {
+    "orders": ["order_id"],
+    "order_items": ["order_id", "order_item_id"],
+}
+
+# Gravação das camadas (layer_writer.py) no pipeline sequencial: com
+# LAYER_WRITER, os arquivos Bronze, Silver e Gold são serializados em um
+# pool de LAYER_WRITER_THREADS threads enquanto a etapa seguinte calcula, e
+# cada camada é publicada atomicamente (temporários renomeados quando todos
+# os arquivos da camada terminam), com o marcador LAYER_MARKER_FILE gravado
+# por último. Sem o marcador, a camada está incompleta.
+# PARQUET_COMPRESSION / PARQUET_ROW_GROUP_SIZE (None: padrão do pyarrow) e
+# ARROW_COMPRESSION ("lz4", "zstd" ou None) valem para os arquivos Parquet
+# e Arrow IPC das camadas gravados pelo pandas / pyarrow.
+LAYER_WRITER = False
+LAYER_WRITER_THREADS = min(4, os.cpu_count() or 1)
+LAYER_MARKER_FILE = "_SUCCESS"
+PARQUET_COMPRESSION = "snappy"
+PARQUET_ROW_GROUP_SIZE = None
+ARROW_COMPRESSION = None
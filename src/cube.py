@@ -0,0 +1,374 @@
+"""
+Cubo OLAP pré-agregado da Gold: região x estado x categoria x status x mês
+de compra (year_month).
+
+build_cube percorre a tabela fato e os pedidos uma única vez e guarda
+células com as dimensões codificadas como inteiros (código -1: valor
+ausente; dicionários em GOLD_DIR/cube/dimensions.json), em dois grãos:
+- orders : região, estado, status e mês de cada pedido da Silver (inclusive
+           pedidos sem itens). Medidas: orders, item_orders (pedidos com
+           itens na fato), items e revenue_cents
+- items  : as cinco dimensões. Medidas: item_orders (pedidos distintos com
+           itens da categoria), items e revenue_cents
+Para as contagens distintas que não se somam entre células, cada célula
+tem um sketch HLL (sketches.py, precisão HLL_PRECISION): clientes
+(customer_unique_id) nos dois grãos e pedidos no grão items.
+
+Um pedido tem uma única região, estado, status e mês, então as contagens de
+pedidos somam entre células, exceto entre categorias diferentes (um pedido
+pode ter itens de várias). OlapCube.query usa o grão orders quando a
+consulta não envolve a categoria (tudo exato); com a categoria em `by` ou
+uma única categoria em `where`, item_orders é a soma exata do grão items;
+com várias categorias em `where` e fora de `by`, item_orders vem da união
+dos sketches (aproximado). customers vem sempre dos sketches. Receitas são
+somadas em centavos inteiros.
+
+    cube = OlapCube.load()
+    cube.query(by=["customer_region"], where={"order_status": "delivered"})
+    cube.query(by=["year_month", "product_category_name"],
+               where={"customer_state": ["SP", "RJ"]}, measures=["revenue"])
+
+Com config.OLAP_CUBE, build_gold_tables constrói o cubo e publica a partir
+dele gold_orders_by_month, gold_order_status_distribution e
+gold_avg_ticket_by_region.
+"""
+
+import json
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from . import config, derived, sketches
+
+
+DIMENSIONS = [
+    "customer_region",
+    "customer_state",
+    "product_category_name",
+    "order_status",
+    "year_month",
+]
+ORDER_DIMENSIONS = [d for d in DIMENSIONS if d != "product_category_name"]
+
+# Medidas de OlapCube.query, na ordem padrão do resultado.
+MEASURES = ["orders", "item_orders", "items", "revenue", "avg_ticket", "customers"]
+
+# Sketches HLL por grão: nome -> (grão, coluna contada).
+_SKETCHES = {
+    "order_customers": ("orders", "customer_unique_id"),
+    "item_orders": ("items", "order_id"),
+    "item_customers": ("items", "customer_unique_id"),
+}
+
+_DIMENSIONS_FILE = "dimensions.json"
+
+
+def cube_dir() -> Path:
+    return config.GOLD_DIR / "cube"
+
+
+def _code_dtype(size: int):
+    return np.int16 if size < np.iinfo(np.int16).max else np.int32
+
+
+def _factorize(values: pd.Series):
+    codes, uniques = pd.factorize(values)
+    labels = [str(v) for v in uniques]
+    return codes.astype(_code_dtype(len(labels))), labels
+
+
+def _present(values: pd.Series) -> pd.Series:
+    # Com a Silver compacta, IDs ausentes são o código -1.
+    mask = values.notna()
+    if pd.api.types.is_integer_dtype(values):
+        mask &= values != -1
+    return mask
+
+
+def _order_frame(df_orders: pd.DataFrame, df_customers: pd.DataFrame) -> pd.DataFrame:
+    """
+    Um registro por pedido com as dimensões do pedido e o cliente.
+    """
+    customer_columns = [
+        c for c in ["customer_id", "customer_unique_id", "customer_region", "customer_state"]
+        if c in df_customers.columns
+    ]
+    orders = df_orders[["order_id", "customer_id", "order_status"]].copy()
+    if "order_purchase_timestamp" in df_orders.columns:
+        orders["year_month"] = derived.order_time_columns(df_orders)[
+            "order_purchase_year_month"
+        ].to_numpy()
+    frame = orders.merge(
+        df_customers[customer_columns].drop_duplicates("customer_id"),
+        on="customer_id",
+        how="left",
+    )
+    for column in ORDER_DIMENSIONS + ["customer_unique_id"]:
+        if column not in frame.columns:
+            frame[column] = np.nan
+    return frame
+
+
+def _sum_cells(frame: pd.DataFrame, dims: List[str], measures: Dict[str, tuple]) -> pd.DataFrame:
+    return frame.groupby(dims, sort=True).agg(**measures)
+
+
+def build_cube(
+    fact: pd.DataFrame, df_orders: pd.DataFrame, df_customers: pd.DataFrame
+) -> "OlapCube":
+    """
+    Agrega a fato e os pedidos nas células dos dois grãos do cubo.
+    """
+    orders = _order_frame(df_orders, df_customers)
+    dictionaries: Dict[str, List[str]] = {}
+    order_codes = pd.DataFrame(index=orders.index)
+    for dim in ORDER_DIMENSIONS:
+        order_codes[dim], dictionaries[dim] = _factorize(orders[dim])
+
+    # As dimensões do pedido chegam à fato pelo order_id (as mesmas da
+    # junção que montou a fato), sem recodificar texto linha a linha.
+    first = ~orders["order_id"].duplicated()
+    position = pd.Index(orders.loc[first, "order_id"]).get_indexer(fact["order_id"])
+    found = position >= 0
+    item_codes = pd.DataFrame(index=fact.index)
+    for dim in ORDER_DIMENSIONS:
+        codes = np.full(len(fact), -1, dtype=order_codes[dim].dtype)
+        codes[found] = order_codes.loc[first, dim].to_numpy()[position[found]]
+        item_codes[dim] = codes
+    category = (
+        fact["product_category_name"]
+        if "product_category_name" in fact.columns
+        else pd.Series(np.nan, index=fact.index)
+    )
+    item_codes["product_category_name"], dictionaries["product_category_name"] = _factorize(
+        category
+    )
+
+    items = item_codes.assign(
+        order_id=fact["order_id"].to_numpy(),
+        order_item_id=fact["order_item_id"].to_numpy(),
+        customer_unique_id=fact["customer_unique_id"].to_numpy()
+        if "customer_unique_id" in fact.columns
+        else np.nan,
+        revenue_cents=(fact["price"] * 100).round().astype("Int64").to_numpy(),
+    )
+    item_measures = {
+        "item_orders": ("order_id", "nunique"),
+        "items": ("order_item_id", "count"),
+        "revenue_cents": ("revenue_cents", "sum"),
+    }
+
+    order_cells = _sum_cells(
+        order_codes.assign(order_id=orders["order_id"].to_numpy()),
+        ORDER_DIMENSIONS,
+        {"orders": ("order_id", "size")},
+    ).join(_sum_cells(items, ORDER_DIMENSIONS, item_measures), how="outer")
+    item_cells = _sum_cells(items, DIMENSIONS, item_measures)
+
+    order_cells = order_cells.fillna(0).astype(np.int64).reset_index()
+    item_cells = item_cells.fillna(0).astype(np.int64).reset_index()
+
+    sources = {
+        "orders": (
+            order_codes.assign(customer_unique_id=orders["customer_unique_id"].to_numpy()),
+            order_cells,
+        ),
+        "items": (items, item_cells),
+    }
+    cube_sketches = {}
+    for name, (grain, column) in _SKETCHES.items():
+        rows, cells = sources[grain]
+        dims = DIMENSIONS if grain == "items" else ORDER_DIMENSIONS
+        rows = rows[_present(rows[column])]
+        # Posição da célula de cada linha (as células estão ordenadas).
+        cell = pd.MultiIndex.from_frame(cells[dims]).get_indexer(
+            pd.MultiIndex.from_frame(rows[dims])
+        )
+        cube_sketches[name] = sketches.build(
+            pd.DataFrame({"cell": cell, column: rows[column].to_numpy()}),
+            ["cell"],
+            column,
+            config.HLL_PRECISION,
+        )
+
+    return OlapCube(dictionaries, order_cells, item_cells, cube_sketches, config.HLL_PRECISION)
+
+
+class OlapCube:
+    """
+    Células codificadas dos dois grãos, dicionários das dimensões e sketches.
+    """
+
+    def __init__(
+        self,
+        dictionaries: Dict[str, List[str]],
+        order_cells: pd.DataFrame,
+        item_cells: pd.DataFrame,
+        cube_sketches: Dict[str, pd.DataFrame],
+        precision: int,
+    ):
+        self.dictionaries = dictionaries
+        self.cells = {"orders": order_cells, "items": item_cells}
+        self.sketches = cube_sketches
+        self.precision = precision
+
+    def save(self, directory: Optional[Path] = None) -> Path:
+        directory = directory or cube_dir()
+        directory.mkdir(parents=True, exist_ok=True)
+        for grain, cells in self.cells.items():
+            cells.to_parquet(directory / f"{grain}_cells.parquet", index=False)
+        for name, sketch in self.sketches.items():
+            sketch.to_parquet(directory / f"{name}_sketch.parquet", index=False)
+        with open(directory / _DIMENSIONS_FILE, "w", encoding="utf-8") as fh:
+            json.dump(
+                {"precision": self.precision, "dimensions": self.dictionaries},
+                fh,
+                indent=2,
+                ensure_ascii=False,
+            )
+        return directory
+
+    @classmethod
+    def load(cls, directory: Optional[Path] = None) -> "OlapCube":
+        directory = directory or cube_dir()
+        with open(directory / _DIMENSIONS_FILE, encoding="utf-8") as fh:
+            meta = json.load(fh)
+        return cls(
+            meta["dimensions"],
+            pd.read_parquet(directory / "orders_cells.parquet"),
+            pd.read_parquet(directory / "items_cells.parquet"),
+            {
+                name: pd.read_parquet(directory / f"{name}_sketch.parquet")
+                for name in _SKETCHES
+            },
+            meta["precision"],
+        )
+
+    def n_cells(self) -> Dict[str, int]:
+        return {grain: len(cells) for grain, cells in self.cells.items()}
+
+    def _codes(self, dim: str, values: Any) -> List[int]:
+        labels = values if isinstance(values, (list, tuple, set)) else [values]
+        index = {label: code for code, label in enumerate(self.dictionaries[dim])}
+        return [index[str(v)] for v in labels if str(v) in index]
+
+    def _distinct(self, name: str, cells: pd.DataFrame, by: List[str]) -> pd.Series:
+        """
+        Contagem distinta aproximada por grupo de `by`, unindo os sketches
+        das células selecionadas.
+        """
+        sketch = self.sketches[name]
+        groups = cells[by].assign(_all=0)
+        sketch = sketch[sketch["cell"].isin(cells.index)].join(groups, on="cell")
+        keys = by or ["_all"]
+        return sketches.estimate(sketches.merge([sketch], keys), keys, self.precision)
+
+    def query(
+        self,
+        by: Sequence[str] = (),
+        where: Optional[Dict[str, Any]] = None,
+        measures: Optional[Sequence[str]] = None,
+    ) -> pd.DataFrame:
+        """
+        Agrega as células por `by` (dimensões de DIMENSIONS) depois de
+        filtrar por `where` (dimensão -> valor ou lista de valores).
+        Grupos sem valor em alguma dimensão de `by` ficam de fora, como no
+        groupby. Medidas disponíveis: MEASURES (orders não se aplica a
+        consultas com a categoria: use item_orders).
+        """
+        by = list(by)
+        where = where or {}
+        measures = list(measures or MEASURES)
+        unknown = [d for d in [*by, *where] if d not in DIMENSIONS]
+        unknown += [m for m in measures if m not in MEASURES]
+        if unknown:
+            raise ValueError(f"Dimensões / medidas desconhecidas: {unknown}")
+
+        uses_category = "product_category_name" in by or "product_category_name" in where
+        if uses_category and "orders" in measures:
+            raise ValueError("orders não se aplica à categoria; use item_orders")
+        grain = "items" if uses_category else "orders"
+        cells = self.cells[grain]
+
+        mask = np.ones(len(cells), dtype=bool)
+        for dim, values in where.items():
+            mask &= cells[dim].isin(self._codes(dim, values)).to_numpy()
+        for dim in by:
+            mask &= cells[dim].to_numpy() >= 0
+        cells = cells[mask]
+
+        additive = [m for m in ["orders", "item_orders", "items", "revenue_cents"] if m in cells]
+        keys = by or (lambda _: 0)
+        result = cells.groupby(keys, sort=False)[additive].sum()
+        if not by:
+            result = result.reindex([0], fill_value=0)
+
+        category_filter = where.get("product_category_name")
+        if (
+            "product_category_name" not in by
+            and category_filter is not None
+            and len(self._codes("product_category_name", category_filter)) > 1
+            and ("item_orders" in measures or "avg_ticket" in measures)
+        ):
+            # Um pedido pode ter itens de mais de uma das categorias.
+            result["item_orders"] = self._distinct("item_orders", cells, by).reindex(
+                result.index, fill_value=0
+            )
+        if "customers" in measures:
+            name = "item_customers" if uses_category else "order_customers"
+            result["customers"] = self._distinct(name, cells, by).reindex(
+                result.index, fill_value=0
+            )
+        result["revenue"] = result["revenue_cents"].astype(float) / 100
+        result["avg_ticket"] = result["revenue"] / result["item_orders"].where(
+            result["item_orders"] > 0
+        )
+
+        result = result.reset_index(drop=not by)[by + measures]
+        for dim in by:
+            labels = np.asarray(self.dictionaries[dim], dtype=object)
+            result[dim] = labels[result[dim].to_numpy()]
+        return result.sort_values(by).reset_index(drop=True) if by else result
+
+
+def orders_by_month(cube: OlapCube) -> pd.DataFrame:
+    """
+    gold_orders_by_month a partir do cubo (mesmo formato de gold_metrics).
+    """
+    monthly = cube.query(by=["year_month"], measures=["orders"])
+    monthly = monthly[monthly["year_month"] < "2018-09"]
+    return monthly.rename(columns={"orders": "order_count"}).reset_index(drop=True)
+
+
+def order_status_distribution(cube: OlapCube) -> pd.DataFrame:
+    """
+    gold_order_status_distribution a partir do cubo. Empates ficam na ordem
+    de primeira ocorrência do status, como em value_counts.
+    """
+    status = cube.query(by=["order_status"], measures=["orders"])
+    first_seen = {label: i for i, label in enumerate(cube.dictionaries["order_status"])}
+    status = status.assign(_first=status["order_status"].map(first_seen))
+    status = status.sort_values(["orders", "_first"], ascending=[False, True])
+    return pd.DataFrame(
+        {"status": status["order_status"].to_numpy(), "count": status["orders"].to_numpy()}
+    )
+
+
+def avg_ticket_by_region(cube: OlapCube) -> pd.DataFrame:
+    """
+    gold_avg_ticket_by_region a partir do cubo (pedidos com itens e receita
+    de toda a fato).
+    """
+    regions = cube.query(by=["customer_region"], measures=["item_orders", "revenue"])
+    regions = regions[regions["item_orders"] > 0]
+    result = pd.DataFrame(
+        {
+            "total_orders": regions["item_orders"].to_numpy(),
+            "total_revenue": regions["revenue"].to_numpy(),
+        },
+        index=pd.Index(regions["customer_region"].to_numpy(), name="customer_region"),
+    )
+    result["avg_ticket"] = (result["total_revenue"] / result["total_orders"]).round(2)
+    return result
@@ -0,0 +1,255 @@
+"""
+Executor de DAG de etapas com cache por impressão digital.
+
+Cada nó declara os artefatos que consome (`inputs`) e os que produz
+(`outputs`). Nós independentes rodam ao mesmo tempo em um pool de threads.
+
+A impressão digital de um nó combina:
+- o código-fonte do pacote
+- os diretórios das camadas e os parâmetros de config listados em `params`
+- tamanho e mtime dos arquivos externos listados em `files`
+- as impressões digitais dos artefatos de entrada
+
+A impressão digital de um artefato deriva da do nó que o produz, então
+todas podem ser calculadas antes da execução. Um nó é pulado quando sua
+impressão digital é igual à da última execução e os arquivos que gravou
+(artefatos em DATA_DIR/cache e `writes`) continuam com o mesmo tamanho e
+mtime; seus artefatos são lidos do cache somente se algum nó executado
+precisar deles.
+
+Cada nó executado é medido como uma etapa de metrics.py (nós pulados
+aparecem no relatório com status "cached").
+"""
+
+import hashlib
+import json
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence
+
+import pandas as pd
+
+from . import config, metrics
+
+
+_MANIFEST_FILE = "_manifest.json"
+
+
+@dataclass
+class Node:
+    name: str
+    func: Callable[..., Any]
+    inputs: List[str] = field(default_factory=list)
+    outputs: List[str] = field(default_factory=list)
+    files: List[Path] = field(default_factory=list)
+    params: List[str] = field(default_factory=list)
+    # Arquivos gravados pelo nó; se algum sumir ou mudar, o nó é executado de novo.
+    writes: List[Path] = field(default_factory=list)
+    # cache=False: o nó sempre executa (ex.: etapas com cache próprio).
+    cache: bool = True
+
+
+def cache_dir() -> Path:
+    return config.DATA_DIR / "cache"
+
+
+def _artifact_path(artifact: str) -> Path:
+    return cache_dir() / f"{artifact.replace(':', '__')}.pkl"
+
+
+def _code_fingerprint() -> str:
+    digest = hashlib.sha256()
+    for path in sorted(Path(__file__).parent.glob("*.py")):
+        digest.update(path.name.encode())
+        digest.update(path.read_bytes())
+    return digest.hexdigest()
+
+
+def _file_state(path: Path) -> str:
+    if not path.exists():
+        return f"{path}:missing"
+    stat = path.stat()
+    return f"{path}:{stat.st_size}:{stat.st_mtime_ns}"
+
+
+def _load_manifest() -> Dict[str, dict]:
+    path = cache_dir() / _MANIFEST_FILE
+    if not path.exists():
+        return {}
+    with open(path, encoding="utf-8") as fh:
+        return json.load(fh)
+
+
+def _save_manifest(manifest: Dict[str, dict]) -> None:
+    with open(cache_dir() / _MANIFEST_FILE, "w", encoding="utf-8") as fh:
+        json.dump(manifest, fh, indent=2, sort_keys=True)
+
+
+def _select(nodes: List[Node], targets: Optional[Iterable[str]]) -> List[Node]:
+    """
+    Nós necessários para os alvos (os próprios alvos e seus ancestrais),
+    em ordem topológica.
+    """
+    producer = {}
+    for node in nodes:
+        for artifact in node.outputs:
+            if artifact in producer:
+                raise ValueError(f"Artefato {artifact!r} produzido por mais de um nó.")
+            producer[artifact] = node
+
+    by_name = {node.name: node for node in nodes}
+    wanted = set(by_name) if targets is None else set(targets)
+    unknown = wanted - set(by_name)
+    if unknown:
+        raise ValueError(f"Nós desconhecidos: {sorted(unknown)}")
+
+    ordered: List[Node] = []
+    state: Dict[str, str] = {}
+
+    def visit(node: Node) -> None:
+        if state.get(node.name) == "done":
+            return
+        if state.get(node.name) == "visiting":
+            raise ValueError(f"Ciclo no DAG passando por {node.name!r}")
+        state[node.name] = "visiting"
+        for artifact in node.inputs:
+            if artifact not in producer:
+                raise ValueError(f"Nenhum nó produz o artefato {artifact!r} ({node.name})")
+            visit(producer[artifact])
+        state[node.name] = "done"
+        ordered.append(node)
+
+    for node in nodes:
+        if node.name in wanted:
+            visit(node)
+    return ordered
+
+
+def _fingerprints(nodes: List[Node]) -> Dict[str, str]:
+    """
+    Impressões digitais de nós e artefatos (chaves "node" e "artifact").
+    """
+    code = _code_fingerprint()
+    dirs = f"{config.BRONZE_DIR}|{config.SILVER_DIR}|{config.GOLD_DIR}"
+    fingerprints: Dict[str, str] = {}
+    for node in nodes:
+        digest = hashlib.sha256()
+        for part in (
+            [code, dirs, node.name]
+            + [f"{name}={getattr(config, name)!r}" for name in node.params]
+            + [_file_state(path) for path in node.files]
+            + [f"{artifact}={fingerprints[artifact]}" for artifact in node.inputs]
+        ):
+            digest.update(part.encode())
+            digest.update(b"\0")
+        node_fp = digest.hexdigest()
+        fingerprints[node.name] = node_fp
+        for artifact in node.outputs:
+            fingerprints[artifact] = hashlib.sha256(f"{node_fp}:{artifact}".encode()).hexdigest()
+    return fingerprints
+
+
+def _as_tuple(node: Node, result: Any) -> tuple:
+    if len(node.outputs) == 0:
+        return ()
+    if len(node.outputs) == 1:
+        return (result,)
+    return tuple(result)
+
+
+def run(
+    nodes: List[Node],
+    targets: Optional[Iterable[str]] = None,
+    force: Sequence[str] = (),
+    collect: Sequence[str] = (),
+    workers: Optional[int] = None,
+) -> Dict[str, Any]:
+    """
+    Executa os nós necessários para `targets` (todos, por padrão).
+
+    `force` lista nós executados mesmo com cache válido. Retorna os valores
+    dos artefatos listados em `collect`.
+    """
+    selected = _select(nodes, targets)
+    fingerprints = _fingerprints(selected)
+    producer = {artifact: node for node in selected for artifact in node.outputs}
+    by_name = {node.name: node for node in selected}
+
+    config.ensure_dirs()
+    cache_dir().mkdir(parents=True, exist_ok=True)
+    manifest = _load_manifest()
+
+    def file_states(node: Node) -> List[str]:
+        return [_file_state(_artifact_path(a)) for a in node.outputs] + [
+            _file_state(path) for path in node.writes
+        ]
+
+    def is_cached(node: Node) -> bool:
+        entry = manifest.get(node.name, {})
+        return (
+            node.cache
+            and node.name not in force
+            and entry.get("fingerprint") == fingerprints[node.name]
+            and entry.get("files") == file_states(node)
+        )
+
+    to_run = [node for node in selected if not is_cached(node)]
+    skipped = [node.name for node in selected if node not in to_run]
+
+    values: Dict[str, Any] = {}
+    lock = threading.Lock()
+
+    def get(artifact: str) -> Any:
+        with lock:
+            if artifact not in values:
+                values[artifact] = pd.read_pickle(_artifact_path(artifact))
+            return values[artifact]
+
+    def execute(node: Node) -> float:
+        start = time.perf_counter()
+        inputs = [get(a) for a in node.inputs]
+        result = _as_tuple(
+            node, metrics.call(node.name, node.func, *inputs, writes=node.writes)
+        )
+        for artifact, value in zip(node.outputs, result):
+            pd.to_pickle(value, _artifact_path(artifact))
+            with lock:
+                values[artifact] = value
+        return time.perf_counter() - start
+
+    for name in skipped:
+        metrics.skipped(name)
+    if skipped:
+        print(f"[dag] {len(skipped)} nós com cache válido: {', '.join(skipped)}")
+
+    pending = {node.name: node for node in to_run}
+    running = {}
+    workers = workers or config.DAG_WORKERS
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        while pending or running:
+            for name, node in list(pending.items()):
+                upstream = {producer[a].name for a in node.inputs}
+                if not upstream & (set(pending) | set(running.values())):
+                    running[pool.submit(execute, node)] = name
+                    del pending[name]
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name = running.pop(future)
+                try:
+                    elapsed = future.result()
+                except Exception:
+                    manifest.pop(name, None)
+                    _save_manifest(manifest)
+                    raise
+                manifest[name] = {
+                    "fingerprint": fingerprints[name],
+                    "files": file_states(by_name[name]),
+                }
+                _save_manifest(manifest)
+                print(f"[dag] {name} executado em {elapsed:.2f}s")
+
+    return {artifact: get(artifact) for artifact in collect}
@@ -1,15 +1,161 @@
-from dataclasses import dataclass
-from typing import List
+from dataclasses import dataclass, field
+from typing import Any, Dict, List
 from . import config
 
 
+BRAZIL_REGIONS = {
+    "AC": "North",
+    "AP": "North",
+    "AM": "North",
+    "PA": "North",
+    "RO": "North",
+    "RR": "North",
+    "TO": "North",
+    "AL": "Northeast",
+    "BA": "Northeast",
+    "CE": "Northeast",
+    "MA": "Northeast",
+    "PB": "Northeast",
+    "PE": "Northeast",
+    "PI": "Northeast",
+    "RN": "Northeast",
+    "SE": "Northeast",
+    "DF": "Center-West",
+    "GO": "Center-West",
+    "MT": "Center-West",
+    "MS": "Center-West",
+    "ES": "Southeast",
+    "MG": "Southeast",
+    "RJ": "Southeast",
+    "SP": "Southeast",
+    "PR": "South",
+    "RS": "South",
+    "SC": "South",
+}
+
+ORDER_STATUSES = [
+    "approved",
+    "canceled",
+    "created",
+    "delivered",
+    "invoiced",
+    "processing",
+    "shipped",
+    "unavailable",
+]
+
+
+# Tipos explícitos de cada coluna. Datas permanecem como texto na Bronze
+# (são convertidas na camada Silver) e IDs hexadecimais como string.
+CUSTOMERS_DTYPES = {
+    "customer_id": "str",
+    "customer_unique_id": "str",
+    "customer_zip_code_prefix": "int64",
+    "customer_city": "str",
+    "customer_state": "str",
+}
+
+ORDERS_DTYPES = {
+    "order_id": "str",
+    "customer_id": "str",
+    "order_status": "str",
+    "order_purchase_timestamp": "str",
+    "order_approved_at": "str",
+    "order_delivered_carrier_date": "str",
+    "order_delivered_customer_date": "str",
+    "order_estimated_delivery_date": "str",
+}
+
+ORDER_ITEMS_DTYPES = {
+    "order_id": "str",
+    "order_item_id": "int64",
+    "product_id": "str",
+    "seller_id": "str",
+    "shipping_limit_date": "str",
+    "price": "float64",
+    "freight_value": "float64",
+}
+
+PRODUCTS_DTYPES = {
+    "product_id": "str",
+    "product_category_name": "str",
+    "product_name_lenght": "float64",
+    "product_description_lenght": "float64",
+    "product_photos_qty": "float64",
+    "product_weight_g": "float64",
+    "product_length_cm": "float64",
+    "product_height_cm": "float64",
+    "product_width_cm": "float64",
+}
+
+
+@dataclass
+class Rule:
+    """
+    Regra de qualidade sobre uma coluna, avaliada na Silver (quality.py):
+    - "not_null"    : sem valores nulos
+    - "unique"      : sem valores repetidos
+    - "domain"      : valor em `arg` (lista); nulos são ignorados
+    - "min"         : valor >= `arg`
+    - "foreign_key" : valor presente em `arg` ("tabela.coluna")
+    - "ordered"     : timestamp <= o da coluna `arg` (ex.: compra <= aprovação)
+    severity "error" interrompe o pipeline com config.QUALITY_FAIL_ON_ERROR;
+    "warning" só é reportada.
+    """
+
+    kind: str
+    column: str
+    arg: Any = None
+    severity: str = "error"
+
+
+CUSTOMERS_RULES = [
+    Rule("not_null", "customer_id"),
+    Rule("unique", "customer_id"),
+    Rule("not_null", "customer_unique_id"),
+    Rule("domain", "customer_state", sorted(BRAZIL_REGIONS)),
+]
+
+ORDERS_RULES = [
+    Rule("not_null", "order_id"),
+    Rule("unique", "order_id"),
+    Rule("foreign_key", "customer_id", "customers.customer_id"),
+    Rule("domain", "order_status", ORDER_STATUSES),
+    Rule("not_null", "order_purchase_timestamp"),
+    Rule("ordered", "order_purchase_timestamp", "order_approved_at", "warning"),
+    Rule("ordered", "order_approved_at", "order_delivered_carrier_date", "warning"),
+    Rule("ordered", "order_delivered_carrier_date", "order_delivered_customer_date", "warning"),
+]
+
+ORDER_ITEMS_RULES = [
+    Rule("not_null", "order_id"),
+    Rule("foreign_key", "order_id", "orders.order_id"),
+    Rule("not_null", "product_id"),
+    Rule("foreign_key", "product_id", "products.product_id"),
+    Rule("min", "price", 0),
+    Rule("min", "freight_value", 0),
+]
+
+PRODUCTS_RULES = [
+    Rule("not_null", "product_id"),
+    Rule("unique", "product_id"),
+    Rule("min", "product_weight_g", 0, "warning"),
+    Rule("min", "product_length_cm", 0, "warning"),
+    Rule("min", "product_height_cm", 0, "warning"),
+    Rule("min", "product_width_cm", 0, "warning"),
+]
+
+
 @dataclass
 class DataSource:
     name: str
     description: str
     file_name: str
+    table: str
     layer: str = "bronze"
     format: str = "csv"
+    dtypes: Dict[str, str] = field(default_factory=dict)
+    rules: List[Rule] = field(default_factory=list)
 
 
 def get_data_sources() -> List[DataSource]:
@@ -19,21 +165,33 @@ def get_data_sources() -> List[DataSource]:
             name="Customers",
             description="Cadastro de clientes: IDs, cidade, estado, CEP, etc.",
             file_name=config.CUSTOMERS_FILE,
+            table="customers",
+            dtypes=CUSTOMERS_DTYPES,
+            rules=CUSTOMERS_RULES,
         ),
         DataSource(
             name="Orders",
             description="Pedidos realizados na plataforma: status, timestamps, cliente.",
             file_name=config.ORDERS_FILE,
+            table="orders",
+            dtypes=ORDERS_DTYPES,
+            rules=ORDERS_RULES,
         ),
         DataSource(
             name="Order Items",
             description="Itens de cada pedido: produto, preço, quantidade.",
             file_name=config.ORDER_ITEMS_FILE,
+            table="order_items",
+            dtypes=ORDER_ITEMS_DTYPES,
+            rules=ORDER_ITEMS_RULES,
         ),
         DataSource(
             name="Products",
             description="Catálogo de produtos: categoria, dimensões, peso, etc.",
             file_name=config.PRODUCTS_FILE,
+            table="products",
+            dtypes=PRODUCTS_DTYPES,
+            rules=PRODUCTS_RULES,
         ),
     ]
 
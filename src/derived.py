@@ -0,0 +1,67 @@
+"""
+Colunas de data/hora derivadas dos timestamps dos pedidos.
+
+O timestamp é convertido uma única vez, na Silver, com o formato fixo do
+dataset (TIMESTAMP_FORMAT). As colunas derivadas são calculadas a partir do
+datetime64 já convertido e reaproveitadas pelas etapas seguintes:
+- {prefix}_date       : datetime64 normalizado (meia-noite)
+- {prefix}_hour       : inteiro, com o mesmo tipo de .dt.hour (coluna que
+                        já existia na Silver; o schema não muda)
+- {prefix}_year       : inteiro compacto
+- {prefix}_year_month : period[M]
+"""
+
+import pandas as pd
+
+
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+
+def parse_timestamp(values: pd.Series) -> pd.Series:
+    """
+    Converte para datetime64 com o formato fixo; valores já convertidos são
+    devolvidos sem cópia. Se algum valor fugir do formato, usa a inferência
+    do pandas.
+    """
+    if pd.api.types.is_datetime64_any_dtype(values):
+        return values
+    try:
+        return pd.to_datetime(values, format=TIMESTAMP_FORMAT)
+    except (ValueError, TypeError):
+        return pd.to_datetime(values)
+
+
+def _compact_int(values: pd.Series) -> pd.Series:
+    # Com NaT o resultado continua float (mesma saída que .dt.* produziria).
+    return pd.to_numeric(values, downcast="integer")
+
+
+def year_month(values: pd.Series) -> pd.Series:
+    return parse_timestamp(values).dt.to_period("M")
+
+
+def add_time_columns(df: pd.DataFrame, column: str, prefix: str) -> pd.DataFrame:
+    """
+    Converte `column` para datetime64 e adiciona as colunas derivadas
+    {prefix}_date, {prefix}_hour, {prefix}_year e {prefix}_year_month.
+    Altera `df` e o devolve.
+    """
+    ts = parse_timestamp(df[column])
+    df[column] = ts
+    df[f"{prefix}_date"] = ts.dt.normalize()
+    df[f"{prefix}_hour"] = ts.dt.hour
+    df[f"{prefix}_year"] = _compact_int(ts.dt.year)
+    df[f"{prefix}_year_month"] = ts.dt.to_period("M")
+    return df
+
+
+def order_time_columns(df_orders: pd.DataFrame) -> pd.DataFrame:
+    """
+    Garante as colunas derivadas de order_purchase_timestamp (ex.: pedidos
+    lidos de um CSV Silver antigo, sem elas).
+    """
+    if "order_purchase_year_month" in df_orders.columns:
+        return df_orders
+    return add_time_columns(
+        df_orders.copy(), "order_purchase_timestamp", "order_purchase"
+    )
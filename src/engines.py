@@ -0,0 +1,509 @@
+"""
+Motores de cálculo da camada Gold.
+
+As mesmas tabelas Gold têm uma implementação por motor:
+- "pandas" : merge/groupby em memória sobre os DataFrames Silver (padrão)
+- "duckdb" : DuckDB embarcado, multithread e colunar, lendo diretamente os
+             arquivos Parquet da Silver (SILVER_DIR/*_silver.parquet)
+
+O motor é escolhido por config.GOLD_ENGINE. check_parity executa a Gold com
+cada motor e compara os CSVs gerados; pela linha de comando, sobre um
+dataset sintético (synthetic.py) gerado num diretório temporário, saindo
+com erro se algum arquivo Gold diferir:
+
+    python -m src.engines --parity --scale 1 --seed 42
+"""
+
+import argparse
+import filecmp
+import shutil
+import tempfile
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import pandas as pd
+
+from . import compact, config, gold_metrics, layer_writer, silver_store
+
+
+SILVER_TABLES = ["customers", "orders", "order_items", "products"]
+
+
+class GoldEngine:
+    """
+    Interface comum: cada método devolve uma tabela Gold já no formato final
+    (mesmas colunas e índice que o caminho pandas).
+    """
+
+    name = ""
+
+    def columns(self, table: str) -> List[str]:
+        raise NotImplementedError
+
+    def row_count(self, table: str) -> int:
+        raise NotImplementedError
+
+    def products_by_category(self) -> pd.DataFrame:
+        raise NotImplementedError
+
+    def customers_by_region(self) -> pd.DataFrame:
+        raise NotImplementedError
+
+    def orders_by_month(self) -> pd.DataFrame:
+        raise NotImplementedError
+
+    def orders_by_year(self) -> pd.DataFrame:
+        raise NotImplementedError
+
+    def order_status_distribution(self) -> pd.DataFrame:
+        raise NotImplementedError
+
+    def products_numeric_corr(self) -> pd.DataFrame:
+        raise NotImplementedError
+
+    def price_distribution(self) -> Tuple[pd.DataFrame, pd.DataFrame]:
+        raise NotImplementedError
+
+    def build_fact_table(self) -> bool:
+        """
+        Materializa e persiste a tabela fato; retorna False se faltarem colunas.
+        """
+        raise NotImplementedError
+
+    def product_recommendation_stats(self) -> pd.DataFrame:
+        raise NotImplementedError
+
+    def customer_category_history(self) -> pd.DataFrame:
+        raise NotImplementedError
+
+    def avg_ticket_by_region(self) -> pd.DataFrame:
+        raise NotImplementedError
+
+    def revenue_by_category(self, product_stats: pd.DataFrame) -> pd.DataFrame:
+        raise NotImplementedError
+
+
+class PandasEngine(GoldEngine):
+    name = "pandas"
+
+    def __init__(self, dfs_silver: Dict[str, pd.DataFrame]):
+        self.dfs = dfs_silver
+        self.fact = pd.DataFrame()
+
+    def columns(self, table: str) -> List[str]:
+        return list(self.dfs[table].columns)
+
+    def row_count(self, table: str) -> int:
+        return len(self.fact) if table == "fact" else len(self.dfs[table])
+
+    def products_by_category(self) -> pd.DataFrame:
+        return gold_metrics.products_by_category(self.dfs["products"])
+
+    def customers_by_region(self) -> pd.DataFrame:
+        return gold_metrics.customers_by_region(self.dfs["customers"])
+
+    def orders_by_month(self) -> pd.DataFrame:
+        return gold_metrics.orders_by_month(self.dfs["orders"])
+
+    def orders_by_year(self) -> pd.DataFrame:
+        return gold_metrics.orders_by_year(self.dfs["orders"])
+
+    def order_status_distribution(self) -> pd.DataFrame:
+        return gold_metrics.order_status_distribution(self.dfs["orders"])
+
+    def products_numeric_corr(self) -> pd.DataFrame:
+        return gold_metrics.products_numeric_corr(self.dfs["products"])
+
+    def price_distribution(self) -> Tuple[pd.DataFrame, pd.DataFrame]:
+        return gold_metrics.price_distribution(self.dfs["order_items"])
+
+    def build_fact_table(self) -> bool:
+        self.fact = gold_metrics.build_fact_table(self.dfs)
+        if self.fact.empty:
+            return False
+        gold_metrics.save_fact_table(self.fact)
+        return True
+
+    def product_recommendation_stats(self) -> pd.DataFrame:
+        return gold_metrics.product_recommendation_stats(self.fact)
+
+    def customer_category_history(self) -> pd.DataFrame:
+        return gold_metrics.customer_category_history(self.fact)
+
+    def avg_ticket_by_region(self) -> pd.DataFrame:
+        return gold_metrics.avg_ticket_by_region(self.fact)
+
+    def revenue_by_category(self, product_stats: pd.DataFrame) -> pd.DataFrame:
+        return gold_metrics.revenue_by_category(product_stats)
+
+
+class DuckDBEngine(GoldEngine):
+    """
+    Executa as tabelas Gold em SQL no DuckDB.
+
+    Para reproduzir byte a byte o caminho pandas, as somas de ponto flutuante
+    usam fsum (Kahan, o mesmo algoritmo do groupby do pandas) na ordem
+    original das linhas, e as ordenações / arredondamentos finais são
+    aplicados no pandas sobre o resultado do SQL.
+    """
+
+    name = "duckdb"
+
+    def __init__(self, silver_dir: Optional[Path] = None):
+        import duckdb
+
+        silver_dir = silver_dir or config.SILVER_DIR
+        layer_writer.wait(silver_dir)
+        duckdb_config = {}
+        if config.GOLD_ENGINE_THREADS:
+            duckdb_config["threads"] = config.GOLD_ENGINE_THREADS
+        self.con = duckdb.connect(database=":memory:", config=duckdb_config)
+
+        for table in SILVER_TABLES:
+            path = (silver_dir / f"{table}_silver.parquet").as_posix().replace("'", "''")
+            self.con.execute(
+                f"CREATE VIEW {table} AS "
+                f"SELECT * FROM read_parquet('{path}', file_row_number = true)"
+            )
+
+    def _query(self, sql: str) -> pd.DataFrame:
+        return self.con.execute(sql).df()
+
+    def columns(self, table: str) -> List[str]:
+        return [
+            row[0]
+            for row in self.con.execute(f"DESCRIBE {table}").fetchall()
+            if row[0] != "file_row_number"
+        ]
+
+    def row_count(self, table: str) -> int:
+        return self.con.execute(f"SELECT count(*) FROM {table}").fetchone()[0]
+
+    def _value_counts(self, table: str, column: str) -> pd.Series:
+        """
+        Equivalente a Series.value_counts(): contagens em ordem decrescente,
+        empates na ordem da primeira ocorrência.
+        """
+        counts = self._query(
+            f"""
+            SELECT {column}, count(*) AS count
+            FROM {table}
+            WHERE {column} IS NOT NULL
+            GROUP BY {column}
+            ORDER BY count(*) DESC, min(file_row_number)
+            """
+        )
+        return counts.set_index(column)["count"]
+
+    def products_by_category(self) -> pd.DataFrame:
+        if "product_category_name" not in self.columns("products"):
+            return pd.DataFrame()
+        return (
+            self._query(
+                """
+                SELECT product_category_name, count(product_id) AS product_count
+                FROM products
+                WHERE product_category_name IS NOT NULL
+                GROUP BY product_category_name
+                ORDER BY product_category_name
+                """
+            )
+            .set_index("product_category_name")
+            .sort_values("product_count", ascending=False)
+        )
+
+    def customers_by_region(self) -> pd.DataFrame:
+        if "customer_region" not in self.columns("customers"):
+            return pd.DataFrame()
+        # Mesmo layout de colunas produzido pelo caminho pandas.
+        return (
+            self._value_counts("customers", "customer_region")
+            .reset_index()
+            .rename(columns={"index": "customer_region", "customer_region": "count"})
+        )
+
+    def orders_by_month(self) -> pd.DataFrame:
+        return self._query(
+            """
+            SELECT strftime(CAST(order_purchase_timestamp AS TIMESTAMP), '%Y-%m') AS year_month,
+                   count(*) AS order_count
+            FROM orders
+            WHERE CAST(order_purchase_timestamp AS TIMESTAMP) < TIMESTAMP '2018-09-01'
+            GROUP BY year_month
+            ORDER BY year_month
+            """
+        )
+
+    def orders_by_year(self) -> pd.DataFrame:
+        return self._query(
+            """
+            SELECT CAST(year(CAST(order_purchase_timestamp AS TIMESTAMP)) AS BIGINT) AS year,
+                   count(*) AS order_count
+            FROM orders
+            WHERE order_purchase_timestamp IS NOT NULL
+            GROUP BY year
+            ORDER BY year
+            """
+        )
+
+    def order_status_distribution(self) -> pd.DataFrame:
+        result = self._value_counts("orders", "order_status").reset_index()
+        result.columns = ["status", "count"]
+        return result
+
+    # Correlação e quantis usam as mesmas funções do pandas sobre as colunas
+    # lidas do DuckDB, garantindo resultados idênticos.
+    def products_numeric_corr(self) -> pd.DataFrame:
+        numeric_cols = [
+            c for c in gold_metrics.PRODUCT_NUMERIC_COLUMNS if c in self.columns("products")
+        ]
+        if not numeric_cols:
+            return pd.DataFrame()
+        return gold_metrics.products_numeric_corr(
+            self._query(f"SELECT {', '.join(numeric_cols)} FROM products ORDER BY file_row_number")
+        )
+
+    def price_distribution(self) -> Tuple[pd.DataFrame, pd.DataFrame]:
+        return gold_metrics.price_distribution(
+            self._query("SELECT price FROM order_items ORDER BY file_row_number")
+        )
+
+    def build_fact_table(self) -> bool:
+        if not (
+            set(gold_metrics.FACT_ORDERS_COLUMNS).issubset(self.columns("orders"))
+            and set(gold_metrics.FACT_ITEMS_COLUMNS).issubset(self.columns("order_items"))
+        ):
+            return False
+
+        customers_columns = [
+            c for c in gold_metrics.FACT_CUSTOMERS_COLUMNS[1:] if c in self.columns("customers")
+        ]
+        products_columns = [
+            c for c in gold_metrics.FACT_PRODUCTS_COLUMNS[1:] if c in self.columns("products")
+        ]
+        select = (
+            [f"i.{c}" for c in gold_metrics.FACT_ITEMS_COLUMNS]
+            + [f"o.{c}" for c in gold_metrics.FACT_ORDERS_COLUMNS[1:]]
+            + [f"c.{c}" for c in customers_columns]
+            + [f"p.{c}" for c in products_columns]
+            + ["i.file_row_number AS item_row"]
+        )
+        self.con.execute(
+            f"""
+            CREATE OR REPLACE TEMP TABLE fact AS
+            SELECT {", ".join(select)}
+            FROM order_items i
+            LEFT JOIN orders o ON i.order_id = o.order_id
+            LEFT JOIN customers c ON o.customer_id = c.customer_id
+            LEFT JOIN products p ON i.product_id = p.product_id
+            """
+        )
+        target = config.GOLD_DIR / gold_metrics.FACT_TABLE_FILE
+        layer = layer_writer.current(config.GOLD_DIR)
+        staged = layer.staging_path(target) if layer is not None else target
+        path = staged.as_posix().replace("'", "''")
+        self.con.execute(
+            f"COPY (SELECT * EXCLUDE (item_row) FROM fact ORDER BY item_row) "
+            f"TO '{path}' (FORMAT PARQUET)"
+        )
+        if layer is not None:
+            layer.add(target, staged)
+        print(f"  - {gold_metrics.FACT_TABLE_FILE}")
+        return True
+
+    def product_recommendation_stats(self) -> pd.DataFrame:
+        return self._query(
+            """
+            SELECT product_id,
+                   product_category_name,
+                   count(DISTINCT order_id) AS total_orders,
+                   count(order_item_id) AS total_quantity,
+                   count(DISTINCT customer_unique_id) AS unique_customers,
+                   fsum(price ORDER BY item_row) AS total_revenue,
+                   fsum(price ORDER BY item_row) / count(price) AS avg_price
+            FROM fact
+            WHERE order_status = 'delivered'
+              AND product_id IS NOT NULL
+              AND product_category_name IS NOT NULL
+            GROUP BY product_id, product_category_name
+            ORDER BY product_id, product_category_name
+            """
+        ).sort_values("total_orders", ascending=False)
+
+    def customer_category_history(self) -> pd.DataFrame:
+        return self._query(
+            """
+            SELECT customer_unique_id,
+                   product_category_name,
+                   count(DISTINCT order_id) AS orders,
+                   count(order_item_id) AS total_quantity
+            FROM fact
+            WHERE order_status = 'delivered'
+              AND customer_unique_id IS NOT NULL
+              AND product_category_name IS NOT NULL
+            GROUP BY customer_unique_id, product_category_name
+            ORDER BY customer_unique_id, product_category_name
+            """
+        )
+
+    def avg_ticket_by_region(self) -> pd.DataFrame:
+        result = self._query(
+            """
+            SELECT customer_region,
+                   count(DISTINCT order_id) AS total_orders,
+                   fsum(price ORDER BY item_row) AS total_revenue
+            FROM fact
+            WHERE customer_region IS NOT NULL
+            GROUP BY customer_region
+            ORDER BY customer_region
+            """
+        ).set_index("customer_region")
+        result["avg_ticket"] = (result["total_revenue"] / result["total_orders"]).round(2)
+        return result
+
+    def revenue_by_category(self, product_stats: pd.DataFrame) -> pd.DataFrame:
+        self.con.register(
+            "product_stats", product_stats.reset_index(drop=True).rename_axis("stats_row").reset_index()
+        )
+        try:
+            result = self._query(
+                """
+                SELECT product_category_name,
+                       fsum(total_revenue ORDER BY stats_row) AS total_revenue,
+                       CAST(sum(total_orders) AS BIGINT) AS total_orders,
+                       fsum(avg_price ORDER BY stats_row) / count(avg_price) AS avg_ticket
+                FROM product_stats
+                WHERE product_category_name IS NOT NULL
+                GROUP BY product_category_name
+                ORDER BY product_category_name
+                """
+            )
+        finally:
+            self.con.unregister("product_stats")
+        return (
+            result.set_index("product_category_name")
+            .round(2)
+            .sort_values("total_revenue", ascending=False)
+        )
+
+
+def get_engine(dfs_silver: Optional[Dict[str, pd.DataFrame]] = None) -> GoldEngine:
+    """
+    Instancia o motor configurado em config.GOLD_ENGINE.
+
+    Os modos incremental e HLL e o cubo OLAP dependem da tabela fato em
+    memória e por isso sempre usam o motor pandas.
+    """
+    if config.GOLD_ENGINE == "duckdb":
+        if (
+            config.INCREMENTAL_GOLD
+            or config.DISTINCT_COUNT_MODE == "hll"
+            or config.OLAP_CUBE
+        ):
+            print(
+                "[WARNING] GOLD_ENGINE='duckdb' não suporta Gold incremental/HLL/cubo OLAP; "
+                "usando o motor pandas."
+            )
+        else:
+            try:
+                return DuckDBEngine()
+            except ImportError as e:
+                print(f"[WARNING] DuckDB indisponível ({e}); usando o motor pandas.")
+    elif config.GOLD_ENGINE != "pandas":
+        raise ValueError(f"GOLD_ENGINE inválido: {config.GOLD_ENGINE!r}")
+
+    if dfs_silver is None:
+        dfs_silver = silver_store.load_silver(gold_metrics.SILVER_COLUMNS)
+        if config.SILVER_COMPACT_DTYPES:
+            dfs_silver = compact.compact_silver(dfs_silver)
+    return PandasEngine(dfs_silver)
+
+
+def check_parity(
+    dfs_silver: Dict[str, pd.DataFrame],
+    engine_names: Sequence[str] = ("pandas", "duckdb"),
+) -> pd.DataFrame:
+    """
+    Gera a Gold com cada motor em diretórios temporários e compara os CSVs
+    byte a byte. Retorna um DataFrame (file, engine, identical).
+    """
+    original = (config.GOLD_DIR, config.GOLD_ENGINE)
+    outputs: Dict[str, Path] = {}
+    try:
+        for name in engine_names:
+            outputs[name] = Path(tempfile.mkdtemp(prefix=f"gold_{name}_"))
+            config.GOLD_DIR, config.GOLD_ENGINE = outputs[name], name
+            gold_metrics.build_gold_tables(dfs_silver)
+
+        reference, *others = engine_names
+        rows = []
+        for path in sorted(outputs[reference].glob("*.csv")):
+            for name in others:
+                candidate = outputs[name] / path.name
+                identical = candidate.exists() and filecmp.cmp(path, candidate, shallow=False)
+                rows.append({"file": path.name, "engine": name, "identical": identical})
+        return pd.DataFrame(rows)
+    finally:
+        config.GOLD_DIR, config.GOLD_ENGINE = original
+        for path in outputs.values():
+            shutil.rmtree(path, ignore_errors=True)
+
+
+def run_parity(scale: float, seed: int, engine_names: Sequence[str]) -> pd.DataFrame:
+    """
+    Gera o dataset sintético, executa Bronze e Silver sobre ele e compara a
+    Gold de cada motor (check_parity). A configuração original é restaurada.
+    """
+    from . import ingestion, synthetic, transformation
+
+    names = [
+        "DATA_DIR", "BRONZE_DIR", "SILVER_DIR", "GOLD_DIR", "INCREMENTAL_INGESTION",
+    ]
+    original = {name: getattr(config, name) for name in names}
+    data_dir = Path(tempfile.mkdtemp(prefix="parity_"))
+    try:
+        synthetic.generate(data_dir, scale, seed)
+        config.DATA_DIR = data_dir
+        config.BRONZE_DIR = data_dir / "bronze"
+        config.SILVER_DIR = data_dir / "silver"
+        config.GOLD_DIR = data_dir / "gold"
+        config.INCREMENTAL_INGESTION = False
+        config.ensure_dirs()
+
+        ingestion.ingest_bronze()
+        transformation.transform_to_silver(ingestion.load_bronze())
+        # Com LAYER_WRITER, o DuckDB só lê a Silver depois de publicada.
+        layer_writer.flush()
+
+        dfs_silver = silver_store.load_silver(gold_metrics.SILVER_COLUMNS)
+        if config.SILVER_COMPACT_DTYPES:
+            dfs_silver = compact.compact_silver(dfs_silver)
+        return check_parity(dfs_silver, engine_names)
+    finally:
+        for name, value in original.items():
+            setattr(config, name, value)
+        shutil.rmtree(data_dir, ignore_errors=True)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Motores de cálculo da camada Gold.")
+    parser.add_argument(
+        "--parity", action="store_true",
+        help="compara a Gold dos motores sobre um dataset sintético",
+    )
+    parser.add_argument("--scale", type=float, default=1.0)
+    parser.add_argument("--seed", type=int, default=config.BENCHMARK_SEED)
+    parser.add_argument("--engines", nargs="+", default=["pandas", "duckdb"])
+    args = parser.parse_args()
+    if not args.parity:
+        parser.error("nenhuma ação informada (use --parity)")
+
+    result = run_parity(args.scale, args.seed, args.engines)
+    print(result.to_string(index=False))
+    if result.empty or not result["identical"].all():
+        raise SystemExit("[ERRO] A Gold difere entre os motores.")
+    print("✅ Gold idêntica em todos os motores.")
+
+
+if __name__ == "__main__":
+    main()
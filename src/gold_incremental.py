@@ -0,0 +1,321 @@
+"""
+Gold incremental, particionada por mês de compra (year_month).
+
+Para cada partição são guardados agregados parciais combináveis em
+GOLD_DIR/partials/year_month=AAAA-MM/:
+- product_stats      : pedidos, quantidade e receita por produto
+- product_customers  : pares distintos produto x cliente (contagem distinta
+                       exata) ou, com DISTINCT_COUNT_MODE = "hll", sketches
+                       HLL
+- category_history   : pedidos e quantidade por cliente x categoria
+- region_stats       : pedidos e receita por região
+- order_counts       : pedidos no mês
+
+Um pedido pertence a um único mês, então contagens distintas de order_id
+são aditivas entre partições. Receitas são somadas em centavos inteiros,
+de modo que a combinação dos parciais não acumula erro de ponto
+flutuante. A cada execução só as partições cuja impressão digital mudou
+são recalculadas; em seguida os parciais de todas as partições são
+combinados nas tabelas Gold publicadas.
+
+refresh_partitions recalcula só os meses informados, sem percorrer os
+demais (usado pelo micro-batch, microbatch.py).
+"""
+
+import json
+import shutil
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+from . import compact, config, derived, sketches
+
+
+_MANIFEST_FILE = "_manifest.json"
+
+
+def partials_dir() -> Path:
+    return config.GOLD_DIR / "partials"
+
+
+def _partition_dir(year_month: str) -> Path:
+    return partials_dir() / f"year_month={year_month}"
+
+
+def _year_month(df: pd.DataFrame) -> pd.Series:
+    if "order_purchase_year_month" in df.columns:
+        return df["order_purchase_year_month"].astype(str)
+    return derived.year_month(df["order_purchase_timestamp"]).astype(str)
+
+
+def _load_manifest() -> Dict[str, str]:
+    path = partials_dir() / _MANIFEST_FILE
+    if not path.exists():
+        return {}
+    with open(path, encoding="utf-8") as fh:
+        return json.load(fh)
+
+
+def _save_manifest(manifest: Dict[str, str]) -> None:
+    path = partials_dir() / _MANIFEST_FILE
+    with open(path, "w", encoding="utf-8") as fh:
+        json.dump(manifest, fh, indent=2, sort_keys=True)
+
+
+def _row_hash_by_partition(df: pd.DataFrame, year_month: pd.Series) -> pd.DataFrame:
+    hashes = pd.util.hash_pandas_object(df, index=False).to_numpy()
+    return (
+        pd.DataFrame({"year_month": year_month.to_numpy(), "hash": hashes})
+        .groupby("year_month")["hash"]
+        .agg(["sum", "size"])
+    )
+
+
+def partition_fingerprints(
+    fact: pd.DataFrame, fact_ym: pd.Series, df_orders: pd.DataFrame, orders_ym: pd.Series
+) -> Dict[str, str]:
+    """
+    Impressão digital de cada partição: contagem e soma dos hashes das
+    linhas da fato e dos pedidos do mês (independente da ordem das linhas).
+    """
+    fact_hash = _row_hash_by_partition(fact, fact_ym)
+    orders_hash = _row_hash_by_partition(
+        df_orders[["order_id", "order_purchase_timestamp"]], orders_ym
+    )
+    combined = fact_hash.join(orders_hash, how="outer", lsuffix="_fact", rsuffix="_orders")
+    combined = combined.fillna(0).astype(np.uint64)
+    return {
+        ym: "-".join(str(v) for v in row)
+        for ym, row in zip(combined.index, combined.itertuples(index=False))
+    }
+
+
+def compute_partials(
+    fact: pd.DataFrame, fact_ym: pd.Series, df_orders: pd.DataFrame, orders_ym: pd.Series
+) -> Dict[str, pd.DataFrame]:
+    """
+    Agregados parciais por partição (coluna year_month) das linhas recebidas.
+    """
+    fact = fact.assign(
+        year_month=fact_ym.to_numpy(),
+        price_cents=(fact["price"] * 100).round().astype("Int64"),
+    )
+    delivered = fact[fact["order_status"] == "delivered"]
+
+    product_keys = ["year_month", "product_id", "product_category_name"]
+    history_keys = ["year_month", "customer_unique_id", "product_category_name"]
+
+    partials = {
+        "product_stats": delivered.groupby(product_keys, observed=True)
+        .agg(
+            total_orders=("order_id", "nunique"),
+            total_quantity=("order_item_id", "count"),
+            revenue_cents=("price_cents", "sum"),
+        )
+        .reset_index(),
+        "product_customers": (
+            sketches.build(delivered, product_keys, "customer_unique_id", config.HLL_PRECISION)
+            if config.DISTINCT_COUNT_MODE == "hll"
+            else delivered[product_keys + ["customer_unique_id"]].dropna().drop_duplicates()
+        ),
+        "category_history": delivered.groupby(history_keys, observed=True)
+        .agg(
+            orders=("order_id", "nunique"),
+            total_quantity=("order_item_id", "count"),
+        )
+        .reset_index(),
+        "region_stats": fact.groupby(["year_month", "customer_region"], observed=True)
+        .agg(
+            total_orders=("order_id", "nunique"),
+            revenue_cents=("price_cents", "sum"),
+        )
+        .reset_index(),
+        "order_counts": pd.DataFrame({"year_month": orders_ym.to_numpy()})
+        .groupby("year_month")
+        .size()
+        .reset_index(name="order_count"),
+    }
+    return {name: compact.decode_keys(df) for name, df in partials.items()}
+
+
+def _write_partials(partials: Dict[str, pd.DataFrame], partitions: List[str]) -> None:
+    for ym in partitions:
+        path = _partition_dir(ym)
+        if path.exists():
+            shutil.rmtree(path)
+        path.mkdir(parents=True)
+
+    for name, df in partials.items():
+        for ym, part in df.groupby("year_month", sort=False):
+            part.to_parquet(_partition_dir(ym) / f"{name}.parquet", index=False)
+
+
+def read_partials(name: str) -> pd.DataFrame:
+    """
+    Lê e concatena os parciais de uma tabela em todas as partições.
+    """
+    files = sorted(partials_dir().glob(f"year_month=*/{name}.parquet"))
+    if not files:
+        return pd.DataFrame()
+    return pd.concat([pd.read_parquet(f) for f in files], ignore_index=True)
+
+
+def _fingerprints(
+    fact: pd.DataFrame, fact_ym: pd.Series, df_orders: pd.DataFrame, orders_ym: pd.Series
+) -> Dict[str, str]:
+    # O modo de contagem distinta faz parte da impressão digital: trocar de
+    # modo recalcula todas as partições.
+    settings = f"{config.DISTINCT_COUNT_MODE}{config.HLL_PRECISION}"
+    return {
+        ym: f"{settings}:{fp}"
+        for ym, fp in partition_fingerprints(fact, fact_ym, df_orders, orders_ym).items()
+    }
+
+
+def has_partials() -> bool:
+    return (partials_dir() / _MANIFEST_FILE).exists()
+
+
+def update_partials(fact: pd.DataFrame, df_orders: pd.DataFrame) -> Tuple[List[str], int]:
+    """
+    Recalcula apenas as partições novas ou alteradas e remove as que sumiram.
+
+    Retorna (partições recalculadas, total de partições).
+    """
+    partials_dir().mkdir(parents=True, exist_ok=True)
+
+    fact_ym = _year_month(fact)
+    orders_ym = _year_month(df_orders)
+
+    previous = _load_manifest()
+    current = _fingerprints(fact, fact_ym, df_orders, orders_ym)
+    touched = sorted(ym for ym, fp in current.items() if previous.get(ym) != fp)
+
+    for ym in set(previous) - set(current):
+        shutil.rmtree(_partition_dir(ym), ignore_errors=True)
+
+    if touched:
+        fact_mask = fact_ym.isin(touched).to_numpy()
+        orders_mask = orders_ym.isin(touched).to_numpy()
+        partials = compute_partials(
+            fact[fact_mask], fact_ym[fact_mask], df_orders[orders_mask], orders_ym[orders_mask]
+        )
+        _write_partials(partials, touched)
+
+    _save_manifest(current)
+    return touched, len(current)
+
+
+def refresh_partitions(
+    fact: pd.DataFrame, df_orders: pd.DataFrame, partitions: List[str]
+) -> None:
+    """
+    Recalcula os parciais das partições indicadas a partir das linhas
+    recebidas, que devem conter todos os pedidos e itens desses meses (ex.:
+    os meses afetados por um micro-batch). As demais partições e suas
+    impressões digitais não são lidas nem alteradas.
+    """
+    partials_dir().mkdir(parents=True, exist_ok=True)
+
+    fact_ym = _year_month(fact)
+    orders_ym = _year_month(df_orders)
+    fact_mask = fact_ym.isin(partitions).to_numpy()
+    orders_mask = orders_ym.isin(partitions).to_numpy()
+    fact, fact_ym = fact[fact_mask], fact_ym[fact_mask]
+    df_orders, orders_ym = df_orders[orders_mask], orders_ym[orders_mask]
+
+    manifest = _load_manifest()
+    manifest.update(_fingerprints(fact, fact_ym, df_orders, orders_ym))
+    _write_partials(compute_partials(fact, fact_ym, df_orders, orders_ym), partitions)
+    _save_manifest(manifest)
+
+
+def merge_product_stats(
+    product_stats: pd.DataFrame, product_customers: pd.DataFrame
+) -> pd.DataFrame:
+    if product_stats.empty:
+        return pd.DataFrame()
+    keys = ["product_id", "product_category_name"]
+    merged = product_stats.groupby(keys)[
+        ["total_orders", "total_quantity", "revenue_cents"]
+    ].sum()
+    merged["total_revenue"] = merged["revenue_cents"].astype(float) / 100
+    if config.DISTINCT_COUNT_MODE == "hll":
+        merged["unique_customers"] = sketches.estimate(
+            sketches.merge([product_customers], keys), keys, config.HLL_PRECISION
+        )
+    else:
+        merged["unique_customers"] = (
+            product_customers.drop_duplicates(keys + ["customer_unique_id"]).groupby(keys).size()
+        )
+    merged["avg_price"] = merged["total_revenue"] / merged["total_quantity"]
+    return (
+        merged.reset_index()[
+            keys
+            + ["total_orders", "total_quantity", "unique_customers", "total_revenue", "avg_price"]
+        ]
+        .sort_values("total_orders", ascending=False)
+    )
+
+
+def merge_category_history(category_history: pd.DataFrame) -> pd.DataFrame:
+    if category_history.empty:
+        return pd.DataFrame()
+    return (
+        category_history.groupby(["customer_unique_id", "product_category_name"])[
+            ["orders", "total_quantity"]
+        ]
+        .sum()
+        .reset_index()
+    )
+
+
+def merge_orders_by_month(order_counts: pd.DataFrame) -> pd.DataFrame:
+    if order_counts.empty:
+        return pd.DataFrame()
+    months = order_counts[
+        (order_counts["year_month"] != "NaT") & (order_counts["year_month"] < "2018-09")
+    ]
+    return (
+        months.groupby("year_month")["order_count"]
+        .sum()
+        .reset_index()
+    )
+
+
+def merge_avg_ticket_by_region(region_stats: pd.DataFrame) -> pd.DataFrame:
+    if region_stats.empty:
+        return pd.DataFrame()
+    result = region_stats.groupby("customer_region")[["total_orders", "revenue_cents"]].sum()
+    result["total_revenue"] = result.pop("revenue_cents").astype(float) / 100
+    result["avg_ticket"] = (result["total_revenue"] / result["total_orders"]).round(2)
+    return result
+
+
+def build_incremental(
+    fact: pd.DataFrame, df_orders: pd.DataFrame
+) -> Dict[str, pd.DataFrame]:
+    """
+    Atualiza os parciais e publica as tabelas Gold particionáveis:
+    product_recommendation_stats, customer_category_history,
+    orders_by_month e avg_ticket_by_region.
+    """
+    touched, total = update_partials(fact, df_orders)
+    print(f"Gold incremental: {len(touched)} de {total} partições recalculadas")
+    return merge_partials()
+
+
+def merge_partials() -> Dict[str, pd.DataFrame]:
+    """
+    Combina os parciais de todas as partições nas tabelas Gold publicadas.
+    """
+    return {
+        "product_recommendation_stats": merge_product_stats(
+            read_partials("product_stats"), read_partials("product_customers")
+        ),
+        "customer_category_history": merge_category_history(read_partials("category_history")),
+        "orders_by_month": merge_orders_by_month(read_partials("order_counts")),
+        "avg_ticket_by_region": merge_avg_ticket_by_region(read_partials("region_stats")),
+    }
@@ -4,128 +4,398 @@ Implementa a camada Gold (Destination) com:
 - Métricas voltadas para recomendação de produtos:
   - popularidade por produto
   - histórico cliente x categoria
+
+Todas as métricas que dependem de joins partem de uma única tabela fato
+(item de pedido enriquecido com pedido, cliente e produto), construída uma
+vez por execução e persistida em GOLD_DIR/gold_fact_order_items.parquet.
+
+Com config.INCREMENTAL_GOLD ativo, as tabelas particionáveis por mês são
+obtidas de agregados parciais mantidos por gold_incremental.py.
+
+Com config.FACT_JOIN_MEMORY_MB, uma junção estimada acima do orçamento é
+feita por partições em disco (spill.py), com o mesmo resultado.
+
+Com config.PARALLEL_GOLD, os groupbys exatos das tabelas de recomendação
+rodam em shards por hash da chave em um pool de processos (sharding.py).
+
+Com config.OLAP_CUBE ativo, o cubo de cube.py é construído a partir da fato
+e os pedidos por mês, por status e o ticket médio por região saem dele.
+
+Com config.LAYER_WRITER ativo, os arquivos Gold são gravados em segundo
+plano e publicados juntos por layer_writer.py.
+
+Com config.DISTINCT_COUNT_MODE = "hll", as contagens distintas de pedidos
+e clientes usam sketches HyperLogLog (sketches.py) em vez de nunique.
+
+As funções deste módulo são a implementação pandas das tabelas Gold; o
+motor de cálculo usado por build_gold_tables é escolhido em engines.py.
 """
 
-from typing import Dict, Tuple
+from typing import Callable, Dict, List, Optional, Tuple
+import numpy as np
 import pandas as pd
 
-from . import config
+from . import (
+    compact,
+    config,
+    cube,
+    derived,
+    engines,
+    gold_incremental,
+    layer_writer,
+    metrics,
+    sketches,
+)
 
 
-def build_gold_tables(
-    dfs_silver: Dict[str, pd.DataFrame]
-) -> Tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]:
-    """
-    Recebe os DataFrames Silver e gera:
-      - products_by_category (negócio)
-      - customers_by_region (negócio)
-      - product_recommendation_stats (recomendação)
-      - customer_category_history (recomendação)
+FACT_TABLE_FILE = "gold_fact_order_items.parquet"
+
+FACT_ITEMS_COLUMNS = ["order_id", "order_item_id", "product_id", "price"]
+FACT_ORDERS_COLUMNS = ["order_id", "customer_id", "order_status", "order_purchase_timestamp"]
+FACT_CUSTOMERS_COLUMNS = ["customer_id", "customer_unique_id", "customer_state", "customer_region"]
+FACT_PRODUCTS_COLUMNS = ["product_id", "product_category_name"]
+
+PRODUCT_NUMERIC_COLUMNS = [
+    "product_weight_g",
+    "product_length_cm",
+    "product_height_cm",
+    "product_width_cm",
+]
+PRICE_HISTOGRAM_BINS = 50
+
+# Colunas da Silver usadas pela Gold: quando a Gold lê a Silver do disco,
+# só essas colunas são carregadas (silver_store.load_silver).
+SILVER_COLUMNS = {
+    "customers": FACT_CUSTOMERS_COLUMNS,
+    "orders": FACT_ORDERS_COLUMNS + ["order_purchase_year", "order_purchase_year_month"],
+    "order_items": FACT_ITEMS_COLUMNS,
+    "products": FACT_PRODUCTS_COLUMNS + PRODUCT_NUMERIC_COLUMNS,
+}
 
-    Também salva os CSVs na camada Gold.
-    """
-    print("=== GOLD LAYER - BUSINESS & RECOMMENDATION METRICS ===\n")
 
+def build_fact_table(dfs_silver: Dict[str, pd.DataFrame]) -> pd.DataFrame:
+    """
+    Tabela fato item de pedido x pedido x cliente x produto (left joins a
+    partir de order_items). Retorna um DataFrame vazio se faltarem colunas.
+    """
     df_customers = dfs_silver["customers"]
     df_orders = dfs_silver["orders"]
     df_order_items = dfs_silver["order_items"]
     df_products = dfs_silver["products"]
 
-
-    if "product_category_name" in df_products.columns:
-        products_by_category = (
-            df_products.groupby("product_category_name")
-            .agg(product_count=("product_id", "count"))
-            .sort_values("product_count", ascending=False)
-        )
-    else:
-        products_by_category = pd.DataFrame()
-
-    if "customer_region" in df_customers.columns:
-        customers_by_region = (
-            df_customers["customer_region"]
-            .value_counts()
-            .reset_index()
-            .rename(columns={"index": "customer_region", "customer_region": "count"})
-        )
-    else:
-        customers_by_region = pd.DataFrame()
-
-    required_orders_cols = {
-        "order_id",
-        "customer_id",
-        "order_status",
-        "order_purchase_timestamp",
-    }
-    required_items_cols = {"order_id", "order_item_id", "product_id", "price"}
-
-    if required_orders_cols.issubset(df_orders.columns) and required_items_cols.issubset(
-        df_order_items.columns
+    if not (
+        set(FACT_ORDERS_COLUMNS).issubset(df_orders.columns)
+        and set(FACT_ITEMS_COLUMNS).issubset(df_order_items.columns)
     ):
-        fact_orders = (
-            df_order_items[["order_id", "order_item_id", "product_id", "price"]]
-            .merge(
-                df_orders[list(required_orders_cols)],
-                on="order_id",
-                how="left",
-            )
-            .merge(
-                df_customers[
-                    ["customer_id", "customer_unique_id", "customer_state", "customer_region"]
-                ],
-                on="customer_id",
-                how="left",
+        return pd.DataFrame()
+
+    customers_columns = [c for c in FACT_CUSTOMERS_COLUMNS if c in df_customers.columns]
+    products_columns = [c for c in FACT_PRODUCTS_COLUMNS if c in df_products.columns]
+
+    if config.FACT_JOIN_MEMORY_MB is not None:
+        from . import spill
+
+        items = df_order_items[FACT_ITEMS_COLUMNS]
+        rights = [
+            (df_orders[FACT_ORDERS_COLUMNS], "order_id"),
+            (df_customers[customers_columns], "customer_id"),
+            (df_products[products_columns], "product_id"),
+        ]
+        estimate = spill.estimate_join_mb(items, rights)
+        if estimate > config.FACT_JOIN_MEMORY_MB:
+            n_partitions = spill.n_partitions_for(estimate, config.FACT_JOIN_MEMORY_MB)
+            print(
+                f"Junção da fato estimada em {estimate:.0f} MB (orçamento "
+                f"{config.FACT_JOIN_MEMORY_MB} MB): {n_partitions} partições em disco"
             )
-            .merge(
-                df_products[["product_id", "product_category_name"]],
-                on="product_id",
-                how="left",
+            metrics.annotate(join_estimate_mb=round(estimate, 1), join_partitions=n_partitions)
+            return spill.partitioned_left_join(items, rights, n_partitions, config.FACT_SPILL_DIR)
+
+    return (
+        df_order_items[FACT_ITEMS_COLUMNS]
+        .merge(df_orders[FACT_ORDERS_COLUMNS], on="order_id", how="left")
+        .merge(df_customers[customers_columns], on="customer_id", how="left")
+        .merge(df_products[products_columns], on="product_id", how="left")
+    )
+
+
+def save_fact_table(fact: pd.DataFrame) -> None:
+    """
+    Persiste a tabela fato em Parquet, sempre com os IDs originais.
+    """
+    path = config.GOLD_DIR / FACT_TABLE_FILE
+    layer = layer_writer.current(config.GOLD_DIR)
+    try:
+        if layer is not None:
+            layer.write_parquet(compact.decode_keys(fact), path, index=False)
+        else:
+            compact.decode_keys(fact).to_parquet(
+                path, index=False, **layer_writer.parquet_options()
             )
+        print(f"  - {FACT_TABLE_FILE}")
+    except Exception as e:
+        print("\n[WARNING] Failed to save fact table as Parquet (pyarrow not installed?).")
+        print(e)
+
+
+def load_fact_table(columns: Optional[List[str]] = None) -> pd.DataFrame:
+    """
+    Lê a tabela fato persistida (apenas as colunas pedidas).
+    """
+    layer_writer.wait(config.GOLD_DIR)
+    return pd.read_parquet(config.GOLD_DIR / FACT_TABLE_FILE, columns=columns)
+
+
+def products_by_category(df_products: pd.DataFrame) -> pd.DataFrame:
+    if "product_category_name" not in df_products.columns:
+        return pd.DataFrame()
+    return (
+        df_products.groupby("product_category_name", observed=True)
+        .agg(product_count=("product_id", "count"))
+        .sort_values("product_count", ascending=False)
+    )
+
+
+def _value_counts(series: pd.Series) -> pd.Series:
+    """
+    value_counts com empates na ordem da primeira ocorrência também para
+    colunas category (SILVER_COMPACT_DTYPES), que o pandas desempata pela
+    ordem das categorias.
+    """
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        series = series.astype(series.cat.categories.dtype)
+    return series.value_counts()
+
+
+def customers_by_region(df_customers: pd.DataFrame) -> pd.DataFrame:
+    if "customer_region" not in df_customers.columns:
+        return pd.DataFrame()
+    return (
+        _value_counts(df_customers["customer_region"])
+        .reset_index()
+        .rename(columns={"index": "customer_region", "customer_region": "count"})
+    )
+
+
+def _approx_distinct(
+    df: pd.DataFrame, keys: List[str], value_col: str, sketch_name: str
+) -> pd.Series:
+    """
+    Contagem distinta aproximada (HLL) por grupo; o sketch é salvo em
+    GOLD_DIR/sketches para poder ser combinado depois.
+    """
+    sketch = sketches.build(df, keys, value_col, config.HLL_PRECISION)
+    sketches.save(sketch, sketch_name, config.HLL_PRECISION)
+    return sketches.estimate(sketch, keys, config.HLL_PRECISION)
+
+
+def _product_stats_exact(fact_delivered: pd.DataFrame) -> pd.DataFrame:
+    return (
+        fact_delivered.groupby(["product_id", "product_category_name"], observed=True)
+        .agg(
+            total_orders=("order_id", "nunique"),
+            total_quantity=("order_item_id", "count"),
+            unique_customers=("customer_unique_id", "nunique"),
+            total_revenue=("price", "sum"),
+            avg_price=("price", "mean"),
         )
+        .reset_index()
+    )
 
-        fact_delivered = fact_orders[
-            fact_orders["order_status"] == "delivered"
-        ].copy()
-
-        product_recommendation_stats = (
-            fact_delivered.groupby(["product_id", "product_category_name"])
-            .agg(
-                total_orders=("order_id", "nunique"),
-                total_quantity=("order_item_id", "count"),
-                unique_customers=("customer_unique_id", "nunique"),
-                total_revenue=("price", "sum"),
-                avg_price=("price", "mean"),
-            )
-            .reset_index()
-            .sort_values("total_orders", ascending=False)
+
+def _category_history_exact(fact_delivered: pd.DataFrame) -> pd.DataFrame:
+    return (
+        fact_delivered.groupby(["customer_unique_id", "product_category_name"], observed=True)
+        .agg(
+            orders=("order_id", "nunique"),
+            total_quantity=("order_item_id", "count"),
         )
+        .reset_index()
+    )
 
-        customer_category_history = (
-            fact_delivered.groupby(["customer_unique_id", "product_category_name"])
-            .agg(
-                orders=("order_id", "nunique"),
-                total_quantity=("order_item_id", "count"),
-            )
-            .reset_index()
+
+def _grouped(
+    fact_delivered: pd.DataFrame,
+    keys: List[str],
+    values: List[str],
+    func: Callable[[pd.DataFrame], pd.DataFrame],
+) -> pd.DataFrame:
+    """
+    Executa o groupby `func` sobre a fato inteira ou, com config.PARALLEL_GOLD,
+    em shards por hash de `keys` em um pool de processos (sharding.py).
+    """
+    if not config.PARALLEL_GOLD or config.GOLD_WORKERS <= 1:
+        return func(fact_delivered)
+    try:
+        from . import sharding
+
+        return sharding.aggregate(fact_delivered[keys + values], keys, func)
+    except ImportError as e:
+        print(f"[WARNING] Agregação paralela indisponível ({e}); usando o caminho serial.")
+        return func(fact_delivered)
+
+
+def product_recommendation_stats(fact: pd.DataFrame) -> pd.DataFrame:
+    fact_delivered = fact[fact["order_status"] == "delivered"]
+    keys = ["product_id", "product_category_name"]
+
+    if config.DISTINCT_COUNT_MODE == "hll":
+        stats = fact_delivered.groupby(keys, observed=True).agg(
+            total_quantity=("order_item_id", "count"),
+            total_revenue=("price", "sum"),
+            avg_price=("price", "mean"),
+        )
+        stats.insert(
+            0, "total_orders", _approx_distinct(fact_delivered, keys, "order_id", "product_orders")
         )
+        stats.insert(
+            2,
+            "unique_customers",
+            _approx_distinct(fact_delivered, keys, "customer_unique_id", "product_customers"),
+        )
+        stats = stats.reset_index()
     else:
-        print(
-            "[WARNING] Orders / order_items não possuem as colunas esperadas. "
-            "Tabelas de recomendação não foram geradas."
+        stats = _grouped(
+            fact_delivered,
+            keys,
+            ["order_id", "order_item_id", "customer_unique_id", "price"],
+            _product_stats_exact,
         )
-        product_recommendation_stats = pd.DataFrame()
-        customer_category_history = pd.DataFrame()
+
+    # Com a representação compacta da Silver, os IDs chegam como
+    # códigos int32 e voltam aos valores originais antes de salvar.
+    return compact.decode_keys(stats, sort_by=keys).sort_values("total_orders", ascending=False)
 
 
-    products_by_category.to_csv(config.GOLD_DIR / "gold_category_analysis.csv")
-    customers_by_region.to_csv(config.GOLD_DIR / "gold_customers_by_region.csv", index=False)
-    product_recommendation_stats.to_csv(
-        config.GOLD_DIR / "gold_product_recommendation_stats.csv", index=False
+def customer_category_history(fact: pd.DataFrame) -> pd.DataFrame:
+    fact_delivered = fact[fact["order_status"] == "delivered"]
+    keys = ["customer_unique_id", "product_category_name"]
+
+    if config.DISTINCT_COUNT_MODE == "hll":
+        history = fact_delivered.groupby(keys, observed=True).agg(
+            total_quantity=("order_item_id", "count"),
+        )
+        history.insert(
+            0, "orders", _approx_distinct(fact_delivered, keys, "order_id", "customer_category_orders")
+        )
+        history = history.reset_index()
+    else:
+        history = _grouped(
+            fact_delivered, keys, ["order_id", "order_item_id"], _category_history_exact
+        )
+
+    return compact.decode_keys(history, sort_by=keys)
+
+
+def hll_validation(fact: pd.DataFrame, product_stats: pd.DataFrame) -> pd.DataFrame:
+    """
+    Relatório de validação: contagens HLL x exatas numa amostra de produtos.
+    """
+    fact_delivered = compact.decode_keys(fact[fact["order_status"] == "delivered"])
+    keys = ["product_id", "product_category_name"]
+    approx = product_stats.set_index(keys)
+    return pd.concat(
+        [
+            sketches.validation_report(
+                fact_delivered, keys, value_col, approx[metric], metric, config.HLL_VALIDATION_SAMPLE
+            )
+            for metric, value_col in [
+                ("total_orders", "order_id"),
+                ("unique_customers", "customer_unique_id"),
+            ]
+        ],
+        ignore_index=True,
     )
-    customer_category_history.to_csv(
-        config.GOLD_DIR / "gold_customer_category_history.csv", index=False
+
+
+def revenue_by_category(product_stats: pd.DataFrame) -> pd.DataFrame:
+    return (
+        product_stats.groupby("product_category_name", observed=True)
+        .agg(
+            total_revenue=("total_revenue", "sum"),
+            total_orders=("total_orders", "sum"),
+            avg_ticket=("avg_price", "mean"),
+        )
+        .round(2)
+        .sort_values("total_revenue", ascending=False)
     )
 
+
+def orders_by_month(df_orders: pd.DataFrame) -> pd.DataFrame:
+    df_orders = derived.order_time_columns(df_orders)
+    months = df_orders["order_purchase_year_month"][
+        df_orders["order_purchase_timestamp"] < "2018-09-01"
+    ]
+
+    result = (
+        pd.DataFrame({"year_month": months})
+        .groupby("year_month")
+        .size()
+        .reset_index(name="order_count")
+    )
+    result["year_month"] = result["year_month"].astype(str)
+    return result
+
+
+def orders_by_year(df_orders: pd.DataFrame) -> pd.DataFrame:
+    df_orders = derived.order_time_columns(df_orders)
+    result = df_orders["order_purchase_year"].value_counts().sort_index()
+    return pd.DataFrame({"year": result.index.astype(int), "order_count": result.to_numpy()})
+
+
+def products_numeric_corr(df_products: pd.DataFrame) -> pd.DataFrame:
+    numeric_cols = [c for c in PRODUCT_NUMERIC_COLUMNS if c in df_products.columns]
+    if not numeric_cols:
+        return pd.DataFrame()
+    return df_products[numeric_cols].corr()
+
+
+def price_distribution(df_order_items: pd.DataFrame) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Histograma dos preços até o percentil 95 (remove outliers) e um resumo
+    (média, mediana e o próprio percentil 95) dos preços considerados.
+    """
+    prices = df_order_items["price"]
+    p95 = prices.quantile(0.95)
+    prices_filtered = prices[prices <= p95]
+
+    frequency, edges = np.histogram(prices_filtered, bins=PRICE_HISTOGRAM_BINS)
+    histogram = pd.DataFrame(
+        {"bin_start": edges[:-1], "bin_end": edges[1:], "frequency": frequency}
+    )
+    summary = pd.DataFrame(
+        {
+            "metric": ["mean", "median", "p95"],
+            "value": [prices_filtered.mean(), prices_filtered.median(), p95],
+        }
+    )
+    return histogram, summary
+
+
+def order_status_distribution(df_orders: pd.DataFrame) -> pd.DataFrame:
+    result = _value_counts(df_orders["order_status"]).reset_index()
+    result.columns = ["status", "count"]
+    return result
+
+
+def avg_ticket_by_region(fact: pd.DataFrame) -> pd.DataFrame:
+    result = (
+        fact.groupby("customer_region", observed=True)
+        .agg(
+            total_orders=("order_id", "nunique"),
+            total_revenue=("price", "sum"),
+        )
+    )
+    result["avg_ticket"] = (result["total_revenue"] / result["total_orders"]).round(2)
+    return result
+
+
+def top_insights(
+    products_by_category: pd.DataFrame,
+    customers_by_region: pd.DataFrame,
+    n_products: int,
+    n_customers: int,
+) -> pd.DataFrame:
     if not products_by_category.empty:
         top_category = products_by_category.index[0]
     else:
@@ -139,7 +409,7 @@ def build_gold_tables(
     else:
         top_region = "N/A"
 
-    top_insights = pd.DataFrame(
+    return pd.DataFrame(
         {
             "Insight": [
                 "Top product category by count",
@@ -150,74 +420,214 @@ def build_gold_tables(
             "Value": [
                 top_category,
                 top_region,
-                len(df_products),
-                len(df_customers),
+                n_products,
+                n_customers,
             ],
         }
     )
-    top_insights.to_csv(config.GOLD_DIR / "gold_top_insights.csv", index=False)
-
-    if not product_recommendation_stats.empty:
-        revenue_by_category = (
-            product_recommendation_stats.groupby("product_category_name")
-            .agg(
-                total_revenue=("total_revenue", "sum"),
-                total_orders=("total_orders", "sum"),
-                avg_ticket=("avg_price", "mean"),
+
+
+def build_gold_tables(
+    dfs_silver: Optional[Dict[str, pd.DataFrame]] = None
+) -> Tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]:
+    """
+    Recebe os DataFrames Silver e gera:
+      - products_by_category (negócio)
+      - customers_by_region (negócio)
+      - product_recommendation_stats (recomendação)
+      - customer_category_history (recomendação)
+
+    Também salva os CSVs na camada Gold. Os cálculos são feitos pelo motor
+    de config.GOLD_ENGINE. Sem `dfs_silver`, a Silver é lida dos arquivos
+    Parquet (apenas as colunas de SILVER_COLUMNS, no motor pandas).
+    """
+    print("=== GOLD LAYER - BUSINESS & RECOMMENDATION METRICS ===\n")
+    config.ensure_dirs()
+
+    engine = engines.get_engine(dfs_silver)
+    print(f"Motor de cálculo: {engine.name}\n")
+
+    layer = layer_writer.open_layer(config.GOLD_DIR) if config.LAYER_WRITER else None
+
+    def gold_file(name: str):
+        return config.GOLD_DIR / name
+
+    def save(df: pd.DataFrame, name: str, **kwargs) -> None:
+        if layer is not None:
+            layer.write_csv(df, gold_file(name), **kwargs)
+        else:
+            df.to_csv(gold_file(name), **kwargs)
+
+    with metrics.stage(
+        "gold:category_analysis", writes=[gold_file("gold_category_analysis.csv")]
+    ) as record:
+        category_analysis = engine.products_by_category()
+        save(category_analysis, "gold_category_analysis.csv")
+        record.rows_out = len(category_analysis)
+
+    with metrics.stage(
+        "gold:customers_by_region", writes=[gold_file("gold_customers_by_region.csv")]
+    ) as record:
+        region_counts = engine.customers_by_region()
+        save(region_counts, "gold_customers_by_region.csv", index=False)
+        record.rows_out = len(region_counts)
+
+    incremental: Dict[str, pd.DataFrame] = {}
+    olap: Optional[cube.OlapCube] = None
+
+    with metrics.stage("gold:fact", writes=[gold_file(FACT_TABLE_FILE)]) as record:
+        has_fact = engine.build_fact_table()
+        record.rows_out = engine.row_count("fact") if has_fact else 0
+
+    if has_fact:
+        if config.INCREMENTAL_GOLD:
+            with metrics.stage(
+                "gold:incremental", writes=[config.GOLD_DIR / "partials"]
+            ) as record:
+                incremental = gold_incremental.build_incremental(
+                    engine.fact, engine.dfs["orders"]
+                )
+                record.rows_out = metrics.count_rows(incremental)
+            product_stats = incremental["product_recommendation_stats"]
+            category_history = incremental["customer_category_history"]
+        else:
+            product_stats = metrics.call(
+                "gold:product_stats", engine.product_recommendation_stats
             )
-            .round(2)
-            .sort_values("total_revenue", ascending=False)
+            category_history = metrics.call(
+                "gold:category_history", engine.customer_category_history
+            )
+    else:
+        print(
+            "[WARNING] Orders / order_items não possuem as colunas esperadas. "
+            "Tabelas de recomendação não foram geradas."
         )
-        revenue_by_category.to_csv(config.GOLD_DIR / "gold_revenue_by_category.csv")
-        print("  - gold_revenue_by_category.csv")
+        product_stats = pd.DataFrame()
+        category_history = pd.DataFrame()
 
-    if "order_purchase_timestamp" in df_orders.columns:
-        df_orders_temp = df_orders.copy()
-        df_orders_temp["order_purchase_timestamp"] = pd.to_datetime(
-            df_orders_temp["order_purchase_timestamp"]
+    if has_fact and config.OLAP_CUBE:
+        with metrics.stage("gold:cube", writes=[cube.cube_dir()]) as record:
+            olap = cube.build_cube(engine.fact, engine.dfs["orders"], engine.dfs["customers"])
+            olap.save()
+            cells = olap.n_cells()
+            record.rows_out = sum(cells.values())
+        print(
+            f"Cubo OLAP: {cells['orders']} células por pedido, "
+            f"{cells['items']} por item ({cube.cube_dir()})"
         )
-        df_orders_temp = df_orders_temp[
-            df_orders_temp["order_purchase_timestamp"] < "2018-09-01"
-        ]
-        df_orders_temp["year_month"] = df_orders_temp["order_purchase_timestamp"].dt.to_period("M")
-        orders_by_month = (
-            df_orders_temp.groupby("year_month")
-            .size()
-            .reset_index(name="order_count")
+
+    save(product_stats, "gold_product_recommendation_stats.csv", index=False)
+    save(category_history, "gold_customer_category_history.csv", index=False)
+
+    if config.DISTINCT_COUNT_MODE == "hll" and not product_stats.empty:
+        with metrics.stage(
+            "gold:hll_validation", writes=[gold_file("gold_hll_validation.csv")]
+        ) as record:
+            validation = hll_validation(engine.fact, product_stats)
+            save(validation, "gold_hll_validation.csv", index=False)
+            record.rows_out = len(validation)
+            metrics.annotate(
+                mean_relative_error=float(validation["relative_error"].mean()),
+                max_relative_error=float(validation["relative_error"].max()),
+            )
+        print(
+            f"HLL (p={config.HLL_PRECISION}): erro relativo médio "
+            f"{validation['relative_error'].mean():.4f}, máximo "
+            f"{validation['relative_error'].max():.4f} "
+            f"em {len(validation)} grupos amostrados"
         )
-        orders_by_month["year_month"] = orders_by_month["year_month"].astype(str)
-        orders_by_month.to_csv(config.GOLD_DIR / "gold_orders_by_month.csv", index=False)
-        print("  - gold_orders_by_month.csv")
+        print("  - gold_hll_validation.csv")
 
-    if "order_status" in df_orders.columns:
-        order_status_dist = (
-            df_orders["order_status"]
-            .value_counts()
-            .reset_index()
+    with metrics.stage("gold:top_insights", writes=[gold_file("gold_top_insights.csv")]) as record:
+        insights = top_insights(
+            category_analysis,
+            region_counts,
+            engine.row_count("products"),
+            engine.row_count("customers"),
         )
-        order_status_dist.columns = ["status", "count"]
-        order_status_dist.to_csv(config.GOLD_DIR / "gold_order_status_distribution.csv", index=False)
+        save(insights, "gold_top_insights.csv", index=False)
+        record.rows_out = len(insights)
+
+    if not product_stats.empty:
+        with metrics.stage(
+            "gold:revenue_by_category", writes=[gold_file("gold_revenue_by_category.csv")]
+        ) as record:
+            revenue = engine.revenue_by_category(product_stats)
+            save(revenue, "gold_revenue_by_category.csv")
+            record.rows_in, record.rows_out = len(product_stats), len(revenue)
+        print("  - gold_revenue_by_category.csv")
+
+    orders_columns = engine.columns("orders")
+
+    if "order_purchase_timestamp" in orders_columns:
+        with metrics.stage(
+            "gold:orders_by_month", writes=[gold_file("gold_orders_by_month.csv")]
+        ) as record:
+            monthly = incremental.get("orders_by_month")
+            if monthly is None and olap is not None:
+                monthly = cube.orders_by_month(olap)
+            if monthly is None:
+                monthly = engine.orders_by_month()
+            save(monthly, "gold_orders_by_month.csv", index=False)
+            record.rows_out = len(monthly)
+        print("  - gold_orders_by_month.csv")
+
+        with metrics.stage(
+            "gold:orders_by_year", writes=[gold_file("gold_orders_by_year.csv")]
+        ) as record:
+            yearly = engine.orders_by_year()
+            save(yearly, "gold_orders_by_year.csv", index=False)
+            record.rows_out = len(yearly)
+        print("  - gold_orders_by_year.csv")
+
+    if "order_status" in orders_columns:
+        with metrics.stage(
+            "gold:order_status_distribution",
+            writes=[gold_file("gold_order_status_distribution.csv")],
+        ) as record:
+            if olap is not None:
+                status = cube.order_status_distribution(olap)
+            else:
+                status = engine.order_status_distribution()
+            save(status, "gold_order_status_distribution.csv", index=False)
+            record.rows_out = len(status)
         print("  - gold_order_status_distribution.csv")
 
-    if not product_recommendation_stats.empty and "customer_region" in df_customers.columns:
-        fact_with_region = (
-            df_order_items[["order_id", "price"]]
-            .merge(df_orders[["order_id", "customer_id"]], on="order_id")
-            .merge(df_customers[["customer_id", "customer_region"]], on="customer_id")
-        )
-        avg_ticket_by_region = (
-            fact_with_region.groupby("customer_region")
-            .agg(
-                total_orders=("order_id", "nunique"),
-                total_revenue=("price", "sum"),
-            )
-        )
-        avg_ticket_by_region["avg_ticket"] = (
-            avg_ticket_by_region["total_revenue"] / avg_ticket_by_region["total_orders"]
-        ).round(2)
-        avg_ticket_by_region.to_csv(config.GOLD_DIR / "gold_avg_ticket_by_region.csv")
+    if not product_stats.empty and "customer_region" in engine.columns("customers"):
+        with metrics.stage(
+            "gold:avg_ticket_by_region", writes=[gold_file("gold_avg_ticket_by_region.csv")]
+        ) as record:
+            ticket = incremental.get("avg_ticket_by_region")
+            if ticket is None and olap is not None:
+                ticket = cube.avg_ticket_by_region(olap)
+            if ticket is None:
+                ticket = engine.avg_ticket_by_region()
+            save(ticket, "gold_avg_ticket_by_region.csv")
+            record.rows_out = len(ticket)
         print("  - gold_avg_ticket_by_region.csv")
 
+    with metrics.stage(
+        "gold:products_numeric_corr", writes=[gold_file("gold_products_numeric_corr.csv")]
+    ) as record:
+        numeric_corr = engine.products_numeric_corr()
+        if not numeric_corr.empty:
+            save(numeric_corr, "gold_products_numeric_corr.csv")
+        record.rows_out = len(numeric_corr)
+    if not numeric_corr.empty:
+        print("  - gold_products_numeric_corr.csv")
+
+    if "price" in engine.columns("order_items"):
+        price_files = [gold_file("gold_price_histogram.csv"), gold_file("gold_price_summary.csv")]
+        with metrics.stage("gold:price_histogram", writes=price_files) as record:
+            histogram, summary = engine.price_distribution()
+            save(histogram, "gold_price_histogram.csv", index=False)
+            save(summary, "gold_price_summary.csv", index=False)
+            record.rows_out = len(histogram) + len(summary)
+        print("  - gold_price_histogram.csv")
+        print("  - gold_price_summary.csv")
+
+    if layer is not None:
+        layer.commit()
     print("\nArquivos Gold gerados em:", config.GOLD_DIR)
 
-    return products_by_category, customers_by_region, product_recommendation_stats
+    return category_analysis, region_counts, product_stats
@@ -2,54 +2,507 @@
 Implementa a etapa de Ingestão (Ingestion) do pipeline, em modo batch:
 - Lê arquivos CSV do diretório de dados "dados/"
 - Salva cópias na camada Bronze (BRONZE_DIR)
+
+Com config.STREAMING_INGESTION ativo, cada fonte é lida em blocos de
+config.INGESTION_CHUNK_SIZE linhas, com os tipos declarados em
+DataSource.dtypes, e a Bronze é escrita bloco a bloco. As tabelas não são
+lidas de volta na ingestão: ingest_bronze devolve um BronzeTables, que lê
+cada tabela da Bronze só quando a transformação a usa (uma por vez).
+
+Com config.INCREMENTAL_INGESTION ativo, um manifesto na Bronze registra
+tamanho, mtime e hash de cada fonte; fontes inalteradas não são relidas
+nem regravadas e seguem para a próxima etapa a partir da Bronze existente.
+
+config.BRONZE_FORMAT define como a Bronze é armazenada: CSV regravado, cópia
+(ou hardlink) do arquivo bruto, ou Parquet / Arrow IPC tipados. read_bronze
+lê de volta apenas as colunas pedidas.
+
+Com config.PARALLEL_INGESTION ativo, as fontes são ingeridas ao mesmo tempo
+em um pool de threads (config.INGESTION_WORKERS) e cada CSV é lido pelo
+leitor multithread do pyarrow.csv (pandas.read_csv se pyarrow não estiver
+instalado).
+
+Com config.LAYER_WRITER ativo, os arquivos Bronze e o manifesto são gravados
+em segundo plano e publicados juntos por layer_writer.py (na ingestão em
+streaming, só o manifesto).
 """
 
+import hashlib
+import json
+import os
+import shutil
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Dict
+from typing import Dict, Iterator, List, Mapping, Optional, Tuple
 
 import pandas as pd
 
-from . import config, data_sources
+from . import config, data_sources, layer_writer
+from .data_sources import DataSource
 
 
-def _read_csv_if_exists(path: Path) -> pd.DataFrame:
+def _read_csv_if_exists(path: Path, dtype: Optional[Dict[str, str]] = None) -> pd.DataFrame:
     if not path.exists():
         raise FileNotFoundError(f"Arquivo não encontrado: {path}")
-    df = pd.read_csv(path)
+    df = pd.read_csv(path, dtype=dtype or None)
     return df
 
 
-def ingest_bronze() -> Dict[str, pd.DataFrame]:
+_ARROW_TYPE_ALIASES = {"str": "string", "int64": "int64", "float64": "float64"}
+
+
+def bronze_path(src: DataSource) -> Path:
+    """
+    Caminho do arquivo Bronze de uma fonte, conforme config.BRONZE_FORMAT.
+    """
+    if config.BRONZE_FORMAT == "parquet":
+        return config.BRONZE_DIR / Path(src.file_name).with_suffix(".parquet").name
+    if config.BRONZE_FORMAT == "arrow":
+        return config.BRONZE_DIR / Path(src.file_name).with_suffix(".arrow").name
+    if config.BRONZE_FORMAT in ("csv", "copy", "hardlink"):
+        return config.BRONZE_DIR / src.file_name
+    raise ValueError(f"BRONZE_FORMAT inválido: {config.BRONZE_FORMAT!r}")
+
+
+def _arrow_schema(src: DataSource, df: pd.DataFrame):
+    """
+    Schema Arrow do DataFrame, forçando os tipos declarados na DataSource
+    (evita colunas de texto totalmente nulas inferidas como tipo null).
+    """
+    import pyarrow as pa
+
+    schema = pa.Schema.from_pandas(df, preserve_index=False)
+    for name, dtype in src.dtypes.items():
+        i = schema.get_field_index(name)
+        if i >= 0 and dtype in _ARROW_TYPE_ALIASES:
+            schema = schema.set(i, pa.field(name, pa.type_for_alias(_ARROW_TYPE_ALIASES[dtype])))
+    return schema
+
+
+def _open_arrow_writer(src: DataSource, schema, path: Optional[Path] = None):
+    path = path or bronze_path(src)
+    if config.BRONZE_FORMAT == "parquet":
+        import pyarrow.parquet as pq
+
+        return pq.ParquetWriter(path, schema, compression=config.PARQUET_COMPRESSION)
+
+    import pyarrow as pa
+
+    return pa.ipc.new_file(path, schema, options=layer_writer.arrow_options())
+
+
+def _link_or_copy(source_path: Path, target: Path) -> None:
+    if target.exists():
+        target.unlink()
+    if config.BRONZE_FORMAT == "hardlink":
+        try:
+            os.link(source_path, target)
+            return
+        except OSError:
+            pass
+    shutil.copyfile(source_path, target)
+
+
+def _write_bronze(src: DataSource, df: pd.DataFrame, path: Optional[Path] = None) -> None:
+    layer = layer_writer.current(config.BRONZE_DIR)
+    if path is None and layer is not None:
+        df = df.copy(deep=False)
+        layer.submit(bronze_path(src), lambda tmp: _write_bronze(src, df, tmp))
+        return
+
+    path = path or bronze_path(src)
+    if config.BRONZE_FORMAT in ("parquet", "arrow"):
+        import pyarrow as pa
+
+        table = pa.Table.from_pandas(df, schema=_arrow_schema(src, df), preserve_index=False)
+        with _open_arrow_writer(src, table.schema, path) as writer:
+            if config.BRONZE_FORMAT == "parquet":
+                writer.write_table(table, row_group_size=config.PARQUET_ROW_GROUP_SIZE)
+            else:
+                writer.write_table(table)
+    elif config.BRONZE_FORMAT in ("copy", "hardlink"):
+        _link_or_copy(config.DATA_DIR / src.file_name, path)
+    else:
+        df.to_csv(path, index=False)
+
+
+def _file_sha256(path: Path, block_size: int = 1 << 20) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as fh:
+        for block in iter(lambda: fh.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _fingerprint(path: Path, previous: Optional[dict] = None) -> dict:
+    """
+    Impressão digital de um arquivo fonte: tamanho, mtime e sha256.
+
+    Se tamanho e mtime batem com a entrada anterior do manifesto, o hash
+    anterior é reaproveitado sem reler o arquivo.
+    """
+    stat = path.stat()
+    fingerprint = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+    if (
+        previous
+        and previous.get("size") == fingerprint["size"]
+        and previous.get("mtime_ns") == fingerprint["mtime_ns"]
+    ):
+        fingerprint["sha256"] = previous["sha256"]
+    else:
+        fingerprint["sha256"] = _file_sha256(path)
+    return fingerprint
+
+
+def _load_manifest() -> Dict[str, dict]:
+    path = config.BRONZE_DIR / config.BRONZE_MANIFEST_FILE
+    if not path.exists():
+        return {}
+    with open(path, encoding="utf-8") as fh:
+        return json.load(fh)
+
+
+def _save_manifest(manifest: Dict[str, dict], path: Optional[Path] = None) -> None:
+    target = config.BRONZE_DIR / config.BRONZE_MANIFEST_FILE
+    layer = layer_writer.current(config.BRONZE_DIR)
+    if path is None and layer is not None:
+        # Publicado junto com os arquivos que ele descreve.
+        layer.submit(target, lambda tmp: _save_manifest(manifest, tmp))
+        return
+    with open(path or target, "w", encoding="utf-8") as fh:
+        json.dump(manifest, fh, indent=2, sort_keys=True)
+
+
+def _is_unchanged(src: DataSource, fingerprint: dict, previous: Optional[dict]) -> bool:
+    return (
+        previous is not None
+        and previous.get("sha256") == fingerprint["sha256"]
+        and previous.get("bronze_format") == config.BRONZE_FORMAT
+        and bronze_path(src).exists()
+    )
+
+
+def _stream_csv_to_bronze(src: DataSource) -> Optional[int]:
+    """
+    Copia a fonte para a Bronze em blocos de tamanho fixo.
+
+    Apenas um bloco fica em memória por vez. Retorna as linhas gravadas
+    (None na cópia / hardlink do arquivo bruto, que não é lido).
+    """
+    source_path = config.DATA_DIR / src.file_name
+    if not source_path.exists():
+        raise FileNotFoundError(f"Arquivo não encontrado: {source_path}")
+
+    if config.BRONZE_FORMAT in ("copy", "hardlink"):
+        # O arquivo bruto vai para a Bronze sem nenhum parsing.
+        _link_or_copy(source_path, bronze_path(src))
+        return None
+
+    reader = pd.read_csv(
+        source_path,
+        dtype=src.dtypes or None,
+        chunksize=config.INGESTION_CHUNK_SIZE,
+    )
+
+    if config.BRONZE_FORMAT in ("parquet", "arrow"):
+        import pyarrow as pa
+
+        writer, schema = None, None
+        rows = 0
+        try:
+            with reader:
+                for chunk in reader:
+                    if writer is None:
+                        schema = _arrow_schema(src, chunk)
+                        writer = _open_arrow_writer(src, schema)
+                    writer.write_table(
+                        pa.Table.from_pandas(chunk, schema=schema, preserve_index=False)
+                    )
+                    rows += len(chunk)
+        finally:
+            if writer is not None:
+                writer.close()
+        return rows
+
+    rows = 0
+    with reader, open(bronze_path(src), "w", newline="") as fh:
+        for i, chunk in enumerate(reader):
+            chunk.to_csv(fh, header=i == 0, index=False)
+            rows += len(chunk)
+    return rows
+
+
+def read_bronze(src: DataSource, columns: Optional[List[str]] = None) -> pd.DataFrame:
+    """
+    Lê o arquivo Bronze de uma fonte, aplicando os tipos declarados.
+
+    `columns` restringe a leitura às colunas informadas; nos formatos
+    colunares (Parquet / Arrow) as demais colunas nem chegam a ser lidas.
+    """
+    layer_writer.wait(config.BRONZE_DIR)
+    path = bronze_path(src)
+    if not path.exists():
+        raise FileNotFoundError(f"Arquivo não encontrado: {path}")
+
+    if config.BRONZE_FORMAT == "parquet":
+        return pd.read_parquet(path, columns=columns)
+    if config.BRONZE_FORMAT == "arrow":
+        return pd.read_feather(path, columns=columns)
+    return pd.read_csv(path, dtype=src.dtypes or None, usecols=columns)
+
+
+def bronze_columns(src: DataSource) -> List[str]:
+    """
+    Colunas do arquivo Bronze de uma fonte, sem ler os dados.
+    """
+    layer_writer.wait(config.BRONZE_DIR)
+    path = bronze_path(src)
+    if config.BRONZE_FORMAT == "parquet":
+        import pyarrow.parquet as pq
+
+        return pq.read_schema(path).names
+    if config.BRONZE_FORMAT == "arrow":
+        import pyarrow as pa
+
+        with pa.memory_map(str(path)) as source:
+            return pa.ipc.open_file(source).schema.names
+    return list(pd.read_csv(path, nrows=0).columns)
+
+
+def bronze_rows(src: DataSource) -> int:
+    """
+    Linhas do arquivo Bronze de uma fonte, sem carregar a tabela: dos
+    metadados (Parquet / Arrow) ou contadas em blocos, só na primeira coluna
+    (CSV).
+    """
+    layer_writer.wait(config.BRONZE_DIR)
+    path = bronze_path(src)
+    if config.BRONZE_FORMAT == "parquet":
+        import pyarrow.parquet as pq
+
+        return pq.ParquetFile(path).metadata.num_rows
+    if config.BRONZE_FORMAT == "arrow":
+        import pyarrow as pa
+
+        with pa.memory_map(str(path)) as source:
+            reader = pa.ipc.open_file(source)
+            return sum(reader.get_batch(i).num_rows for i in range(reader.num_record_batches))
+    first = bronze_columns(src)[0]
+    with pd.read_csv(
+        path, usecols=[first], dtype={first: "str"}, chunksize=config.INGESTION_CHUNK_SIZE
+    ) as reader:
+        return sum(len(chunk) for chunk in reader)
+
+
+class BronzeTables(Mapping[str, pd.DataFrame]):
+    """
+    Tabelas Bronze da ingestão em streaming, lidas do disco (read_bronze) a
+    cada acesso, sem guardar os DataFrames: a transformação limpa uma
+    tabela por vez, então só uma tabela bruta fica em memória. No DAG,
+    cada nó silver:<tabela> recebe um BronzeTables só com a sua tabela.
+    """
+
+    def __init__(self, sources: List[DataSource], rows: Dict[str, int]):
+        self._sources = {src.table: src for src in sources}
+        # Linhas por tabela, para o relatório da execução (metrics.count_rows).
+        self.rows = dict(rows)
+        self.n_rows = sum(rows.values())
+
+    def __getitem__(self, table: str) -> pd.DataFrame:
+        return read_bronze(self._sources[table])
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._sources)
+
+    def __len__(self) -> int:
+        return len(self._sources)
+
+
+def append_bronze(src: DataSource, df: pd.DataFrame) -> None:
+    """
+    Acrescenta linhas ao arquivo Bronze de uma fonte (micro-batch).
+
+    Em CSV as linhas vão para o fim do arquivo; um hardlink para o arquivo
+    bruto é desfeito antes, para não alterar a fonte. Parquet e Arrow não
+    aceitam append: o arquivo é regravado (via temporário) com as tabelas
+    Arrow antiga e nova concatenadas, sem passar o histórico pelo pandas.
+    """
+    path = bronze_path(src)
+    if not path.exists():
+        raise FileNotFoundError(f"Arquivo não encontrado: {path}")
+    df = df[bronze_columns(src)]
+
+    if config.BRONZE_FORMAT in ("parquet", "arrow"):
+        import pyarrow as pa
+
+        if config.BRONZE_FORMAT == "parquet":
+            import pyarrow.parquet as pq
+
+            existing = pq.read_table(path)
+        else:
+            with pa.memory_map(str(path)) as source:
+                existing = pa.ipc.open_file(source).read_all()
+        new = pa.Table.from_pandas(df, schema=existing.schema, preserve_index=False)
+        tmp = path.with_name(path.name + ".tmp")
+        with _open_arrow_writer(src, existing.schema, tmp) as writer:
+            writer.write_table(pa.concat_tables([existing, new]))
+        os.replace(tmp, path)
+        return
+
+    if os.stat(path).st_nlink > 1:
+        tmp = path.with_name(path.name + ".tmp")
+        shutil.copyfile(path, tmp)
+        os.replace(tmp, path)
+    with open(path, "rb+") as fh:
+        # Arquivos brutos copiados podem terminar sem quebra de linha.
+        fh.seek(0, os.SEEK_END)
+        if fh.tell() > 0:
+            fh.seek(-1, os.SEEK_END)
+            if fh.read(1) != b"\n":
+                fh.write(b"\n")
+    df.to_csv(path, mode="a", header=False, index=False)
+
+
+def load_bronze(
+    columns: Optional[Dict[str, List[str]]] = None
+) -> Dict[str, pd.DataFrame]:
+    """
+    Lê a camada Bronze já gravada, aplicando os tipos declarados em cada DataSource.
+
+    `columns` mapeia tabela -> colunas a ler (projeção); tabelas ausentes
+    são lidas por inteiro.
+    """
+    columns = columns or {}
+    return {
+        src.table: read_bronze(src, columns.get(src.table))
+        for src in data_sources.get_data_sources()
+    }
+
+
+def _read_csv_arrow(path: Path, src: DataSource) -> pd.DataFrame:
+    """
+    Leitura multithread do CSV com pyarrow.csv, usando os tipos declarados.
+    """
+    import pyarrow as pa
+    import pyarrow.csv as pacsv
+
+    if config.CSV_PARSE_THREADS:
+        pa.set_cpu_count(config.CSV_PARSE_THREADS)
+
+    column_types = {
+        name: pa.type_for_alias(_ARROW_TYPE_ALIASES[dtype])
+        for name, dtype in src.dtypes.items()
+        if dtype in _ARROW_TYPE_ALIASES
+    }
+    table = pacsv.read_csv(
+        path,
+        read_options=pacsv.ReadOptions(use_threads=True),
+        convert_options=pacsv.ConvertOptions(
+            column_types=column_types,
+            strings_can_be_null=True,
+        ),
+    )
+    return table.to_pandas()
+
+
+def _read_source(src: DataSource) -> pd.DataFrame:
+    path = config.DATA_DIR / src.file_name
+    if config.PARALLEL_INGESTION:
+        try:
+            return _read_csv_arrow(path, src)
+        except ImportError:
+            pass
+    return _read_csv_if_exists(path, src.dtypes)
+
+
+def _ingest_source(
+    src: DataSource, previous: Optional[dict]
+) -> Tuple[Optional[pd.DataFrame], int, Optional[dict], bool]:
+    """
+    Ingere uma fonte para a Bronze.
+
+    Retorna (DataFrame, linhas, impressão digital para o manifesto,
+    reaproveitada?). Na ingestão em streaming o DataFrame é None: a tabela
+    não é lida de volta da Bronze.
+    """
+    source_path = config.DATA_DIR / src.file_name
+    if not source_path.exists():
+        raise FileNotFoundError(f"Arquivo não encontrado: {source_path}")
+
+    fingerprint = None
+    if config.INCREMENTAL_INGESTION:
+        fingerprint = _fingerprint(source_path, previous)
+        fingerprint["bronze_format"] = config.BRONZE_FORMAT
+        if _is_unchanged(src, fingerprint, previous):
+            if config.STREAMING_INGESTION:
+                return None, bronze_rows(src), fingerprint, True
+            df = read_bronze(src)
+            return df, len(df), fingerprint, True
+
+    if config.STREAMING_INGESTION:
+        rows = _stream_csv_to_bronze(src)
+        return None, bronze_rows(src) if rows is None else rows, fingerprint, False
+
+    df = _read_source(src)
+    _write_bronze(src, df)
+    return df, len(df), fingerprint, False
+
+
+def ingest_bronze() -> Mapping[str, pd.DataFrame]:
+    """
+    Ingere todas as fontes para a Bronze. Retorna os DataFrames por tabela
+    (na ingestão em streaming, um BronzeTables que os lê sob demanda).
+    """
     print("=== INGESTÃO (BATCH) - CAMADA BRONZE ===\n")
+    config.ensure_dirs()
 
     data_sources.describe_sources()
 
-    customers_path = config.DATA_DIR / config.CUSTOMERS_FILE
-    orders_path = config.DATA_DIR / config.ORDERS_FILE
-    order_items_path = config.DATA_DIR / config.ORDER_ITEMS_FILE
-    products_path = config.DATA_DIR / config.PRODUCTS_FILE
+    sources = data_sources.get_data_sources()
+    # Uma Bronze sem marcador de conclusão não é reaproveitada.
+    committed = layer_writer.is_committed(config.BRONZE_DIR)
+    manifest = _load_manifest() if config.INCREMENTAL_INGESTION and committed else {}
+    layer = layer_writer.open_layer(config.BRONZE_DIR) if config.LAYER_WRITER else None
+
+    if config.STREAMING_INGESTION:
+        print(f"Modo streaming: blocos de {config.INGESTION_CHUNK_SIZE} linhas\n")
+
+    if config.PARALLEL_INGESTION:
+        print(f"Modo paralelo: {config.INGESTION_WORKERS} workers\n")
+        with ThreadPoolExecutor(max_workers=config.INGESTION_WORKERS) as pool:
+            results = list(
+                pool.map(lambda src: _ingest_source(src, manifest.get(src.file_name)), sources)
+            )
+    else:
+        results = [_ingest_source(src, manifest.get(src.file_name)) for src in sources]
 
-    df_customers = _read_csv_if_exists(customers_path)
-    df_orders = _read_csv_if_exists(orders_path)
-    df_order_items = _read_csv_if_exists(order_items_path)
-    df_products = _read_csv_if_exists(products_path)
+    dfs: Dict[str, pd.DataFrame] = {}
+    rows: Dict[str, int] = {}
+    cached = []
+    for src, (df, n_rows, fingerprint, from_cache) in zip(sources, results):
+        dfs[src.table] = df
+        rows[src.table] = n_rows
+        if fingerprint is not None:
+            manifest[src.file_name] = fingerprint
+        if from_cache:
+            cached.append(src.name)
 
     print("Shapes pós-ingestão (dados brutos):")
-    print(f"  Customers   : {df_customers.shape}")
-    print(f"  Orders      : {df_orders.shape}")
-    print(f"  Order Items : {df_order_items.shape}")
-    print(f"  Products    : {df_products.shape}")
+    for src in sources:
+        df = dfs[src.table]
+        shape = df.shape if df is not None else (rows[src.table], len(bronze_columns(src)))
+        print(f"  {src.name:<12}: {shape}")
 
-    df_customers.to_csv(config.BRONZE_DIR / config.CUSTOMERS_FILE, index=False)
-    df_orders.to_csv(config.BRONZE_DIR / config.ORDERS_FILE, index=False)
-    df_order_items.to_csv(config.BRONZE_DIR / config.ORDER_ITEMS_FILE, index=False)
-    df_products.to_csv(config.BRONZE_DIR / config.PRODUCTS_FILE, index=False)
+    if config.INCREMENTAL_INGESTION:
+        _save_manifest(manifest)
+        if cached:
+            print("\nFontes inalteradas (Bronze reaproveitada):", ", ".join(cached))
 
+    if layer is not None:
+        layer.commit()
+        print("\nBronze em gravação em segundo plano (publicação atômica)")
     print("\nArquivos Bronze salvos em:", config.BRONZE_DIR)
 
-    return {
-        "customers": df_customers,
-        "orders": df_orders,
-        "order_items": df_order_items,
-        "products": df_products,
-    }
+    if config.STREAMING_INGESTION:
+        return BronzeTables(sources, rows)
+    return dfs
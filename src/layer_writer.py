@@ -0,0 +1,286 @@
+"""
+Gravação assíncrona e atômica das camadas Bronze, Silver e Gold.
+
+Com config.LAYER_WRITER ativo, cada etapa do pipeline sequencial abre a sua
+camada com open_layer e entrega os arquivos ao LayerWriter em vez de
+gravá-los diretamente:
+1. open_layer remove o marcador de conclusão (config.LAYER_MARKER_FILE) e
+   temporários de execuções interrompidas: sem marcador, a camada está
+   sendo regravada;
+2. cada arquivo é serializado por um pool de config.LAYER_WRITER_THREADS
+   threads em um temporário oculto no mesmo diretório (.<nome>.<id>.tmp),
+   enquanto a etapa (e a seguinte) continua calculando;
+3. commit não bloqueia a etapa: uma thread de publicação espera os arquivos
+   da camada, renomeia cada temporário sobre o destino (os.replace, atômico
+   no mesmo sistema de arquivos) e grava o marcador com a lista de arquivos.
+   Se alguma gravação falhar, os temporários são removidos, nenhum arquivo
+   é substituído e o marcador não é gravado.
+
+Cada arquivo é substituído atomicamente, mas a camada não: os arquivos são
+renomeados um a um e, durante a publicação (ou após uma interrupção), o
+diretório mistura arquivos antigos e novos. Só o marcador indica uma camada
+completa, e os leitores devem conferi-lo (is_committed / wait) em vez de
+confiar na existência dos arquivos.
+
+As camadas são publicadas na ordem em que são confirmadas. Quem lê uma
+camada do disco chama wait(diretório) antes, que recusa camadas sem
+marcador; flush() espera todas e é
+chamado ao final do pipeline. Antes de criar pools de processos, quiesce()
+espera também as gravações já entregues às camadas ainda abertas, para
+que o fork não aconteça no meio de uma gravação. Erros de gravação são
+relançados por wait / flush (os de camadas abertas, no commit).
+
+No DAG (stages.py), os nós Silver e Gold gravam seus arquivos diretamente:
+cada nó remove o marcador antes de gravar (unpublish) e um nó
+<camada>:publish grava o marcador depois de todos eles (publish).
+
+Os DataFrames são entregues como cópias rasas (copy-on-write): a etapa
+seguinte pode alterá-los sem afetar a gravação em andamento.
+"""
+
+import json
+import os
+import threading
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import pandas as pd
+
+from . import config
+
+
+_lock = threading.Lock()
+_pools: Optional[Tuple[ThreadPoolExecutor, ThreadPoolExecutor]] = None
+# Camadas abertas (ainda recebendo arquivos) e publicações pendentes.
+_open: Dict[Path, "LayerWriter"] = {}
+_pending: Dict[Path, Future] = {}
+
+
+def parquet_options() -> dict:
+    """
+    Opções de gravação Parquet das camadas (repassadas a to_parquet).
+    """
+    options = {"compression": config.PARQUET_COMPRESSION}
+    if config.PARQUET_ROW_GROUP_SIZE is not None:
+        options["row_group_size"] = config.PARQUET_ROW_GROUP_SIZE
+    return options
+
+
+def arrow_options():
+    """
+    Opções de gravação Arrow IPC das camadas.
+    """
+    import pyarrow as pa
+
+    return pa.ipc.IpcWriteOptions(compression=config.ARROW_COMPRESSION)
+
+
+def _get_pools() -> Tuple[ThreadPoolExecutor, ThreadPoolExecutor]:
+    global _pools
+    with _lock:
+        if _pools is None:
+            _pools = (
+                ThreadPoolExecutor(
+                    max_workers=config.LAYER_WRITER_THREADS, thread_name_prefix="layer-writer"
+                ),
+                # Uma única thread de publicação: as camadas são publicadas
+                # na ordem dos commits.
+                ThreadPoolExecutor(max_workers=1, thread_name_prefix="layer-commit"),
+            )
+        return _pools
+
+
+def marker_path(directory: Path) -> Path:
+    return Path(directory) / config.LAYER_MARKER_FILE
+
+
+def is_committed(directory: Path) -> bool:
+    """
+    A camada foi publicada por completo? (sempre True sem LAYER_WRITER)
+    """
+    return not config.LAYER_WRITER or marker_path(directory).exists()
+
+
+class LayerWriter:
+    """
+    Arquivos de uma camada, gravados em segundo plano e publicados juntos.
+    """
+
+    def __init__(self, directory: Path):
+        self.directory = Path(directory)
+        self.files: List[Tuple[Path, Path, Future]] = []
+
+    @staticmethod
+    def staging_path(path: Path) -> Path:
+        path = Path(path)
+        return path.with_name(f".{path.name}.{uuid.uuid4().hex[:8]}.tmp")
+
+    def submit(self, path: Path, write: Callable[[Path], None]) -> None:
+        """
+        Agenda `write(temporário)`; o temporário vira `path` no commit.
+        """
+        tmp = self.staging_path(path)
+        pool, _ = _get_pools()
+        self.files.append((Path(path), tmp, pool.submit(write, tmp)))
+
+    def add(self, path: Path, tmp: Path) -> None:
+        """
+        Registra um temporário já gravado pela própria etapa (ex.: COPY do
+        DuckDB), publicado como `path` junto com os demais.
+        """
+        done: Future = Future()
+        done.set_result(None)
+        self.files.append((Path(path), Path(tmp), done))
+
+    def write_csv(self, df: pd.DataFrame, path: Path, **kwargs) -> None:
+        df = df.copy(deep=False)
+        self.submit(path, lambda tmp: df.to_csv(tmp, **kwargs))
+
+    def write_parquet(self, df: pd.DataFrame, path: Path, **kwargs) -> None:
+        df = df.copy(deep=False)
+        options = {**parquet_options(), **kwargs}
+        self.submit(path, lambda tmp: df.to_parquet(tmp, **options))
+
+    def commit(self) -> Future:
+        """
+        Fecha a camada e agenda a sua publicação (não bloqueia).
+        """
+        _, committer = _get_pools()
+        with _lock:
+            _open.pop(self.directory, None)
+            future = committer.submit(self._publish)
+            _pending[self.directory] = future
+        return future
+
+    def _publish(self) -> List[str]:
+        errors = [future.exception() for _, _, future in self.files]
+        errors = [e for e in errors if e is not None]
+        if errors:
+            for _, tmp, _ in self.files:
+                tmp.unlink(missing_ok=True)
+            raise errors[0]
+
+        for path, tmp, _ in self.files:
+            os.replace(tmp, path)
+
+        names = sorted(path.relative_to(self.directory).as_posix() for path, _, _ in self.files)
+        _write_marker(self.directory, names)
+        return names
+
+
+def _write_marker(directory: Path, names: List[str]) -> None:
+    marker = marker_path(directory)
+    tmp = marker.with_name(f".{marker.name}.tmp")
+    with open(tmp, "w", encoding="utf-8") as fh:
+        json.dump(
+            {"committed_at": datetime.now().isoformat(timespec="seconds"), "files": names},
+            fh,
+            indent=2,
+        )
+    os.replace(tmp, marker)
+
+
+def open_layer(directory: Path) -> LayerWriter:
+    """
+    Inicia a regravação de uma camada: espera a publicação anterior, remove
+    o marcador e temporários abandonados.
+    """
+    directory = Path(directory)
+    _wait_pending(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    marker_path(directory).unlink(missing_ok=True)
+    for tmp in directory.glob(".*.tmp"):
+        tmp.unlink(missing_ok=True)
+
+    layer = LayerWriter(directory)
+    with _lock:
+        _open[directory] = layer
+    return layer
+
+
+def unpublish(directory: Path) -> None:
+    """
+    Remove o marcador antes de regravar arquivos da camada diretamente.
+    """
+    directory = Path(directory)
+    _wait_pending(directory)
+    marker_path(directory).unlink(missing_ok=True)
+
+
+def publish(directory: Path, paths: Sequence[Path]) -> None:
+    """
+    Grava o marcador de uma camada cujos arquivos (`paths`, arquivos ou
+    diretórios) já foram gravados diretamente; lista os que existem.
+    """
+    directory = Path(directory)
+    names = []
+    for path in map(Path, paths):
+        files = path.rglob("*") if path.is_dir() else [path]
+        names += [f.relative_to(directory).as_posix() for f in files if f.is_file()]
+    _write_marker(directory, sorted(names))
+
+
+def current(directory: Path) -> Optional[LayerWriter]:
+    """
+    Camada aberta para `directory` (None se as gravações são diretas).
+    """
+    with _lock:
+        return _open.get(Path(directory))
+
+
+def _wait_pending(directory: Path) -> None:
+    with _lock:
+        future = _pending.get(directory)
+    if future is None:
+        return
+    try:
+        future.result()
+    finally:
+        with _lock:
+            if _pending.get(directory) is future:
+                del _pending[directory]
+
+
+def wait(directory: Path) -> None:
+    """
+    Espera a publicação pendente de uma camada (relança erros de gravação)
+    e confere o marcador: com LAYER_WRITER, uma camada sem marcador
+    (interrompida ou sendo regravada por outro processo) pode misturar
+    arquivos antigos e novos, e a leitura é recusada com RuntimeError. A
+    etapa que está gravando a camada (aberta neste processo) pode lê-la.
+    """
+    directory = Path(directory)
+    _wait_pending(directory)
+    if current(directory) is None and not is_committed(directory):
+        raise RuntimeError(
+            f"Camada {directory} incompleta (sem {config.LAYER_MARKER_FILE}): "
+            "execução interrompida ou em andamento; gere a camada novamente."
+        )
+
+
+def flush() -> None:
+    """
+    Espera a publicação de todas as camadas pendentes.
+    """
+    with _lock:
+        directories = list(_pending)
+    for directory in directories:
+        _wait_pending(directory)
+
+
+def quiesce() -> None:
+    """
+    Espera as gravações em andamento, inclusive as das camadas ainda
+    abertas (que continuam abertas), e as publicações pendentes. Chamado
+    antes de um fork: nenhuma thread de gravação fica no meio de uma
+    escrita.
+    """
+    with _lock:
+        futures = [future for layer in _open.values() for _, _, future in layer.files]
+    for future in futures:
+        # Erros ficam no future e são relançados pelo commit da camada.
+        future.exception()
+    flush()
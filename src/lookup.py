@@ -0,0 +1,202 @@
+"""
+Índice de consulta pontual sobre as tabelas Gold.
+
+Para cada tabela de INDEXED_TABLES, build_index grava em
+GOLD_DIR/index/<tabela>/:
+- rows.arrow    : a tabela ordenada pela chave, em Arrow IPC sem compressão
+- keys.npy      : as chaves distintas, ordenadas, como bytes de largura fixa
+- offsets.npy   : posição da primeira linha de cada chave em rows.arrow
+                  (mais uma posição final), já que uma chave pode ter várias
+                  linhas (ex.: histórico cliente x categoria)
+- _meta.json    : tamanho e mtime do CSV de origem
+
+Os três arquivos são abertos com memory-map: uma consulta faz uma busca
+binária em keys.npy e lê só as linhas da chave, sem carregar a tabela. Na
+frente do índice fica um cache LRU (LOOKUP_CACHE_SIZE chaves). Um índice
+ausente ou mais antigo que o CSV é reconstruído na abertura.
+
+    lookup.open_index("gold_product_recommendation_stats").get(product_id)
+    lookup.open_index("gold_customer_category_history").get_many(customer_ids)
+"""
+
+import json
+import shutil
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, List, Sequence
+
+import numpy as np
+import pandas as pd
+
+from . import config, layer_writer
+
+
+# tabela Gold -> coluna chave
+INDEXED_TABLES = {
+    "gold_product_recommendation_stats": "product_id",
+    "gold_customer_category_history": "customer_unique_id",
+    "gold_item_similarity": "product_id",
+    "gold_customer_recommendations": "customer_unique_id",
+}
+
+_META_FILE = "_meta.json"
+
+
+def index_dir(table: str) -> Path:
+    return config.GOLD_DIR / "index" / table
+
+
+def _source_path(table: str) -> Path:
+    return config.GOLD_DIR / f"{table}.csv"
+
+
+def _source_state(table: str) -> Dict[str, int]:
+    stat = _source_path(table).stat()
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+
+def _load_meta(table: str) -> dict:
+    meta_path = index_dir(table) / _META_FILE
+    if not meta_path.exists():
+        return {}
+    with open(meta_path, encoding="utf-8") as fh:
+        return json.load(fh)
+
+
+def _is_current(table: str) -> bool:
+    return _load_meta(table).get("source") == _source_state(table)
+
+
+def build_index(table: str) -> Path:
+    """
+    (Re)constrói o índice de uma tabela Gold a partir do seu CSV.
+    """
+    import pyarrow as pa
+
+    key = INDEXED_TABLES[table]
+    state = _source_state(table)
+    df = pd.read_csv(_source_path(table), dtype={key: str})
+    df = df[df[key].notna()]
+    # Ordenação estável: as linhas de uma mesma chave mantêm a ordem do CSV.
+    df = df.sort_values(key, kind="mergesort").reset_index(drop=True)
+
+    encoded = df[key].str.encode("utf-8")
+    width = max(int(encoded.str.len().max()), 1) if len(df) else 1
+    all_keys = encoded.to_numpy().astype(f"S{width}")
+    starts = np.flatnonzero(np.r_[True, all_keys[1:] != all_keys[:-1]]) if len(df) else []
+
+    path = index_dir(table)
+    if path.exists():
+        shutil.rmtree(path)
+    path.mkdir(parents=True)
+
+    with pa.OSFile(str(path / "rows.arrow"), "wb") as sink:
+        arrow_table = pa.Table.from_pandas(df, preserve_index=False)
+        with pa.ipc.new_file(sink, arrow_table.schema) as writer:
+            writer.write_table(arrow_table)
+    np.save(path / "keys.npy", all_keys[starts] if len(df) else all_keys)
+    np.save(path / "offsets.npy", np.r_[starts, len(df)].astype(np.int64))
+    with open(path / _META_FILE, "w", encoding="utf-8") as fh:
+        json.dump({"key": key, "rows": len(df), "source": state}, fh, indent=2)
+    return path
+
+
+def build_all() -> List[str]:
+    """
+    Constrói os índices desatualizados das tabelas Gold existentes.
+    """
+    layer_writer.wait(config.GOLD_DIR)
+    built = []
+    for table in INDEXED_TABLES:
+        if _source_path(table).exists() and not _is_current(table):
+            build_index(table)
+            built.append(table)
+    return built
+
+
+class GoldIndex:
+    def __init__(self, table: str):
+        import pyarrow as pa
+
+        path = index_dir(table)
+        self.table = table
+        self.key = INDEXED_TABLES[table]
+        self.source = _load_meta(table).get("source")
+        self.keys = np.load(path / "keys.npy", mmap_mode="r")
+        self.offsets = np.load(path / "offsets.npy", mmap_mode="r")
+        self.rows = pa.ipc.open_file(pa.memory_map(str(path / "rows.arrow"))).read_all()
+        self._cached_get = lru_cache(maxsize=config.LOOKUP_CACHE_SIZE)(self._get)
+
+    def _positions(self, keys: Sequence[str]) -> np.ndarray:
+        """
+        Índice de cada chave em keys.npy (-1 se ausente).
+        """
+        width = self.keys.dtype.itemsize
+        encoded = [str(k).encode("utf-8") for k in keys]
+        query = np.array(encoded, dtype=f"S{width}")
+        fits = np.array([len(k) <= width for k in encoded], dtype=bool)
+        pos = np.searchsorted(self.keys, query)
+        found = fits & (pos < len(self.keys))
+        found[found] = self.keys[pos[found]] == query[found]
+        return np.where(found, pos, -1)
+
+    def _row_indices(self, positions: np.ndarray) -> np.ndarray:
+        positions = positions[positions >= 0]
+        starts = np.asarray(self.offsets[positions])
+        counts = np.asarray(self.offsets[positions + 1]) - starts
+        # Concatena os intervalos [start, start + count) sem laço em Python.
+        return np.repeat(starts - np.r_[0, np.cumsum(counts)[:-1]], counts) + np.arange(counts.sum())
+
+    def _get(self, key: str) -> tuple:
+        position = self._positions([key])[0]
+        if position < 0:
+            return ()
+        start = int(self.offsets[position])
+        # As linhas de uma chave são contíguas: fatia sem cópia.
+        return tuple(self.rows.slice(start, int(self.offsets[position + 1]) - start).to_pylist())
+
+    def get(self, key: str) -> List[dict]:
+        """
+        Linhas da chave (lista vazia se a chave não existir), via cache LRU.
+        """
+        return [dict(row) for row in self._cached_get(key)]
+
+    def get_many(self, keys: Sequence[str]) -> pd.DataFrame:
+        """
+        Linhas de um lote de chaves, na ordem das chaves pedidas.
+        """
+        indices = self._row_indices(self._positions(keys))
+        return self.rows.take(indices).to_pandas()
+
+    def __contains__(self, key: str) -> bool:
+        return bool(self._positions([key])[0] >= 0)
+
+    def cache_info(self):
+        return self._cached_get.cache_info()
+
+
+_open_indexes: Dict[str, GoldIndex] = {}
+
+
+def open_index(table: str) -> GoldIndex:
+    """
+    Abre (e, se preciso, reconstrói) o índice de uma tabela Gold. Índices
+    abertos são reaproveitados enquanto o CSV de origem não mudar.
+    """
+    index = _open_indexes.get(table)
+    source = _source_state(table)
+    if index is not None and index.source == source:
+        return index
+    if _load_meta(table).get("source") != source:
+        build_index(table)
+    index = GoldIndex(table)
+    _open_indexes[table] = index
+    return index
+
+
+def product_stats(product_id: str) -> List[dict]:
+    return open_index("gold_product_recommendation_stats").get(product_id)
+
+
+def customer_category_history(customer_unique_id: str) -> List[dict]:
+    return open_index("gold_customer_category_history").get(customer_unique_id)
@@ -0,0 +1,409 @@
+"""
+Métricas estruturadas por etapa do pipeline e ganchos de profiling.
+
+Cada etapa (Bronze, limpeza de cada tabela Silver, cada métrica Gold,
+recomendação, visualizações, nós do DAG) roda dentro de stage(nome), que
+registra um StageRecord com:
+- wall_s / cpu_s     : tempo de parede e tempo de CPU do processo
+- peak_rss_mb        : pico de memória residente durante a etapa (Linux:
+                       o pico do processo, VmHWM, é zerado na entrada da
+                       etapa via /proc/self/clear_refs; None onde não há
+                       como zerá-lo)
+- process_peak_rss_mb: pico de memória residente do processo desde o
+                       início, ao fim da etapa
+- rows_in / rows_out : linhas dos DataFrames de entrada e de saída
+- bytes_written      : bytes dos arquivos de `writes` criados ou alterados
+- extra              : contadores anotados pela própria etapa (annotate)
+
+Etapas aninhadas (ex.: gold -> gold:category_analysis) guardam o nome da
+etapa externa em `parent`. Ao final de cada execução do pipeline,
+write_report grava GOLD_DIR/<RUN_REPORT_FILE> com todas as etapas.
+
+Profiling opcional (config.PROFILER), restrito a PROFILE_STAGES:
+- "cprofile"    : GOLD_DIR/profiles/<etapa>.prof para cada etapa que não
+                  esteja aninhada em outra já perfilada na mesma thread
+- "tracemalloc" : pico de memória alocada durante a etapa (peak_traced_mb)
+                  e os maiores pontos de alocação ainda vivos ao final
+
+cpu_s, peak_rss_mb e tracemalloc medem o processo inteiro: com etapas em
+paralelo (DAG), incluem o trabalho das etapas concorrentes.
+"""
+
+import cProfile
+import json
+import platform
+import threading
+import time
+import tracemalloc
+import uuid
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence
+
+import pandas as pd
+
+from . import config
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+# Parâmetros de config copiados para o relatório de cada execução.
+REPORTED_PARAMS = [
+    "BRONZE_FORMAT",
+    "STREAMING_INGESTION",
+    "INCREMENTAL_INGESTION",
+    "PARALLEL_INGESTION",
+    "SILVER_COMPACT_DTYPES",
+    "SILVER_ARROW_KERNELS",
+    "SILVER_PARTITIONED",
+    "GOLD_ENGINE",
+    "PARALLEL_GOLD",
+    "INCREMENTAL_GOLD",
+    "DISTINCT_COUNT_MODE",
+    "OLAP_CUBE",
+    "DAG_PIPELINE",
+    "GOLD_RECOMMENDATIONS",
+    "GOLD_LOOKUP_INDEX",
+    "QUALITY_CHECKS",
+    "PROFILER",
+]
+
+
+@dataclass
+class StageRecord:
+    name: str
+    parent: Optional[str] = None
+    thread: str = ""
+    started_at: str = ""
+    status: str = "ok"
+    wall_s: float = 0.0
+    cpu_s: float = 0.0
+    peak_rss_mb: Optional[float] = None
+    process_peak_rss_mb: Optional[float] = None
+    peak_traced_mb: Optional[float] = None
+    rows_in: Optional[int] = None
+    rows_out: Optional[int] = None
+    bytes_written: int = 0
+    profile: Optional[str] = None
+    top_allocations: List[dict] = field(default_factory=list)
+    extra: Dict[str, Any] = field(default_factory=dict)
+
+
+_lock = threading.Lock()
+_local = threading.local()
+_records: List[StageRecord] = []
+_run: Dict[str, Any] = {}
+# Etapas em execução (todas as threads), que acumulam o pico de memória
+# residente antes de cada reinício do VmHWM.
+_open_records: List[StageRecord] = []
+# Maior VmHWM lido antes de um reinício: o pico do processo não se perde.
+_process_peak_mb = 0.0
+
+
+def profile_dir() -> Path:
+    return config.GOLD_DIR / "profiles"
+
+
+def report_path() -> Path:
+    return config.GOLD_DIR / config.RUN_REPORT_FILE
+
+
+def peak_rss_mb() -> Optional[float]:
+    """
+    Pico de memória residente do processo (None sem o módulo resource).
+    """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss vem em KiB no Linux e em bytes no macOS.
+    peak = round(peak / (1 << 20) if platform.system() == "Darwin" else peak / (1 << 10), 1)
+    # No Linux, ru_maxrss também é zerado a cada reinício do VmHWM.
+    return max(peak, _process_peak_mb)
+
+
+def _hwm_mb() -> Optional[float]:
+    """
+    Pico de memória residente desde o último reinício (VmHWM, Linux).
+    """
+    try:
+        with open("/proc/self/status", encoding="ascii") as fh:
+            for line in fh:
+                if line.startswith("VmHWM:"):
+                    return round(int(line.split()[1]) / (1 << 10), 1)
+    except OSError:
+        pass
+    return None
+
+
+def _reset_hwm() -> bool:
+    """
+    Reinicia o VmHWM na memória residente atual (False se não for possível).
+    """
+    try:
+        with open("/proc/self/clear_refs", "w", encoding="ascii") as fh:
+            fh.write("5")
+    except OSError:
+        return False
+    return True
+
+
+def _enter_rss(record: StageRecord) -> None:
+    # Chamado com _lock: o pico até aqui pertence às etapas já abertas, e
+    # o VmHWM é reiniciado para a nova etapa.
+    global _process_peak_mb
+    hwm = _hwm_mb()
+    if hwm is not None:
+        _process_peak_mb = max(_process_peak_mb, hwm)
+    if hwm is not None and _reset_hwm():
+        for other in _open_records:
+            other.peak_rss_mb = max(other.peak_rss_mb or 0.0, hwm)
+        record.peak_rss_mb = _hwm_mb()
+    _open_records.append(record)
+
+
+def _exit_rss(record: StageRecord) -> None:
+    # Chamado com _lock.
+    _open_records.remove(record)
+    if record.peak_rss_mb is not None:
+        record.peak_rss_mb = max(record.peak_rss_mb, _hwm_mb() or 0.0)
+    record.process_peak_rss_mb = peak_rss_mb()
+
+
+def count_rows(value: Any) -> Optional[int]:
+    """
+    Linhas de um DataFrame / Series ou de uma coleção deles (None se não
+    houver nenhum). Coleções lidas sob demanda (ingestion.BronzeTables)
+    informam as linhas em n_rows, sem carregar as tabelas.
+    """
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        return len(value)
+    if hasattr(value, "n_rows"):
+        return value.n_rows
+    if isinstance(value, dict):
+        value = list(value.values())
+    if isinstance(value, (list, tuple)):
+        counts = [c for c in (count_rows(v) for v in value) if c is not None]
+        return sum(counts) if counts else None
+    return None
+
+
+def _file_states(paths: Sequence[Path]) -> Dict[Path, tuple]:
+    states = {}
+    for path in map(Path, paths):
+        files = path.rglob("*") if path.is_dir() else [path]
+        for file in files:
+            try:
+                stat = file.stat()
+            except FileNotFoundError:
+                continue
+            if file.is_file():
+                states[file] = (stat.st_size, stat.st_mtime_ns)
+    return states
+
+
+def _bytes_written(before: Dict[Path, tuple], paths: Sequence[Path]) -> int:
+    return sum(
+        state[0]
+        for file, state in _file_states(paths).items()
+        if before.get(file) != state
+    )
+
+
+def _stack() -> List[StageRecord]:
+    if not hasattr(_local, "stack"):
+        _local.stack = []
+        _local.profiling = False
+    return _local.stack
+
+
+def _wants_profile(name: str) -> bool:
+    return config.PROFILER is not None and (
+        config.PROFILE_STAGES is None or name in config.PROFILE_STAGES
+    )
+
+
+def _traced_peak_mb() -> float:
+    return round(tracemalloc.get_traced_memory()[1] / (1 << 20), 2)
+
+
+def _top_allocations() -> List[dict]:
+    statistics = tracemalloc.take_snapshot().statistics("lineno")
+    return [
+        {
+            "where": f"{stat.traceback[0].filename}:{stat.traceback[0].lineno}",
+            "size_kb": round(stat.size / 1024, 1),
+            "count": stat.count,
+        }
+        for stat in statistics[: config.PROFILE_TOP_ALLOCATIONS]
+    ]
+
+
+@contextmanager
+def stage(
+    name: str,
+    writes: Sequence[Path] = (),
+    rows_in: Optional[int] = None,
+) -> Iterator[StageRecord]:
+    """
+    Mede o bloco como a etapa `name`. O registro é devolvido para que a
+    etapa informe rows_out (e rows_in, se não foi passado):
+
+        with metrics.stage("gold:orders_by_month", writes=[path]) as record:
+            monthly = orders_by_month(df_orders)
+            monthly.to_csv(path, index=False)
+            record.rows_out = len(monthly)
+    """
+    stack = _stack()
+    record = StageRecord(
+        name=name,
+        parent=stack[-1].name if stack else None,
+        thread=threading.current_thread().name,
+        started_at=datetime.now().isoformat(timespec="milliseconds"),
+        rows_in=rows_in,
+    )
+    before = _file_states(writes)
+
+    profiler = None
+    if config.PROFILER == "cprofile" and _wants_profile(name) and not _local.profiling:
+        profiler = cProfile.Profile()
+        _local.profiling = True
+
+    started_tracing = False
+    if config.PROFILER == "tracemalloc":
+        if not tracemalloc.is_tracing() and _wants_profile(name):
+            tracemalloc.start()
+            started_tracing = True
+        elif tracemalloc.is_tracing():
+            if stack:
+                # O pico até aqui pertence à etapa externa.
+                stack[-1].peak_traced_mb = max(stack[-1].peak_traced_mb or 0.0, _traced_peak_mb())
+            tracemalloc.reset_peak()
+
+    stack.append(record)
+    with _lock:
+        _enter_rss(record)
+    wall_start, cpu_start = time.perf_counter(), time.process_time()
+    if profiler is not None:
+        profiler.enable()
+    try:
+        yield record
+    except BaseException:
+        record.status = "failed"
+        raise
+    finally:
+        if profiler is not None:
+            profiler.disable()
+        record.wall_s = round(time.perf_counter() - wall_start, 4)
+        record.cpu_s = round(time.process_time() - cpu_start, 4)
+        stack.pop()
+
+        if profiler is not None:
+            _local.profiling = False
+            profile_dir().mkdir(parents=True, exist_ok=True)
+            path = profile_dir() / f"{name.replace(':', '__')}.prof"
+            profiler.dump_stats(str(path))
+            record.profile = str(path)
+
+        if tracemalloc.is_tracing() and config.PROFILER == "tracemalloc":
+            record.peak_traced_mb = max(record.peak_traced_mb or 0.0, _traced_peak_mb())
+            if stack:
+                stack[-1].peak_traced_mb = max(
+                    stack[-1].peak_traced_mb or 0.0, record.peak_traced_mb
+                )
+            if started_tracing:
+                record.top_allocations = _top_allocations()
+                tracemalloc.stop()
+
+        record.bytes_written = _bytes_written(before, writes)
+        with _lock:
+            _exit_rss(record)
+            _records.append(record)
+
+
+def call(name: str, func: Callable[..., Any], *args, writes: Sequence[Path] = (), **kwargs) -> Any:
+    """
+    Executa func(*args, **kwargs) como a etapa `name`, contando as linhas
+    dos DataFrames recebidos e devolvidos.
+    """
+    with stage(name, writes=writes, rows_in=count_rows(args)) as record:
+        result = func(*args, **kwargs)
+        record.rows_out = count_rows(result)
+    return result
+
+
+def annotate(**values: Any) -> None:
+    """
+    Acrescenta contadores à etapa em execução na thread atual.
+    """
+    stack = _stack()
+    if stack:
+        stack[-1].extra.update(values)
+
+
+def skipped(name: str) -> None:
+    """
+    Registra uma etapa pulada (ex.: nó do DAG com cache válido).
+    """
+    record = StageRecord(
+        name=name,
+        thread=threading.current_thread().name,
+        started_at=datetime.now().isoformat(timespec="milliseconds"),
+        status="cached",
+    )
+    with _lock:
+        _records.append(record)
+
+
+def start_run() -> None:
+    """
+    Inicia uma nova execução, descartando os registros anteriores.
+    """
+    with _lock:
+        _records.clear()
+        _run.clear()
+        _run.update(
+            run_id=uuid.uuid4().hex[:12],
+            started_at=datetime.now().isoformat(timespec="seconds"),
+            start=time.perf_counter(),
+        )
+
+
+def records() -> List[StageRecord]:
+    with _lock:
+        return list(_records)
+
+
+def to_frame() -> pd.DataFrame:
+    """
+    Registros da execução atual como DataFrame (uma linha por etapa).
+    """
+    return pd.DataFrame([asdict(record) for record in records()])
+
+
+def write_report() -> Path:
+    """
+    Grava o relatório JSON da execução atual ao lado das saídas Gold.
+    """
+    if not _run:
+        start_run()
+    report = {
+        "run_id": _run["run_id"],
+        "started_at": _run["started_at"],
+        "finished_at": datetime.now().isoformat(timespec="seconds"),
+        "wall_s": round(time.perf_counter() - _run["start"], 4),
+        "peak_rss_mb": peak_rss_mb(),
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "config": {name: getattr(config, name) for name in REPORTED_PARAMS},
+        "stages": [asdict(record) for record in records()],
+    }
+    path = report_path()
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as fh:
+        json.dump(report, fh, indent=2, default=str)
+    return path
@@ -0,0 +1,293 @@
+"""
+Modo micro-batch: mantém a Gold atualizada com arquivos novos de pedidos e
+itens de pedido, sem reprocessar o histórico.
+
+Arquivos <tabela>*.csv colocados em config.INBOX_DIR (ex.:
+orders_2018-09-01T10.csv, order_items_2018-09-01T10.csv; tabelas aceitas em
+config.MICROBATCH_KEYS) são processados a cada ciclo:
+1. Bronze : as linhas são acrescentadas ao arquivo Bronze da fonte
+            (ingestion.append_bronze)
+2. Silver : só as linhas novas passam pela limpeza da transformação; linhas
+            com chaves já presentes na Silver (ou repetidas no lote) são
+            descartadas e as demais acrescentadas ao CSV, ao Parquet e, com
+            SILVER_PARTITIONED, às partições
+3. Gold   : os meses de compra afetados são recalculados nos parciais de
+            gold_incremental.py, lendo da Silver só os pedidos desses meses,
+            e as tabelas combináveis são republicadas (recomendação por
+            produto, histórico cliente x categoria, pedidos por mês, ticket
+            por região, receita por categoria); pedidos por ano e por status
+            são somados aos CSVs existentes
+
+Os arquivos processados vão para INBOX_DIR/processed. O modo parte de uma
+execução batch completa (Bronze, Silver e Gold gravadas); as tabelas que não
+se combinam por mês (tabela fato, histograma de preços, recomendações,
+índices de consulta, figuras) são atualizadas na próxima execução batch,
+que relê a Bronze com as linhas acrescentadas.
+
+Quem grava na caixa de entrada deve criar o arquivo com outro nome (ex.:
+.tmp) e renomeá-lo ao final, para que um ciclo não leia um arquivo pela
+metade. Se um ciclo falhar, os arquivos ficam na caixa de entrada e são
+reprocessados no ciclo seguinte: a Silver descarta as chaves já aplicadas
+e linhas repetidas na Bronze são removidas pela limpeza do batch.
+
+    python -m src.microbatch              # observa a caixa de entrada
+    python -m src.microbatch --once       # um único ciclo
+"""
+
+import argparse
+import shutil
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import pandas as pd
+
+from . import (
+    config,
+    data_sources,
+    gold_incremental,
+    gold_metrics,
+    ingestion,
+    silver_store,
+    transformation,
+)
+
+
+def inbox_dir() -> Path:
+    return config.INBOX_DIR
+
+
+def processed_dir() -> Path:
+    return config.INBOX_DIR / "processed"
+
+
+def _table_for(path: Path) -> Optional[str]:
+    # Prefixo mais longo primeiro, caso uma tabela seja prefixo de outra.
+    for table in sorted(config.MICROBATCH_KEYS, key=len, reverse=True):
+        if path.name.startswith(table):
+            return table
+    return None
+
+
+def pending_files() -> Dict[str, List[Path]]:
+    """
+    Arquivos da caixa de entrada por tabela, na ordem de MICROBATCH_KEYS.
+    """
+    files: Dict[str, List[Path]] = {table: [] for table in config.MICROBATCH_KEYS}
+    if not inbox_dir().exists():
+        return {}
+    for path in sorted(inbox_dir().glob("*.csv")):
+        table = _table_for(path)
+        if table is not None:
+            files[table].append(path)
+    return {table: paths for table, paths in files.items() if paths}
+
+
+def _read_inbox(src: data_sources.DataSource, paths: List[Path]) -> pd.DataFrame:
+    df = pd.concat(
+        [pd.read_csv(path, dtype=src.dtypes or None) for path in paths], ignore_index=True
+    )
+    missing = set(ingestion.bronze_columns(src)) - set(df.columns)
+    if missing:
+        raise ValueError(f"Colunas ausentes nos arquivos de {src.table}: {sorted(missing)}")
+    return df
+
+
+def _order_months() -> pd.DataFrame:
+    return silver_store.read_silver("orders", columns=["order_id", "order_purchase_year_month"])
+
+
+def _new_rows(table: str, df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Linhas limpas cujas chaves ainda não estão na Silver (a primeira de
+    cada chave repetida no lote).
+    """
+    keys = config.MICROBATCH_KEYS[table]
+    df = df.dropna(subset=keys).drop_duplicates(subset=keys)
+    if df.empty:
+        return df
+    existing = silver_store.read_silver(
+        table, columns=keys, filters={keys[0]: list(df[keys[0]].unique())}
+    )
+    seen = pd.MultiIndex.from_frame(df[keys]).isin(pd.MultiIndex.from_frame(existing[keys]))
+    return df[~seen]
+
+
+def _read_months(months: List[str], order_months: pd.DataFrame) -> Dict[str, pd.DataFrame]:
+    """
+    Silver restrita aos pedidos dos meses indicados (colunas da Gold), com
+    os clientes e produtos referenciados.
+    """
+    order_ids = order_months.loc[
+        order_months["order_purchase_year_month"].astype(str).isin(months), "order_id"
+    ]
+    columns = gold_metrics.SILVER_COLUMNS
+    orders = silver_store.read_silver(
+        "orders", columns=columns["orders"], filters={"order_id": list(order_ids)}
+    )
+    items = silver_store.read_silver(
+        "order_items", columns=columns["order_items"], filters={"order_id": list(order_ids)}
+    )
+    customers = silver_store.read_silver(
+        "customers",
+        columns=gold_metrics.FACT_CUSTOMERS_COLUMNS,
+        filters={"customer_id": list(orders["customer_id"].dropna().unique())},
+    )
+    products = silver_store.read_silver(
+        "products",
+        columns=gold_metrics.FACT_PRODUCTS_COLUMNS,
+        filters={"product_id": list(items["product_id"].dropna().unique())},
+    )
+    return {"customers": customers, "orders": orders, "order_items": items, "products": products}
+
+
+def _add_counts(path: Path, key: str, count: str, new: pd.Series) -> pd.DataFrame:
+    existing = pd.read_csv(path)
+    totals = pd.concat([existing.set_index(key)[count], new]).groupby(level=0).sum()
+    return pd.DataFrame({key: totals.index, count: totals.to_numpy()})
+
+
+def _update_order_counts(new_orders: pd.DataFrame) -> None:
+    """
+    Soma os pedidos novos às contagens por ano e por status já publicadas.
+    """
+    yearly_path = config.GOLD_DIR / "gold_orders_by_year.csv"
+    if yearly_path.exists() and "order_purchase_year" in new_orders.columns:
+        years = new_orders["order_purchase_year"].dropna().astype(int).value_counts()
+        yearly = _add_counts(yearly_path, "year", "order_count", years).sort_values("year")
+        yearly["year"] = yearly["year"].astype(int)
+        yearly.to_csv(yearly_path, index=False)
+
+    status_path = config.GOLD_DIR / "gold_order_status_distribution.csv"
+    if status_path.exists() and "order_status" in new_orders.columns:
+        status = _add_counts(
+            status_path, "status", "count", new_orders["order_status"].value_counts()
+        )
+        status.sort_values("count", ascending=False, kind="stable").to_csv(
+            status_path, index=False
+        )
+
+
+def _refresh_gold(months: List[str], order_months: pd.DataFrame) -> None:
+    if not gold_incremental.has_partials():
+        print("Parciais da Gold inexistentes: calculando todas as partições")
+        dfs = silver_store.load_silver(gold_metrics.SILVER_COLUMNS)
+        gold_incremental.update_partials(gold_metrics.build_fact_table(dfs), dfs["orders"])
+    else:
+        dfs = _read_months(months, order_months)
+        gold_incremental.refresh_partitions(
+            gold_metrics.build_fact_table(dfs), dfs["orders"], months
+        )
+
+    tables = gold_incremental.merge_partials()
+    product_stats = tables["product_recommendation_stats"]
+
+    def gold_file(name: str) -> Path:
+        return config.GOLD_DIR / name
+
+    product_stats.to_csv(gold_file("gold_product_recommendation_stats.csv"), index=False)
+    tables["customer_category_history"].to_csv(
+        gold_file("gold_customer_category_history.csv"), index=False
+    )
+    tables["orders_by_month"].to_csv(gold_file("gold_orders_by_month.csv"), index=False)
+    if not product_stats.empty:
+        gold_metrics.revenue_by_category(product_stats).to_csv(
+            gold_file("gold_revenue_by_category.csv")
+        )
+        tables["avg_ticket_by_region"].to_csv(gold_file("gold_avg_ticket_by_region.csv"))
+
+
+def run_cycle() -> Dict[str, int]:
+    """
+    Processa os arquivos pendentes da caixa de entrada. Retorna as linhas
+    novas acrescentadas à Silver por tabela (vazio se não havia arquivos).
+    """
+    files = pending_files()
+    if not files:
+        return {}
+
+    start = time.perf_counter()
+    batch_id = datetime.now().strftime("%Y%m%dT%H%M%S%f")
+    sources = {src.table: src for src in data_sources.get_data_sources()}
+    print(f"\n=== MICRO-BATCH {batch_id} ===")
+
+    new_orders = pd.DataFrame()
+    touched_ids = []
+    appended: Dict[str, int] = {}
+    for table, paths in files.items():
+        src = sources[table]
+        df = _read_inbox(src, paths)
+        ingestion.append_bronze(src, df)
+
+        new = _new_rows(table, transformation.SILVER_CLEANERS[table](df))
+        if not new.empty:
+            transformation.append_silver_table(table, new)
+            if config.SILVER_PARTITIONED:
+                silver_store.append_partitioned(table, new, _order_months(), batch_id)
+        if table == "orders":
+            new_orders = new
+        touched_ids.append(new["order_id"])
+
+        appended[table] = len(new)
+        print(
+            f"  {src.name:<12}: {len(paths)} arquivo(s), {len(df)} linhas, "
+            f"{len(new)} novas na Silver"
+        )
+
+    order_months = _order_months()
+    touched = order_months["order_id"].isin(pd.concat(touched_ids))
+    months = sorted(
+        order_months.loc[touched, "order_purchase_year_month"].astype(str).unique()
+    )
+
+    if sum(appended.values()) > 0:
+        _refresh_gold(months, order_months)
+        _update_order_counts(new_orders)
+        print(f"  Gold: {len(months)} mês(es) recalculado(s): {', '.join(months)}")
+
+    processed_dir().mkdir(parents=True, exist_ok=True)
+    for paths in files.values():
+        for path in paths:
+            shutil.move(str(path), processed_dir() / f"{batch_id}-{path.name}")
+
+    print(f"  Ciclo concluído em {time.perf_counter() - start:.2f}s")
+    return appended
+
+
+def watch(interval: Optional[float] = None, max_cycles: Optional[int] = None) -> None:
+    """
+    Verifica a caixa de entrada a cada `interval` segundos (padrão:
+    MICROBATCH_INTERVAL_SECONDS) até Ctrl+C ou `max_cycles` verificações.
+    """
+    interval = config.MICROBATCH_INTERVAL_SECONDS if interval is None else interval
+    print(f"=== MICRO-BATCH - observando {inbox_dir()} a cada {interval:g}s ===")
+    inbox_dir().mkdir(parents=True, exist_ok=True)
+
+    cycles = 0
+    try:
+        while True:
+            run_cycle()
+            cycles += 1
+            if max_cycles is not None and cycles >= max_cycles:
+                break
+            time.sleep(interval)
+    except KeyboardInterrupt:
+        print("\nMicro-batch interrompido.")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Micro-batch de pedidos da caixa de entrada.")
+    parser.add_argument("--once", action="store_true", help="executa um único ciclo")
+    parser.add_argument("--interval", type=float, default=None, help="segundos entre ciclos")
+    parser.add_argument("--max-cycles", type=int, default=None)
+    args = parser.parse_args()
+
+    if args.once:
+        run_cycle()
+    else:
+        watch(args.interval, args.max_cycles)
+
+
+if __name__ == "__main__":
+    main()
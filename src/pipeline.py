@@ -9,43 +9,189 @@ Etapas:
 4. Carregamento -> salva Silver e Gold
 5. Destino -> arquivos CSV/Parquet em /dados/{bronze,silver,gold}
                + notebooks / dashboards que consomem essas camadas
+
+Cada etapa é medida por metrics.py; o relatório da execução fica em
+/dados/gold/run_report.json.
+
+Com config.LAYER_WRITER, a gravação de cada camada (layer_writer.py)
+continua em segundo plano durante a etapa seguinte; o pipeline espera a
+publicação de todas as camadas antes do relatório.
 """
 
 from datetime import datetime
+from typing import Dict, Iterable, List, Mapping, Optional, Sequence, Tuple
 
-from . import ingestion, transformation, gold_metrics, data_sources, config, visualizations
+import pandas as pd
 
+from . import ingestion, transformation, gold_metrics, data_sources, config, layer_writer, metrics
 
-def run_full_pipeline() -> None:
+
+# Etapas executáveis isoladamente (cli.py), na ordem do pipeline. Cada uma
+# lê a camada anterior persistida quando a etapa anterior não rodou antes
+# na mesma chamada. visualizations (matplotlib / seaborn), recommendation
+# (scipy), lookup e o DAG só são importados pelas etapas que os usam.
+STAGES = ["ingest", "silver", "gold", "viz"]
+
+
+def run_stages(targets: Optional[Iterable[str]] = None, force: Sequence[str] = ()) -> None:
     """
-    Executa o pipeline completo de ponta a ponta.
+    Executa apenas as etapas `targets` do DAG (e as que elas dependem),
+    reaproveitando o cache; `force` reexecuta etapas mesmo com cache válido.
+    Ex.: run_stages(["gold:product_stats"], force=["gold:product_stats"])
     """
-    print("=================================================================")
-    print("  OLIST E-COMMERCE DATA PIPELINE  (BRONZE / SILVER / GOLD)")
-    print("=================================================================\n")
+    from . import dag, stages
+
+    config.ensure_dirs()
+    metrics.start_run()
+    dag.run(stages.build_nodes(), targets=targets, force=force)
+    print(f"Relatório da execução: {metrics.write_report()}")
 
-    print("Etapa 1 - Fontes de Dados (Data Sources)")
-    data_sources.describe_sources()
 
+def _ingest() -> Mapping[str, pd.DataFrame]:
     print("Etapa 2 - Ingestão (Ingestion) - Batch -> Bronze")
-    dfs_bronze = ingestion.ingest_bronze()
+    return metrics.call("bronze", ingestion.ingest_bronze, writes=[config.BRONZE_DIR])
 
+
+def _silver(
+    dfs_bronze: Optional[Mapping[str, pd.DataFrame]] = None
+) -> Dict[str, pd.DataFrame]:
     print("\nEtapa 3 - Transformação (Transformation) -> Silver")
-    dfs_silver = transformation.transform_to_silver(dfs_bronze)
+    if dfs_bronze is None:
+        dfs_bronze = ingestion.load_bronze()
+    return metrics.call(
+        "silver", transformation.transform_to_silver, dfs_bronze,
+        writes=[config.SILVER_DIR],
+    )
+
 
+def _gold(
+    dfs_silver: Optional[Dict[str, pd.DataFrame]] = None
+) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Tabelas Gold (e, se configurados, recomendações e índices de consulta).
+    Sem `dfs_silver`, a Silver é lida dos arquivos Parquet.
+    """
     print("\nEtapa 4 & 5 - Carregamento + Destino (Loading + Destination) -> Gold")
-    products_by_category, customers_by_region, product_reco_stats = gold_metrics.build_gold_tables(
-        dfs_silver
+    products_by_category, customers_by_region, product_reco_stats = metrics.call(
+        "gold", gold_metrics.build_gold_tables, dfs_silver, writes=[config.GOLD_DIR]
     )
 
+    if config.GOLD_RECOMMENDATIONS and not product_reco_stats.empty:
+        from . import recommendation
+
+        print("\nRecomendações item-item:")
+        metrics.call(
+            "gold:recommendations",
+            recommendation.save_recommendations,
+            writes=[
+                config.GOLD_DIR / "gold_item_similarity.csv",
+                config.GOLD_DIR / "gold_customer_recommendations.csv",
+            ],
+        )
+
+    if config.GOLD_LOOKUP_INDEX:
+        from . import lookup
+
+        built = metrics.call(
+            "gold:lookup_index", lookup.build_all, writes=[config.GOLD_DIR / "index"]
+        )
+        print(f"\nÍndices de consulta reconstruídos: {', '.join(built) or 'nenhum'}")
+
+    return products_by_category, product_reco_stats
+
+
+def _viz() -> Dict[str, object]:
+    from . import visualizations
+
     print("\nEtapa 6 - Visualizações (dashboards e gráficos)")
-    figure_paths = visualizations.generate_all_visualizations(
-        dfs_silver,
-        products_by_category,
-        customers_by_region,
-        product_reco_stats,
+    return metrics.call(
+        "visualizations",
+        visualizations.generate_all_visualizations,
+        writes=[config.GOLD_DIR / "figures"],
     )
 
+
+def select_stages(
+    only: Sequence[str] = (),
+    first: Optional[str] = None,
+    last: Optional[str] = None,
+) -> List[str]:
+    """
+    Etapas a executar, na ordem do pipeline: as listadas em `only` ou o
+    intervalo de `first` a `last` (todas, por padrão).
+    """
+    unknown = [stage for stage in [*only, first, last] if stage and stage not in STAGES]
+    if unknown:
+        raise ValueError(f"Etapas desconhecidas: {unknown} (use {STAGES})")
+    if only:
+        return [stage for stage in STAGES if stage in only]
+    start = STAGES.index(first) if first else 0
+    end = STAGES.index(last) if last else len(STAGES) - 1
+    if start > end:
+        raise ValueError(f"Intervalo de etapas vazio: {first} -> {last}")
+    return STAGES[start:end + 1]
+
+
+def run_pipeline_stages(selected: Sequence[str]) -> None:
+    """
+    Executa apenas as etapas `selected` (ver STAGES). Uma etapa recebe em
+    memória o resultado da anterior quando as duas rodam juntas; caso
+    contrário, lê a camada anterior já gravada.
+    Ex.: run_pipeline_stages(["gold", "viz"])
+    """
+    selected = select_stages(only=selected)
+    config.ensure_dirs()
+    metrics.start_run()
+
+    dfs_bronze = dfs_silver = None
+    if "ingest" in selected:
+        dfs_bronze = _ingest()
+    if "silver" in selected:
+        dfs_silver = _silver(dfs_bronze)
+    if "gold" in selected:
+        _gold(dfs_silver)
+    if "viz" in selected:
+        _viz()
+    layer_writer.flush()
+
+    print(f"\nEtapas executadas: {', '.join(selected)}")
+    print(f"Relatório da execução: {metrics.write_report()}")
+
+
+def run_full_pipeline() -> None:
+    """
+    Executa o pipeline completo de ponta a ponta.
+    """
+    print("=================================================================")
+    print("  OLIST E-COMMERCE DATA PIPELINE  (BRONZE / SILVER / GOLD)")
+    print("=================================================================\n")
+
+    config.ensure_dirs()
+    metrics.start_run()
+
+    print("Etapa 1 - Fontes de Dados (Data Sources)")
+    data_sources.describe_sources()
+
+    if config.DAG_PIPELINE:
+        from . import dag, stages
+
+        print(f"Etapas 2 a 6 - DAG de etapas ({config.DAG_WORKERS} workers)\n")
+        results = dag.run(
+            stages.build_nodes(),
+            collect=["gold:category_analysis", "gold:product_stats", "figures"],
+        )
+        products_by_category = results["gold:category_analysis"]
+        product_reco_stats = results["gold:product_stats"]
+        figure_paths = results["figures"]
+    else:
+        dfs_bronze = _ingest()
+        dfs_silver = _silver(dfs_bronze)
+        products_by_category, product_reco_stats = _gold(dfs_silver)
+        figure_paths = _viz()
+    layer_writer.flush()
+
+    report_path = metrics.write_report()
+
     print("\n================= PIPELINE SUMMARY =================")
     print(f"Execution timestamp : {datetime.now().isoformat(timespec='seconds')}")
     print(f"Bronze dir          : {config.BRONZE_DIR}")
@@ -61,6 +207,11 @@ def run_full_pipeline() -> None:
     print("  - gold_order_status_distribution.csv")
     print("  - gold_avg_ticket_by_region.csv")
     print("  - gold_top_insights.csv")
+    print("  - gold_orders_by_year.csv")
+    print("  - gold_products_numeric_corr.csv")
+    print("  - gold_price_histogram.csv / gold_price_summary.csv")
+    print("  - gold_fact_order_items.parquet (tabela fato)")
+    print(f"Run report          : {report_path}")
     print("Figures (visualizations):")
     for name, path in figure_paths.items():
         print(f"  - {name}: {path}")
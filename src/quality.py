@@ -0,0 +1,209 @@
+"""
+Validação de qualidade e integridade referencial da camada Silver.
+
+As regras são declaradas em cada DataSource (data_sources.Rule): não nulo,
+unicidade, domínio de valores, valor mínimo, chave estrangeira e ordem entre
+timestamps. Cada tabela é percorrida uma vez: cada regra vira uma máscara
+booleana vetorizada (isna, duplicated, isin contra o conjunto de chaves da
+tabela pai, comparações de colunas) e as máscaras são combinadas para contar
+as linhas com alguma violação.
+
+Com config.QUALITY_SAMPLE_ROWS, tabelas maiores que o limite são avaliadas
+em uma amostra aleatória fixa (QUALITY_SAMPLE_SEED); os conjuntos de chaves
+das tabelas pai continuam completos. Na amostra, "unique" só encontra
+repetições dentro da própria amostra.
+
+O resultado (uma linha por regra, mais o total por tabela) é gravado em
+SILVER_DIR/<QUALITY_REPORT_FILE> (com config.LAYER_WRITER, publicado junto
+com a Silver).
+"""
+
+from typing import Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+from . import config, data_sources, derived, layer_writer, metrics
+from .data_sources import Rule
+
+
+REPORT_COLUMNS = [
+    "table",
+    "rule",
+    "column",
+    "arg",
+    "severity",
+    "checked_rows",
+    "failed_rows",
+    "failed_pct",
+    "sampled",
+    "examples",
+]
+
+_EXAMPLES = 3
+
+
+def report_path():
+    return config.SILVER_DIR / config.QUALITY_REPORT_FILE
+
+
+def _as_datetime(values: pd.Series) -> pd.Series:
+    if pd.api.types.is_datetime64_any_dtype(values):
+        return values
+    return derived.parse_timestamp(values.where(values != ""))
+
+
+class _KeySets:
+    """
+    Conjuntos de chaves das tabelas pai, construídos uma vez por validação.
+    """
+
+    def __init__(self, dfs: Dict[str, pd.DataFrame]):
+        self.dfs = dfs
+        self.cache: Dict[str, Optional[pd.Index]] = {}
+
+    def get(self, reference: str) -> Optional[pd.Index]:
+        if reference not in self.cache:
+            table, column = reference.split(".", 1)
+            df = self.dfs.get(table)
+            if df is None or column not in df.columns:
+                self.cache[reference] = None
+            else:
+                self.cache[reference] = pd.Index(df[column].dropna().unique())
+        return self.cache[reference]
+
+
+def _violations(df: pd.DataFrame, rule: Rule, keys: _KeySets) -> Optional[np.ndarray]:
+    """
+    Máscara das linhas que violam a regra (None se a regra não se aplica).
+    """
+    if rule.column not in df.columns:
+        return None
+    values = df[rule.column]
+
+    if rule.kind == "not_null":
+        mask = values.isna()
+    elif rule.kind == "unique":
+        mask = values.duplicated() & values.notna()
+    elif rule.kind == "domain":
+        mask = values.notna() & ~values.isin(rule.arg)
+    elif rule.kind == "min":
+        mask = values < rule.arg
+    elif rule.kind == "foreign_key":
+        parent = keys.get(rule.arg)
+        if parent is None:
+            return None
+        mask = values.notna() & ~values.isin(parent)
+    elif rule.kind == "ordered":
+        if rule.arg not in df.columns:
+            return None
+        # NaT nas comparações dá False: pares incompletos não são violação.
+        mask = _as_datetime(df[rule.arg]) < _as_datetime(values)
+    else:
+        raise ValueError(f"Tipo de regra desconhecido: {rule.kind!r}")
+
+    return np.asarray(mask, dtype=bool)
+
+
+def _sample(df: pd.DataFrame) -> pd.DataFrame:
+    limit = config.QUALITY_SAMPLE_ROWS
+    if limit is None or len(df) <= limit:
+        return df
+    return df.sample(n=limit, random_state=config.QUALITY_SAMPLE_SEED)
+
+
+def validate(dfs: Dict[str, pd.DataFrame]) -> pd.DataFrame:
+    """
+    Avalia as regras de todas as fontes sobre os DataFrames Silver e devolve
+    o relatório (colunas REPORT_COLUMNS).
+    """
+    keys = _KeySets(dfs)
+    rows = []
+    for src in data_sources.get_data_sources():
+        df = dfs.get(src.table)
+        if df is None or not src.rules:
+            continue
+        sample = _sample(df)
+        sampled = len(sample) < len(df)
+        checked = len(sample)
+
+        any_error = np.zeros(checked, dtype=bool)
+        for rule in src.rules:
+            mask = _violations(sample, rule, keys)
+            if mask is None:
+                continue
+            if rule.severity == "error":
+                any_error |= mask
+            failed = int(mask.sum())
+            examples = sample.loc[mask, rule.column].astype(str).unique()[:_EXAMPLES]
+            rows.append(
+                {
+                    "table": src.table,
+                    "rule": rule.kind,
+                    "column": rule.column,
+                    "arg": "" if isinstance(rule.arg, list) or rule.arg is None else rule.arg,
+                    "severity": rule.severity,
+                    "checked_rows": checked,
+                    "failed_rows": failed,
+                    "failed_pct": round(100 * failed / checked, 4) if checked else 0.0,
+                    "sampled": sampled,
+                    "examples": "; ".join(examples),
+                }
+            )
+
+        failed = int(any_error.sum())
+        rows.append(
+            {
+                "table": src.table,
+                "rule": "any_error",
+                "column": "",
+                "arg": "",
+                "severity": "error",
+                "checked_rows": checked,
+                "failed_rows": failed,
+                "failed_pct": round(100 * failed / checked, 4) if checked else 0.0,
+                "sampled": sampled,
+                "examples": "",
+            }
+        )
+    return pd.DataFrame(rows, columns=REPORT_COLUMNS)
+
+
+def validate_silver(dfs: Dict[str, pd.DataFrame]) -> pd.DataFrame:
+    """
+    Valida a Silver, grava o relatório e resume as falhas. Com
+    config.QUALITY_FAIL_ON_ERROR, falhas de regras "error" interrompem o
+    pipeline (ValueError).
+    """
+    report = validate(dfs)
+    path = report_path()
+    rules = report[report["rule"] != "any_error"]
+    failing = rules[rules["failed_rows"] > 0]
+    errors = failing[failing["severity"] == "error"]
+    fail = config.QUALITY_FAIL_ON_ERROR and not errors.empty
+
+    # Com LAYER_WRITER, o relatório é publicado com a Silver. Se a validação
+    # interrompe o pipeline, a camada não é publicada: o relatório é gravado
+    # direto, para que as falhas possam ser consultadas.
+    layer = layer_writer.current(path.parent)
+    if layer is not None and not fail:
+        layer.write_csv(report, path, index=False)
+    else:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        report.to_csv(path, index=False)
+    metrics.annotate(rules_checked=len(rules), rules_failed=len(failing))
+
+    print(f"\nQualidade da Silver: {len(rules) - len(failing)} de {len(rules)} regras sem falhas")
+    for row in failing.itertuples():
+        target = f" -> {row.arg}" if row.arg != "" else ""
+        print(
+            f"  [{row.severity.upper()}] {row.table}.{row.column} {row.rule}{target}: "
+            f"{row.failed_rows} linhas ({row.failed_pct:.2f}%)"
+        )
+    print(f"Relatório de qualidade: {path}")
+
+    if fail:
+        raise ValueError(
+            f"{len(errors)} regras de qualidade com falhas na Silver (ver {path})"
+        )
+    return report
@@ -0,0 +1,300 @@
+"""
+Recomendação item-item por co-compra, construída sobre a camada Gold.
+
+- Matriz esparsa cliente x produto (compras entregues da tabela fato) e
+  cliente x categoria (gold_customer_category_history)
+- Similaridade de cosseno item-item via produto de matrizes esparsas,
+  mantendo só os RECO_NEIGHBORS vizinhos mais similares de cada produto
+- recommend(customer_ids, k) pontua um lote inteiro de clientes com um
+  único produto esparso (histórico do lote x similaridades)
+
+Quando o histórico não gera k candidatos (cold start), a lista é completada
+com os produtos mais populares (total_orders de
+gold_product_recommendation_stats), primeiro da categoria preferida do
+cliente e depois do catálogo todo. Produtos já comprados nunca são
+recomendados.
+"""
+
+from typing import List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+from . import compact, config, gold_metrics
+
+
+# Faixas de pontuação: item-item > popularidade na categoria > popularidade
+# geral. Dentro de cada faixa, a pontuação ordena os candidatos.
+_ITEM_ITEM_OFFSET = 2.0
+_CATEGORY_OFFSET = 1.0
+
+_SOURCES = ["popularity", "category_popularity", "item_item"]
+
+
+def _top_k_per_row(matrix: sparse.csr_matrix, k: int) -> sparse.csr_matrix:
+    """
+    Mantém as k maiores entradas de cada linha (empates pela menor coluna).
+    """
+    matrix = matrix.tocsr()
+    matrix.sum_duplicates()
+    rows = np.repeat(np.arange(matrix.shape[0]), np.diff(matrix.indptr))
+    order = np.lexsort((matrix.indices, -matrix.data, rows))
+    rank = np.arange(len(order)) - matrix.indptr[rows[order]]
+    keep = order[rank < k]
+    return sparse.csr_matrix(
+        (matrix.data[keep], (rows[keep], matrix.indices[keep])), shape=matrix.shape
+    )
+
+
+def _binary_matrix(rows: np.ndarray, cols: np.ndarray, shape) -> sparse.csr_matrix:
+    matrix = sparse.csr_matrix((np.ones(len(rows), dtype=np.float32), (rows, cols)), shape=shape)
+    matrix.data[:] = 1.0
+    return matrix
+
+
+class ItemItemRecommender:
+    def __init__(self, neighbors: Optional[int] = None):
+        self.neighbors = neighbors or config.RECO_NEIGHBORS
+
+    def fit(
+        self,
+        fact: pd.DataFrame,
+        category_history: pd.DataFrame,
+        product_stats: pd.DataFrame,
+    ) -> "ItemItemRecommender":
+        """
+        Constrói as matrizes de interação e a similaridade item-item.
+        """
+        columns = [
+            c for c in ["customer_unique_id", "product_id", "product_category_name"]
+            if c in fact.columns
+        ]
+        fact = compact.decode_keys(
+            fact.loc[fact["order_status"] == "delivered", columns].dropna(
+                subset=["customer_unique_id", "product_id"]
+            )
+        )
+
+        self.items = pd.Index(
+            pd.concat([product_stats["product_id"], fact["product_id"]]).unique()
+        )
+        self.customers = pd.Index(
+            pd.concat(
+                [fact["customer_unique_id"], category_history["customer_unique_id"]]
+            ).unique()
+        )
+        self.categories = pd.Index(product_stats["product_category_name"].dropna().unique())
+
+        self.purchases = _binary_matrix(
+            self.customers.get_indexer(fact["customer_unique_id"]),
+            self.items.get_indexer(fact["product_id"]),
+            (len(self.customers), len(self.items)),
+        )
+
+        history = category_history[
+            category_history["product_category_name"].isin(self.categories)
+        ]
+        self.category_affinity = sparse.csr_matrix(
+            (
+                history["orders"].to_numpy(dtype=np.float32),
+                (
+                    self.customers.get_indexer(history["customer_unique_id"]),
+                    self.categories.get_indexer(history["product_category_name"]),
+                ),
+            ),
+            shape=(len(self.customers), len(self.categories)),
+        )
+
+        # Cosseno entre colunas: normaliza cada produto pela raiz do nº de
+        # compradores e multiplica a matriz transposta por ela mesma.
+        buyers = np.asarray(self.purchases.sum(axis=0)).ravel()
+        scale = np.zeros_like(buyers)
+        np.divide(1.0, np.sqrt(buyers), out=scale, where=buyers > 0)
+        normalized = self.purchases @ sparse.diags(scale)
+        similarity = (normalized.T @ normalized).tocsr()
+        similarity.setdiag(0)
+        similarity.eliminate_zeros()
+        self.similarity = _top_k_per_row(similarity, self.neighbors)
+
+        self._fit_popularity(product_stats)
+        if "product_category_name" in fact.columns:
+            # Produtos fora das estatísticas herdam a categoria da tabela fato.
+            missing = self.item_category < 0
+            categories = (
+                fact.drop_duplicates("product_id")
+                .set_index("product_id")["product_category_name"]
+                .reindex(self.items[missing])
+            )
+            self.item_category[missing] = self.categories.get_indexer(categories)
+        return self
+
+    def _fit_popularity(self, product_stats: pd.DataFrame) -> None:
+        ranked = product_stats.sort_values(
+            ["total_orders", "product_id"], ascending=[False, True]
+        )
+        self.popular = self.items.get_indexer(ranked["product_id"])
+        category = self.categories.get_indexer(ranked["product_category_name"])
+        self.item_category = np.full(len(self.items), -1, dtype=np.int64)
+        self.item_category[self.popular] = category
+        # Produtos de cada categoria, do mais ao menos popular.
+        self.popular_by_category = [
+            self.popular[category == i] for i in range(len(self.categories))
+        ]
+
+    def _fallback(self, top_category: np.ndarray, depth: int) -> sparse.csr_matrix:
+        """
+        Candidatos de popularidade para cada linha do lote: os `depth` mais
+        populares da categoria preferida (faixa 1-2) e do catálogo (faixa 0-1).
+        """
+        n_rows = len(top_category)
+        shape = (n_rows, len(self.items))
+
+        items = self.popular[:depth]
+        scores = 1.0 - (np.arange(len(items)) + 1) / (len(items) + 1)
+        candidates = sparse.csr_matrix(
+            (
+                np.tile(scores, n_rows),
+                (np.repeat(np.arange(n_rows), len(items)), np.tile(items, n_rows)),
+            ),
+            shape=shape,
+        )
+
+        row_idx, col_idx, data = [], [], []
+        for category in np.unique(top_category[top_category >= 0]):
+            members = np.flatnonzero(top_category == category)
+            items = self.popular_by_category[category][:depth]
+            scores = _CATEGORY_OFFSET + 1.0 - (np.arange(len(items)) + 1) / (len(items) + 1)
+            row_idx.append(np.repeat(members, len(items)))
+            col_idx.append(np.tile(items, len(members)))
+            data.append(np.tile(scores, len(members)))
+
+        if row_idx:
+            by_category = sparse.csr_matrix(
+                (np.concatenate(data), (np.concatenate(row_idx), np.concatenate(col_idx))),
+                shape=shape,
+            )
+            # Produto presente nas duas listas fica com a faixa da categoria.
+            candidates = candidates.maximum(by_category)
+        return candidates
+
+    def recommend(self, customer_ids: Sequence[str], k: Optional[int] = None) -> pd.DataFrame:
+        """
+        Top-k produtos para cada cliente (customer_unique_id) do lote.
+
+        Retorna um DataFrame (customer_unique_id, rank, product_id,
+        product_category_name, score, source) ordenado por cliente e rank.
+        """
+        k = k or config.RECO_TOP_K
+        customer_ids = pd.Index(customer_ids)
+        rows = self.customers.get_indexer(customer_ids)
+        known = rows >= 0
+        n_rows = len(rows)
+
+        history = sparse.csr_matrix((n_rows, len(self.items)), dtype=np.float32)
+        affinity = sparse.csr_matrix((n_rows, len(self.categories)), dtype=np.float32)
+        if known.any():
+            selector = sparse.csr_matrix(
+                (np.ones(known.sum(), dtype=np.float32), (np.flatnonzero(known), rows[known])),
+                shape=(n_rows, len(self.customers)),
+            )
+            history = selector @ self.purchases
+            affinity = selector @ self.category_affinity
+
+        item_scores = (history @ self.similarity).tocsr()
+        item_scores.data += _ITEM_ITEM_OFFSET
+
+        top_category = np.full(n_rows, -1, dtype=np.int64)
+        has_history = np.diff(affinity.indptr) > 0
+        if has_history.any():
+            top_category[has_history] = np.asarray(
+                affinity[has_history].argmax(axis=1)
+            ).ravel()
+
+        depth = k + int(np.diff(history.indptr).max(initial=0))
+        fallback = self._fallback(top_category, depth)
+
+        # Para cada par (cliente, produto) vale a maior faixa disponível.
+        scores = item_scores.maximum(fallback).tocsr()
+        scores = scores - scores.multiply(history > 0)
+        scores.eliminate_zeros()
+        scores = _top_k_per_row(scores, k).tocoo()
+
+        order = np.lexsort((scores.col, -scores.data, scores.row))
+        row, col, data = scores.row[order], scores.col[order], scores.data[order]
+        band = np.floor(data).astype(np.int64).clip(0, 2)
+
+        result = pd.DataFrame(
+            {
+                "customer_unique_id": customer_ids.to_numpy()[row],
+                "rank": np.arange(len(row)) - np.searchsorted(row, row) + 1,
+                "product_id": self.items.to_numpy()[col],
+                # Índice -1 (produto sem categoria) cai no NaN do final.
+                "product_category_name": np.append(
+                    self.categories.to_numpy(dtype=object), np.nan
+                )[self.item_category[col]],
+                "score": np.where(band == 2, data - _ITEM_ITEM_OFFSET, data - band),
+                "source": np.array(_SOURCES, dtype=object)[band],
+            }
+        )
+        return result
+
+    def similar_items(self, product_ids: Sequence[str], k: Optional[int] = None) -> pd.DataFrame:
+        """
+        Vizinhos mais similares de cada produto (product_id, rank,
+        similar_product_id, similarity).
+        """
+        k = k or self.neighbors
+        product_ids = pd.Index(product_ids)
+        rows = self.items.get_indexer(product_ids)
+        known = np.flatnonzero(rows >= 0)
+        neighbors = _top_k_per_row(self.similarity[rows[known]], k).tocoo()
+        order = np.lexsort((neighbors.col, -neighbors.data, neighbors.row))
+        row, col = neighbors.row[order], neighbors.col[order]
+        return pd.DataFrame(
+            {
+                "product_id": product_ids.to_numpy()[known][row],
+                "rank": np.arange(len(row)) - np.searchsorted(row, row) + 1,
+                "similar_product_id": self.items.to_numpy()[col],
+                "similarity": neighbors.data[order],
+            }
+        )
+
+
+def from_gold() -> ItemItemRecommender:
+    """
+    Treina o recomendador a partir da Gold persistida (tabela fato,
+    histórico cliente x categoria e estatísticas de produto).
+    """
+    fact = gold_metrics.load_fact_table(
+        columns=["customer_unique_id", "product_id", "product_category_name", "order_status"]
+    )
+    category_history = pd.read_csv(config.GOLD_DIR / "gold_customer_category_history.csv")
+    product_stats = pd.read_csv(config.GOLD_DIR / "gold_product_recommendation_stats.csv")
+    return ItemItemRecommender().fit(fact, category_history, product_stats)
+
+
+def save_recommendations(customer_ids: Optional[List[str]] = None) -> None:
+    """
+    Gera as tabelas Gold de recomendação em lotes de RECO_BATCH_SIZE clientes:
+    gold_item_similarity.csv e gold_customer_recommendations.csv.
+    """
+    recommender = from_gold()
+    if customer_ids is None:
+        customer_ids = list(recommender.customers)
+
+    recommender.similar_items(recommender.items).to_csv(
+        config.GOLD_DIR / "gold_item_similarity.csv", index=False
+    )
+    print("  - gold_item_similarity.csv")
+
+    batches = [
+        recommender.recommend(customer_ids[start:start + config.RECO_BATCH_SIZE])
+        for start in range(0, len(customer_ids), config.RECO_BATCH_SIZE)
+    ]
+    recommendations = pd.concat(batches, ignore_index=True) if batches else pd.DataFrame()
+    recommendations.to_csv(config.GOLD_DIR / "gold_customer_recommendations.csv", index=False)
+    print(
+        f"  - gold_customer_recommendations.csv "
+        f"({len(customer_ids)} clientes, top {config.RECO_TOP_K})"
+    )
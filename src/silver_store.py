@@ -0,0 +1,173 @@
+"""
+Silver particionada (estilo hive) e leitura com pushdown de filtros e colunas.
+
+Com config.SILVER_PARTITIONED ativo, além dos arquivos monolíticos
+(SILVER_DIR/<tabela>_silver.parquet), cada tabela de SILVER_PARTITION_BY é
+gravada em SILVER_DIR/partitioned/<tabela>/<coluna>=<valor>/*.parquet:
+- orders e order_items por year_month (mês de compra do pedido)
+- customers por customer_state
+
+read_silver lê só as colunas pedidas e, com filtros sobre a coluna de
+partição, só os diretórios das partições selecionadas. Exemplo:
+
+    read_silver("order_items", columns=["product_id", "price"],
+                filters={"year_month": ["2018-01", "2018-02"]})
+"""
+
+import shutil
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import pandas as pd
+
+from . import config, layer_writer
+
+
+def partitioned_path(table: str) -> Path:
+    return config.SILVER_DIR / "partitioned" / table
+
+
+def monolithic_path(table: str) -> Path:
+    return config.SILVER_DIR / f"{table}_silver.parquet"
+
+
+def remove_partitioned(table: Optional[str] = None) -> None:
+    """
+    Remove a Silver particionada de `table` (de todas as tabelas, se None).
+    Chamado quando a Silver é gravada sem SILVER_PARTITIONED: a versão
+    particionada de uma execução anterior não seria mais atualizada.
+    """
+    path = partitioned_path(table) if table else config.SILVER_DIR / "partitioned"
+    if path.exists():
+        shutil.rmtree(path)
+
+
+def _purchase_year_month(table: str, dfs_silver: Dict[str, pd.DataFrame]) -> pd.Series:
+    """
+    Mês de compra como texto (AAAA-MM); itens herdam o mês do seu pedido.
+    """
+    orders = dfs_silver["orders"]
+    year_month = orders["order_purchase_year_month"].astype(str).where(
+        orders["order_purchase_year_month"].notna()
+    )
+    if table == "orders":
+        return year_month
+    by_order = pd.Series(year_month.to_numpy(), index=orders["order_id"].to_numpy())
+    by_order = by_order[~by_order.index.duplicated()]
+    return dfs_silver[table]["order_id"].map(by_order)
+
+
+def write_partitioned(dfs_silver: Dict[str, pd.DataFrame]) -> None:
+    """
+    Grava as tabelas de config.SILVER_PARTITION_BY particionadas, substituindo
+    a versão anterior de cada tabela.
+    """
+    for table, column in config.SILVER_PARTITION_BY.items():
+        df = dfs_silver.get(table)
+        if df is None:
+            continue
+        if column == "year_month":
+            if "order_purchase_year_month" not in dfs_silver["orders"].columns:
+                print(f"[WARNING] Sem mês de compra; {table} não foi particionada.")
+                continue
+            df = df.assign(year_month=_purchase_year_month(table, dfs_silver).to_numpy())
+        elif column not in df.columns:
+            print(f"[WARNING] Coluna {column} ausente; {table} não foi particionada.")
+            continue
+
+        path = partitioned_path(table)
+        if path.exists():
+            shutil.rmtree(path)
+        try:
+            df.to_parquet(path, partition_cols=[column], index=False)
+        except Exception as e:
+            print(f"[WARNING] Failed to save partitioned {table} Silver (pyarrow not installed?).")
+            print(e)
+            continue
+        print(f"  - {table}: {df[column].nunique(dropna=False)} partições por {column}")
+
+
+def append_partitioned(
+    table: str, df: pd.DataFrame, orders: pd.DataFrame, batch_id: str
+) -> None:
+    """
+    Acrescenta linhas a uma tabela já particionada por year_month. `orders`
+    (order_id e order_purchase_year_month, incluindo os pedidos anteriores)
+    define o mês dos itens. Cada partição recebe um arquivo novo
+    (<batch_id>-<n>.parquet), sem regravar os anteriores.
+    """
+    column = config.SILVER_PARTITION_BY.get(table)
+    path = partitioned_path(table)
+    if column != "year_month" or df.empty or not path.exists():
+        return
+    dfs = {"orders": df if table == "orders" else orders, table: df}
+    df.assign(year_month=_purchase_year_month(table, dfs).to_numpy()).to_parquet(
+        path,
+        partition_cols=[column],
+        index=False,
+        basename_template=f"{batch_id}-{{i}}.parquet",
+    )
+
+
+def _to_filters(filters: Optional[Dict[str, Any]]) -> Optional[List[tuple]]:
+    if not filters:
+        return None
+    return [
+        (column, "in", list(value)) if isinstance(value, (list, tuple, set))
+        else (column, "=", value)
+        for column, value in filters.items()
+    ]
+
+
+def _source(table: str, filters: Optional[Dict[str, Any]]) -> Path:
+    # A versão particionada só compensa quando há filtros (poda de partições);
+    # sem filtros, o arquivo monolítico preserva a ordem original das linhas.
+    # Sem SILVER_PARTITIONED, as partições não acompanham a Silver (ex.: o
+    # micro-batch não as atualiza) e não são lidas.
+    if filters and config.SILVER_PARTITIONED and partitioned_path(table).exists():
+        return partitioned_path(table)
+    return monolithic_path(table)
+
+
+def silver_columns(table: str, partitioned: bool = False) -> List[str]:
+    """
+    Colunas disponíveis de uma tabela Silver, sem ler os dados.
+    """
+    layer_writer.wait(config.SILVER_DIR)
+    import pyarrow.dataset as ds
+
+    if partitioned:
+        dataset = ds.dataset(partitioned_path(table), format="parquet", partitioning="hive")
+    else:
+        dataset = ds.dataset(monolithic_path(table), format="parquet")
+    return [name for name in dataset.schema.names if not name.startswith("__")]
+
+
+def read_silver(
+    table: str,
+    columns: Optional[List[str]] = None,
+    filters: Optional[Dict[str, Any]] = None,
+) -> pd.DataFrame:
+    """
+    Lê uma tabela Silver com pushdown de colunas e filtros.
+
+    `filters` mapeia coluna -> valor ou lista de valores (igualdade / "in").
+    Colunas pedidas que não existem na tabela são ignoradas.
+    """
+    layer_writer.wait(config.SILVER_DIR)
+    path = _source(table, filters)
+    if columns is not None:
+        available = silver_columns(table, partitioned=path != monolithic_path(table))
+        columns = [c for c in columns if c in available]
+    return pd.read_parquet(path, columns=columns, filters=_to_filters(filters))
+
+
+def load_silver(columns: Optional[Dict[str, List[str]]] = None) -> Dict[str, pd.DataFrame]:
+    """
+    Lê as quatro tabelas Silver, opcionalmente só com as colunas indicadas.
+    """
+    columns = columns or {}
+    return {
+        table: read_silver(table, columns=columns.get(table))
+        for table in ["customers", "orders", "order_items", "products"]
+    }
@@ -0,0 +1,191 @@
+"""
+Junções à esquerda particionadas com spill em disco (grace hash join).
+
+Usado por gold_metrics.build_fact_table quando a estimativa da junção em
+memória passa de config.FACT_JOIN_MEMORY_MB. Em cada etapa da cadeia de
+junções, os dois lados são particionados pelo hash da chave em arquivos
+Parquet temporários e unidos partição a partição; o resultado de cada
+partição já sai particionado pela chave da etapa seguinte. Só uma partição
+de cada lado fica em memória por vez.
+
+Cada linha carrega a posição de origem em cada tabela (_row_<n>). A
+tabela final é montada coluna a coluna, na ordem lexicográfica dessas
+posições, que é a ordem produzida pelas junções em memória (linhas da
+esquerda na ordem original e, para chaves repetidas à direita, na ordem
+da direita); o resultado é idêntico ao dos merges encadeados.
+"""
+
+import math
+import tempfile
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+
+_HASH_CHUNK_ROWS = 100_000
+
+# Arquivos temporários, lidos uma única vez: sem compressão nem
+# estatísticas, que só custariam tempo de escrita (os dicionários ficam:
+# preservam as colunas category).
+_SPILL_OPTIONS = {"compression": None, "write_statistics": False}
+
+
+def frame_mb(df: pd.DataFrame) -> float:
+    return df.memory_usage(deep=True, index=False).sum() / (1 << 20)
+
+
+def estimate_join_mb(left: pd.DataFrame, rights: List[Tuple[pd.DataFrame, str]]) -> float:
+    """
+    Estimativa de memória dos merges encadeados: cada linha da esquerda
+    recebe as colunas de cada tabela da direita (chaves únicas), e dois
+    resultados intermediários desse tamanho coexistem.
+    """
+    if left.empty:
+        return 0.0
+    row_mb = frame_mb(left) / len(left)
+    for right, key in rights:
+        if len(right) > 0:
+            row_mb += frame_mb(right.drop(columns=key)) / len(right)
+    return 2 * row_mb * len(left)
+
+
+def n_partitions_for(estimate_mb: float, budget_mb: float) -> int:
+    """
+    Partições necessárias para que cada uma caiba no orçamento.
+    """
+    return max(2, math.ceil(estimate_mb / budget_mb))
+
+
+def _partition_ids(df: pd.DataFrame, key: str, n_partitions: int) -> np.ndarray:
+    # Em blocos: o hash de colunas de texto materializa os valores como
+    # objetos Python, o que dobraria a memória da coluna inteira.
+    ids = np.empty(len(df), dtype=np.int64)
+    for start in range(0, len(df), _HASH_CHUNK_ROWS):
+        values = df[key].iloc[start:start + _HASH_CHUNK_ROWS]
+        hashes = pd.util.hash_pandas_object(values, index=False).to_numpy()
+        ids[start:start + len(values)] = hashes % np.uint64(n_partitions)
+    return ids
+
+
+def _spill(
+    df: pd.DataFrame,
+    key: str,
+    n_partitions: int,
+    directory: Path,
+    tag: str,
+    row_column: Optional[str] = None,
+) -> Dict[int, Path]:
+    """
+    Grava as linhas de `df` em um arquivo por partição não vazia
+    (directory/part-<p>/<tag>.parquet). Com `row_column`, cada partição
+    recebe também a posição de origem das linhas (sem copiar `df` inteiro).
+    """
+    ids = _partition_ids(df, key, n_partitions)
+    files = {}
+    for p in np.unique(ids):
+        rows = np.flatnonzero(ids == p)
+        part = df.iloc[rows]
+        if row_column is not None:
+            part = part.assign(**{row_column: rows})
+        path = directory / f"part-{p}" / f"{tag}.parquet"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        part.to_parquet(path, index=False, **_SPILL_OPTIONS)
+        files[int(p)] = path
+    return files
+
+
+def _release_arrow_memory() -> None:
+    # O pool do Arrow guarda a memória liberada para reuso; devolvê-la ao
+    # sistema mantém o pico perto do tamanho das partições.
+    import pyarrow as pa
+
+    pa.default_memory_pool().release_unused()
+
+
+def _read(paths: List[Path]) -> pd.DataFrame:
+    return pd.concat([pd.read_parquet(path) for path in paths], ignore_index=True)
+
+
+def _assemble(paths: List[Path], columns: List[str], order_columns: List[str]) -> pd.DataFrame:
+    """
+    Monta o resultado final coluna a coluna na ordem das posições de origem.
+    """
+    if not paths:
+        return pd.DataFrame(columns=columns)
+    positions = pd.concat(
+        [pd.read_parquet(path, columns=order_columns) for path in paths], ignore_index=True
+    )
+    order = np.lexsort(
+        [positions[c].to_numpy(dtype=float, na_value=np.nan) for c in reversed(order_columns)]
+    )
+    del positions
+
+    result = {}
+    for column in columns:
+        values = pd.concat(
+            [pd.read_parquet(path, columns=[column])[column] for path in paths],
+            ignore_index=True,
+        )
+        result[column] = values.take(order).reset_index(drop=True)
+        del values
+        _release_arrow_memory()
+    return pd.DataFrame(result, copy=False)
+
+
+def partitioned_left_join(
+    left: pd.DataFrame,
+    rights: List[Tuple[pd.DataFrame, str]],
+    n_partitions: int,
+    spill_dir: Optional[Path] = None,
+) -> pd.DataFrame:
+    """
+    Equivalente a left.merge(r1, on=k1, how="left").merge(r2, on=k2, ...)
+    para rights = [(r1, k1), (r2, k2), ...], com no máximo uma partição de
+    cada lado em memória por vez.
+    """
+    order_columns = [f"_row_{i}" for i in range(len(rights) + 1)]
+    columns = list(left.columns) + [
+        c for right, key in rights for c in right.columns if c != key
+    ]
+
+    with tempfile.TemporaryDirectory(prefix="fact_spill_", dir=spill_dir) as tmp:
+        tmp = Path(tmp)
+        left_files = {
+            p: [path]
+            for p, path in _spill(
+                left, rights[0][1], n_partitions, tmp / "left_0", "0", order_columns[0]
+            ).items()
+        }
+
+        for step, (right, key) in enumerate(rights, start=1):
+            right_files = _spill(
+                right, key, n_partitions, tmp / f"right_{step}", "0", order_columns[step]
+            )
+            right_template = right.iloc[:0].assign(**{order_columns[step]: np.arange(0)})
+
+            next_key = rights[step][1] if step < len(rights) else None
+            next_files: Dict[int, List[Path]] = {}
+            for p in range(n_partitions):
+                if p not in left_files:
+                    continue
+                right_part = (
+                    pd.read_parquet(right_files[p]) if p in right_files else right_template
+                )
+                joined = _read(left_files[p]).merge(right_part, on=key, how="left")
+                if next_key is None:
+                    path = tmp / "result" / f"part-{p}.parquet"
+                    path.parent.mkdir(parents=True, exist_ok=True)
+                    joined.to_parquet(path, index=False, **_SPILL_OPTIONS)
+                    next_files[p] = [path]
+                else:
+                    spilled = _spill(joined, next_key, n_partitions, tmp / f"left_{step}", str(p))
+                    for q, path in spilled.items():
+                        next_files.setdefault(q, []).append(path)
+                del joined, right_part
+                _release_arrow_memory()
+            left_files = next_files
+
+        paths = [path for p in sorted(left_files) for path in left_files[p]]
+        return _assemble(paths, columns, order_columns)
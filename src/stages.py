@@ -0,0 +1,465 @@
+"""
+Etapas do pipeline descritas como nós do DAG (dag.py).
+
+- bronze              : ingestão de todas as fontes (ingestion.ingest_bronze);
+                        entrega a cada tabela só um BronzeTables que a lê do
+                        disco, e não os DataFrames (que iriam para o cache)
+- silver:<tabela>     : leitura da própria tabela Bronze, limpeza e gravação
+                        de cada tabela Silver, em paralelo
+- silver:quality      : validação de qualidade (com QUALITY_CHECKS)
+- silver:partitioned  : Silver particionada (com SILVER_PARTITIONED)
+- silver:compact      : representação compacta (com SILVER_COMPACT_DTYPES)
+- silver:publish      : marcador de conclusão da Silver (com LAYER_WRITER)
+- gold:<métrica>      : uma tabela Gold por nó, em paralelo (motor pandas)
+- gold:publish        : marcador de conclusão da Gold (com LAYER_WRITER; no
+                        gold:all, build_gold_tables publica a camada)
+- gold:recommendations: recomendação item-item (com GOLD_RECOMMENDATIONS)
+- gold:lookup_index   : índices de consulta pontual (com GOLD_LOOKUP_INDEX)
+- visualizations      : figuras a partir da Gold persistida
+
+recommendation, lookup e visualizations são importados só quando o nó roda.
+
+Com o motor DuckDB, Gold incremental, contagens HLL ou o cubo OLAP, a Gold
+roda em um único nó (gold:all) via gold_metrics.build_gold_tables, pois
+esses modos mantêm estado compartilhado entre as tabelas (conexão,
+parciais, sketches, cubo).
+"""
+
+from pathlib import Path
+from typing import Callable, Dict, List, Sequence
+
+import pandas as pd
+
+from . import (
+    compact,
+    config,
+    data_sources,
+    gold_metrics,
+    ingestion,
+    layer_writer,
+    quality,
+    silver_store,
+    transformation,
+)
+from .dag import Node
+
+
+SILVER_TABLES = ["customers", "orders", "order_items", "products"]
+
+# Parâmetros de config que alteram o conteúdo das saídas de cada camada.
+BRONZE_PARAMS = ["BRONZE_FORMAT", "STREAMING_INGESTION"]
+GOLD_PARAMS = [
+    "GOLD_ENGINE",
+    "INCREMENTAL_GOLD",
+    "DISTINCT_COUNT_MODE",
+    "HLL_PRECISION",
+    "OLAP_CUBE",
+]
+
+
+def _gold_file(name: str) -> Path:
+    return config.GOLD_DIR / name
+
+
+def _bronze_node() -> Node:
+    sources = data_sources.get_data_sources()
+
+    def run():
+        tables = ingestion.ingest_bronze()
+        if isinstance(tables, ingestion.BronzeTables):
+            rows = tables.rows
+        else:
+            rows = {table: len(df) for table, df in tables.items()}
+        # Saídas leves (e baratas no cache do DAG): cada nó silver:<tabela>
+        # lê só a sua tabela.
+        return tuple(
+            ingestion.BronzeTables([src], {src.table: rows[src.table]}) for src in sources
+        )
+
+    return Node(
+        name="bronze",
+        func=run,
+        outputs=[f"bronze:{src.table}" for src in sources],
+        files=[config.DATA_DIR / src.file_name for src in sources],
+        params=BRONZE_PARAMS,
+        writes=[ingestion.bronze_path(src) for src in sources],
+    )
+
+
+def _silver_node(table: str) -> Node:
+    clean = transformation.SILVER_CLEANERS[table]
+
+    def run(bronze: ingestion.BronzeTables) -> pd.DataFrame:
+        df = clean(bronze[table])
+        transformation.save_silver_table(table, df)
+        if not config.SILVER_PARTITIONED:
+            silver_store.remove_partitioned(table)
+        print(f"  {table:<12}: {df.shape}")
+        return df
+
+    return Node(
+        name=f"silver:{table}",
+        func=run,
+        inputs=[f"bronze:{table}"],
+        outputs=[f"silver:{table}"],
+        # Ao desligar SILVER_PARTITIONED o nó roda de novo e remove as
+        # partições antigas da tabela.
+        params=["SILVER_PARTITIONED"],
+        writes=[
+            transformation.silver_path(table),
+            transformation.silver_path(table, "parquet"),
+        ],
+    )
+
+
+def _partitioned_node() -> Node:
+    def run(*dfs: pd.DataFrame):
+        silver_store.write_partitioned(dict(zip(SILVER_TABLES, dfs)))
+
+    return Node(
+        name="silver:partitioned",
+        func=run,
+        inputs=[f"silver:{table}" for table in SILVER_TABLES],
+        outputs=["silver:partitioned"],
+        params=["SILVER_PARTITION_BY"],
+        writes=[silver_store.partitioned_path(table) for table in config.SILVER_PARTITION_BY],
+    )
+
+
+def _quality_node() -> Node:
+    def run(*dfs: pd.DataFrame):
+        quality.validate_silver(dict(zip(SILVER_TABLES, dfs)))
+
+    return Node(
+        name="silver:quality",
+        func=run,
+        inputs=[f"silver:{table}" for table in SILVER_TABLES],
+        outputs=["silver:quality"],
+        params=["QUALITY_SAMPLE_ROWS", "QUALITY_SAMPLE_SEED", "QUALITY_FAIL_ON_ERROR"],
+        writes=[quality.report_path()],
+    )
+
+
+def _publish_node(layer: str, directory: Path, writers: List[Node]) -> Node:
+    """
+    Com LAYER_WRITER, os nós `writers` gravam a camada diretamente: cada um
+    remove o marcador de conclusão antes de gravar, e o nó <camada>:publish
+    o grava depois de todos (sempre executado, já que é barato).
+    """
+    for node in writers:
+        node.func = _unpublishing(node.func, directory)
+    files = [path for node in writers for path in node.writes]
+
+    def run(*_) -> None:
+        layer_writer.publish(directory, files)
+
+    return Node(
+        name=f"{layer}:publish",
+        func=run,
+        inputs=[artifact for node in writers for artifact in node.outputs],
+        outputs=[f"{layer}:published"],
+        cache=False,
+    )
+
+
+def _unpublishing(func: Callable, directory: Path) -> Callable:
+    def run(*args):
+        layer_writer.unpublish(directory)
+        return func(*args)
+
+    return run
+
+
+def _compact_node() -> Node:
+    def run(*dfs: pd.DataFrame):
+        compacted = compact.compact_silver(dict(zip(SILVER_TABLES, dfs)))
+        return tuple(compacted[table] for table in SILVER_TABLES)
+
+    return Node(
+        name="silver:compact",
+        func=run,
+        inputs=[f"silver:{table}" for table in SILVER_TABLES],
+        outputs=[f"compact:{table}" for table in SILVER_TABLES],
+    )
+
+
+def _gold_node(
+    name: str,
+    func: Callable[..., pd.DataFrame],
+    inputs: List[str],
+    file_name: str = "",
+    index: bool = False,
+    extra_files: Sequence[str] = (),
+) -> Node:
+    """
+    Nó que calcula uma tabela Gold e, se `file_name`, a grava em CSV.
+    `func` devolve None quando a tabela não se aplica (colunas ausentes);
+    `extra_files` são outros arquivos Gold gravados pela própria `func`.
+    """
+
+    def run(*args):
+        result = func(*args)
+        if file_name and result is not None:
+            result.to_csv(_gold_file(file_name), index=index)
+            print(f"  - {file_name}")
+        return result
+
+    return Node(
+        name=f"gold:{name}",
+        func=run,
+        inputs=inputs,
+        outputs=[f"gold:{name}"],
+        params=GOLD_PARAMS,
+        writes=[_gold_file(f) for f in [file_name, *extra_files] if f],
+    )
+
+
+def _per_metric_gold_nodes(silver: Dict[str, str]) -> List[Node]:
+    def fact(customers, orders, order_items, products):
+        fact = gold_metrics.build_fact_table(
+            {
+                "customers": customers,
+                "orders": orders,
+                "order_items": order_items,
+                "products": products,
+            }
+        )
+        if fact.empty:
+            print(
+                "[WARNING] Orders / order_items não possuem as colunas esperadas. "
+                "Tabelas de recomendação não foram geradas."
+            )
+        else:
+            gold_metrics.save_fact_table(fact)
+        return fact
+
+    def product_stats(fact):
+        if fact.empty:
+            return pd.DataFrame()
+        return gold_metrics.product_recommendation_stats(fact)
+
+    def category_history(fact):
+        if fact.empty:
+            return pd.DataFrame()
+        return gold_metrics.customer_category_history(fact)
+
+    def top_insights(category_analysis, region_counts, products, customers):
+        return gold_metrics.top_insights(
+            category_analysis, region_counts, len(products), len(customers)
+        )
+
+    def revenue_by_category(product_stats):
+        if product_stats.empty:
+            return None
+        return gold_metrics.revenue_by_category(product_stats)
+
+    def with_column(table_func, column):
+        def run(df):
+            return table_func(df) if column in df.columns else None
+        return run
+
+    def avg_ticket(fact, product_stats, customers):
+        if product_stats.empty or "customer_region" not in customers.columns:
+            return None
+        return gold_metrics.avg_ticket_by_region(fact)
+
+    def numeric_corr(products):
+        corr = gold_metrics.products_numeric_corr(products)
+        return None if corr.empty else corr
+
+    def price_histogram(order_items):
+        if "price" not in order_items.columns:
+            return None
+        histogram, summary = gold_metrics.price_distribution(order_items)
+        summary.to_csv(_gold_file("gold_price_summary.csv"), index=False)
+        print("  - gold_price_summary.csv")
+        return histogram
+
+    return [
+        _gold_node(
+            "category_analysis", gold_metrics.products_by_category, [silver["products"]],
+            "gold_category_analysis.csv", index=True,
+        ),
+        _gold_node(
+            "customers_by_region", gold_metrics.customers_by_region, [silver["customers"]],
+            "gold_customers_by_region.csv",
+        ),
+        _gold_node(
+            "fact", fact,
+            [silver["customers"], silver["orders"], silver["order_items"], silver["products"]],
+            extra_files=[gold_metrics.FACT_TABLE_FILE],
+        ),
+        _gold_node(
+            "product_stats", product_stats, ["gold:fact"],
+            "gold_product_recommendation_stats.csv",
+        ),
+        _gold_node(
+            "category_history", category_history, ["gold:fact"],
+            "gold_customer_category_history.csv",
+        ),
+        _gold_node(
+            "top_insights", top_insights,
+            ["gold:category_analysis", "gold:customers_by_region",
+             silver["products"], silver["customers"]],
+            "gold_top_insights.csv",
+        ),
+        _gold_node(
+            "revenue_by_category", revenue_by_category, ["gold:product_stats"],
+            "gold_revenue_by_category.csv", index=True,
+        ),
+        _gold_node(
+            "orders_by_month",
+            with_column(gold_metrics.orders_by_month, "order_purchase_timestamp"),
+            [silver["orders"]], "gold_orders_by_month.csv",
+        ),
+        _gold_node(
+            "orders_by_year",
+            with_column(gold_metrics.orders_by_year, "order_purchase_timestamp"),
+            [silver["orders"]], "gold_orders_by_year.csv",
+        ),
+        _gold_node(
+            "order_status_distribution",
+            with_column(gold_metrics.order_status_distribution, "order_status"),
+            [silver["orders"]], "gold_order_status_distribution.csv",
+        ),
+        _gold_node(
+            "avg_ticket_by_region", avg_ticket,
+            ["gold:fact", "gold:product_stats", silver["customers"]],
+            "gold_avg_ticket_by_region.csv", index=True,
+        ),
+        _gold_node(
+            "products_numeric_corr", numeric_corr, [silver["products"]],
+            "gold_products_numeric_corr.csv", index=True,
+        ),
+        _gold_node(
+            "price_histogram", price_histogram, [silver["order_items"]],
+            "gold_price_histogram.csv", extra_files=["gold_price_summary.csv"],
+        ),
+    ]
+
+
+def _single_gold_node(silver: Dict[str, str]) -> Node:
+    def run(customers, orders, order_items, products, *_):
+        return gold_metrics.build_gold_tables(
+            {
+                "customers": customers,
+                "orders": orders,
+                "order_items": order_items,
+                "products": products,
+            }
+        )
+
+    return Node(
+        name="gold:all",
+        func=run,
+        # O motor DuckDB lê a Silver publicada.
+        inputs=[silver["customers"], silver["orders"], silver["order_items"], silver["products"]]
+        + (["silver:published"] if config.LAYER_WRITER else []),
+        outputs=["gold:category_analysis", "gold:customers_by_region", "gold:product_stats"],
+        params=GOLD_PARAMS,
+        writes=[
+            _gold_file("gold_category_analysis.csv"),
+            _gold_file("gold_customers_by_region.csv"),
+            _gold_file("gold_product_recommendation_stats.csv"),
+        ],
+    )
+
+
+def per_metric_gold() -> bool:
+    return (
+        config.GOLD_ENGINE == "pandas"
+        and not config.INCREMENTAL_GOLD
+        and config.DISTINCT_COUNT_MODE == "exact"
+        and not config.OLAP_CUBE
+    )
+
+
+def build_nodes() -> List[Node]:
+    """
+    Monta o DAG do pipeline conforme a configuração atual.
+    """
+    silver_writers = [_silver_node(table) for table in SILVER_TABLES]
+    if config.QUALITY_CHECKS:
+        silver_writers.append(_quality_node())
+    if config.SILVER_PARTITIONED:
+        silver_writers.append(_partitioned_node())
+    nodes = [_bronze_node()] + silver_writers
+    if config.LAYER_WRITER:
+        nodes.append(_publish_node("silver", config.SILVER_DIR, silver_writers))
+
+    if config.SILVER_COMPACT_DTYPES:
+        nodes.append(_compact_node())
+        silver = {table: f"compact:{table}" for table in SILVER_TABLES}
+    else:
+        silver = {table: f"silver:{table}" for table in SILVER_TABLES}
+
+    if per_metric_gold():
+        gold_nodes = _per_metric_gold_nodes(silver)
+    else:
+        gold_nodes = [_single_gold_node(silver)]
+    nodes.extend(gold_nodes)
+
+    gold_outputs = [artifact for node in gold_nodes for artifact in node.outputs]
+    if config.LAYER_WRITER and per_metric_gold():
+        # Quem lê a Gold do disco espera o marcador.
+        nodes.append(_publish_node("gold", config.GOLD_DIR, gold_nodes))
+        gold_outputs.append("gold:published")
+
+    if config.GOLD_RECOMMENDATIONS:
+
+        def recommendations(product_stats: pd.DataFrame, *_) -> None:
+            from . import recommendation
+
+            if not product_stats.empty:
+                recommendation.save_recommendations()
+
+        # Lê a Gold persistida: depende de todos os nós Gold.
+        nodes.append(
+            Node(
+                name="gold:recommendations",
+                func=recommendations,
+                inputs=["gold:product_stats"]
+                + [a for a in gold_outputs if a != "gold:product_stats"],
+                outputs=["gold:recommendations"],
+                params=GOLD_PARAMS + ["RECO_NEIGHBORS", "RECO_TOP_K"],
+                writes=[
+                    _gold_file("gold_item_similarity.csv"),
+                    _gold_file("gold_customer_recommendations.csv"),
+                ],
+            )
+        )
+    if config.GOLD_LOOKUP_INDEX:
+
+        def lookup_index(*_) -> List[str]:
+            from . import lookup
+
+            return lookup.build_all()
+
+        indexed_inputs = gold_outputs + (
+            ["gold:recommendations"] if config.GOLD_RECOMMENDATIONS else []
+        )
+        # build_all só reconstrói índices de CSVs alterados.
+        nodes.append(
+            Node(
+                name="gold:lookup_index",
+                func=lookup_index,
+                inputs=indexed_inputs,
+                cache=False,
+            )
+        )
+
+    def figures(*_) -> Dict[str, Path]:
+        from . import visualizations
+
+        return visualizations.generate_all_visualizations()
+
+    nodes.append(
+        Node(
+            name="visualizations",
+            func=figures,
+            inputs=gold_outputs,
+            outputs=["figures"],
+            cache=False,
+        )
+    )
+    return nodes
@@ -0,0 +1,417 @@
+"""
+Gerador sintético e determinístico das quatro tabelas da Olist em escala.
+
+generate(output_dir, scale, seed) grava customers, orders, order_items e
+products (nomes de config.*_FILE) com volumes proporcionais ao dataset
+original (scale=1 ~ 99 mil pedidos, 112 mil itens e 33 mil produtos),
+mantendo as relações entre chaves e as assimetrias do dado real:
+- um customer_id por pedido; ~3,4% dos pedidos são de clientes recorrentes
+  (customer_unique_id repetido), sempre com o mesmo estado / CEP
+- distribuição de estados, de status e de pedidos por mês da Olist
+- popularidade das categorias e ticket médio por categoria da Gold real;
+  dentro da categoria, poucos produtos concentram a maior parte das vendas
+- ~90% dos pedidos com um único item; pedidos unavailable / created sem itens
+- datas de aprovação, envio e entrega coerentes com o status
+
+Pedidos, clientes e itens são gerados em blocos de CHUNK_ORDERS pedidos,
+cada um com seu próprio gerador aleatório (seed, tabela, bloco): a memória
+usada não cresce com a escala e a mesma seed reproduz os mesmos arquivos.
+Os IDs hexadecimais vêm de uma permutação do índice da linha, sem
+colisões.
+
+    python -m src.synthetic dados/sintetico --scale 10 --seed 42
+"""
+
+import argparse
+import json
+from pathlib import Path
+from typing import Dict
+
+import numpy as np
+import pandas as pd
+
+from . import config
+
+
+# Volumes do dataset original (scale=1).
+BASE_ORDERS = 99_441
+BASE_PRODUCTS = 32_951
+BASE_SELLERS = 3_095
+REPEAT_CUSTOMER_RATE = 0.034
+
+CHUNK_ORDERS = 100_000
+
+SUMMARY_FILE = "_synthetic.json"
+
+# Contagem de pedidos por status na Olist.
+ORDER_STATUS_WEIGHTS = {
+    "delivered": 96_478,
+    "shipped": 1_107,
+    "canceled": 625,
+    "unavailable": 609,
+    "invoiced": 314,
+    "processing": 301,
+    "created": 5,
+    "approved": 2,
+}
+
+# Pedidos por mês de compra (2016-09 a 2018-08).
+MONTHLY_ORDERS = {
+    "2016-09": 4, "2016-10": 324, "2016-12": 1,
+    "2017-01": 800, "2017-02": 1_780, "2017-03": 2_682, "2017-04": 2_404,
+    "2017-05": 3_700, "2017-06": 3_245, "2017-07": 4_026, "2017-08": 4_331,
+    "2017-09": 4_285, "2017-10": 4_631, "2017-11": 7_544, "2017-12": 5_673,
+    "2018-01": 7_269, "2018-02": 6_728, "2018-03": 7_211, "2018-04": 6_939,
+    "2018-05": 6_873, "2018-06": 6_167, "2018-07": 6_292, "2018-08": 6_512,
+}
+
+# estado -> (clientes na Olist, capital, faixa de prefixos de CEP)
+STATES = {
+    "SP": (41_746, "sao paulo", 1_000, 19_999),
+    "RJ": (12_852, "rio de janeiro", 20_000, 28_999),
+    "MG": (11_635, "belo horizonte", 30_000, 39_999),
+    "RS": (5_466, "porto alegre", 90_000, 99_999),
+    "PR": (5_045, "curitiba", 80_000, 87_999),
+    "SC": (3_637, "florianopolis", 88_000, 89_999),
+    "BA": (3_380, "salvador", 40_000, 48_999),
+    "DF": (2_140, "brasilia", 70_000, 72_799),
+    "ES": (2_033, "vitoria", 29_000, 29_999),
+    "GO": (2_020, "goiania", 72_800, 76_799),
+    "PE": (1_652, "recife", 50_000, 56_999),
+    "CE": (1_336, "fortaleza", 60_000, 63_999),
+    "PA": (975, "belem", 66_000, 68_899),
+    "MT": (907, "cuiaba", 78_000, 78_899),
+    "MA": (747, "sao luis", 65_000, 65_999),
+    "MS": (715, "campo grande", 79_000, 79_999),
+    "PB": (536, "joao pessoa", 58_000, 58_999),
+    "PI": (495, "teresina", 64_000, 64_999),
+    "RN": (485, "natal", 59_000, 59_999),
+    "AL": (413, "maceio", 57_000, 57_999),
+    "SE": (350, "aracaju", 49_000, 49_999),
+    "TO": (280, "palmas", 77_000, 77_999),
+    "RO": (253, "porto velho", 76_800, 76_999),
+    "AM": (148, "manaus", 69_000, 69_299),
+    "AC": (81, "rio branco", 69_900, 69_999),
+    "AP": (68, "macapa", 68_900, 68_999),
+    "RR": (46, "boa vista", 69_300, 69_399),
+}
+
+# categoria -> (pedidos na Olist, ticket médio). None: produto sem categoria.
+CATEGORIES = {
+    "cama_mesa_banho": (10_009, 107.58),
+    "beleza_saude": (8_830, 147.13),
+    "esporte_lazer": (7_666, 134.37),
+    "informatica_acessorios": (6_724, 154.32),
+    "moveis_decoracao": (6_636, 102.97),
+    "utilidades_domesticas": (5_878, 97.89),
+    "relogios_presentes": (5_670, 331.87),
+    "telefonia": (4_178, 82.13),
+    "automotivo": (3_902, 152.62),
+    "brinquedos": (3_896, 132.41),
+    "cool_stuff": (3_584, 212.03),
+    "ferramentas_jardim": (3_537, 220.97),
+    "perfumaria": (3_165, 121.93),
+    "bebes": (2_856, 168.05),
+    "eletronicos": (2_532, 97.93),
+    "papelaria": (2_332, 101.20),
+    "fashion_bolsas_e_acessorios": (1_933, 85.69),
+    "pet_shop": (1_750, 125.40),
+    "moveis_escritorio": (1_284, 206.66),
+    "consoles_games": (1_036, 176.69),
+    "malas_acessorios": (1_036, 145.35),
+    "construcao_ferramentas_construcao": (771, 175.62),
+    "eletrodomesticos": (747, 99.45),
+    "instrumentos_musicais": (618, 327.69),
+    "eletroportateis": (611, 348.69),
+    "livros_interesse_geral": (514, 58.36),
+    "casa_construcao": (493, 163.55),
+    "alimentos": (444, 71.11),
+    "moveis_sala": (422, 168.52),
+    "casa_conforto": (401, 185.47),
+    "audio": (348, 116.51),
+    "bebidas": (292, 78.06),
+    "market_place": (278, 112.99),
+    "livros_tecnicos": (260, 72.95),
+    "fashion_calcados": (254, 84.54),
+    "artes": (195, 204.82),
+    "pcs": (177, 1_367.46),
+    "agro_industria_e_comercio": (178, 441.92),
+    "artigos_de_natal": (127, 55.76),
+    "flores": (29, 35.69),
+    None: (1_401, 117.33),
+}
+
+# Itens por pedido (1, 2, ..., 6).
+ITEMS_PER_ORDER_WEIGHTS = [0.900, 0.077, 0.015, 0.004, 0.002, 0.002]
+# Probabilidade de um item adicional repetir o produto do primeiro item.
+REPEATED_PRODUCT_RATE = 0.6
+
+_HEX = np.frombuffer(b"0123456789abcdef", dtype=np.uint8)
+_NIBBLE_SHIFTS = np.arange(60, -4, -4, dtype=np.uint64)
+
+_SALTS = {
+    "customer": 0x9E3779B97F4A7C15,
+    "customer_unique": 0xC2B2AE3D27D4EB4F,
+    "order": 0x165667B19E3779F9,
+    "product": 0xD6E8FEB86659FD93,
+    "seller": 0xFF51AFD7ED558CCD,
+    "customer_attributes": 0xC4CEB9FE1A85EC53,
+}
+_TABLE_IDS = {"products": 0, "orders": 1}
+
+
+def _scramble(index: np.ndarray, salt: int) -> np.ndarray:
+    """
+    Permutação de uint64 (xor com o sal + multiplicações ímpares e
+    deslocamentos, todos inversíveis): índices distintos -> valores distintos.
+    """
+    x = index.astype(np.uint64) ^ np.uint64(salt)
+    with np.errstate(over="ignore"):
+        x = (x ^ (x >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+        x = (x ^ (x >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return x ^ (x >> np.uint64(31))
+
+
+def _uniform(index: np.ndarray, salt: int) -> np.ndarray:
+    """
+    Número em [0, 1) derivado só do índice (mesmo valor em qualquer bloco).
+    """
+    return (_scramble(index, salt) >> np.uint64(11)).astype(np.float64) / float(1 << 53)
+
+
+def hex_ids(index: np.ndarray, kind: str) -> np.ndarray:
+    """
+    IDs hexadecimais de 32 caracteres (como os da Olist) para os índices.
+    """
+    salt = _SALTS[kind]
+    words = np.stack([_scramble(index, salt), _scramble(index, salt ^ 0xFFFFFFFF)], axis=1)
+    nibbles = (words[:, :, None] >> _NIBBLE_SHIFTS) & np.uint64(0xF)
+    chars = np.ascontiguousarray(_HEX[nibbles.reshape(len(index), 32)])
+    return chars.view("S32").ravel().astype(str)
+
+
+def _cdf(weights) -> np.ndarray:
+    cdf = np.cumsum(np.asarray(weights, dtype=np.float64))
+    return cdf / cdf[-1]
+
+
+def _pick(cdf: np.ndarray, u: np.ndarray) -> np.ndarray:
+    return np.minimum(np.searchsorted(cdf, u, side="right"), len(cdf) - 1)
+
+
+def _format_timestamps(values: np.ndarray, valid: np.ndarray) -> np.ndarray:
+    text = np.char.replace(np.datetime_as_string(values, unit="s"), "T", " ")
+    return np.where(valid, text, "")
+
+
+def _rng(seed: int, table: str, chunk: int = 0) -> np.random.Generator:
+    return np.random.default_rng([seed, _TABLE_IDS[table], chunk])
+
+
+def _products(n_products: int, n_sellers: int, seed: int) -> Dict[str, np.ndarray]:
+    """
+    Catálogo completo: produtos agrupados por categoria (em proporção aos
+    pedidos de cada categoria), preço base e vendedor de cada produto.
+    """
+    rng = _rng(seed, "products")
+    names = list(CATEGORIES)
+    order_weights = np.array([CATEGORIES[c][0] for c in names], dtype=np.float64)
+
+    per_category = np.maximum(
+        np.floor(order_weights / order_weights.sum() * n_products).astype(np.int64), 1
+    )
+    per_category[0] += max(n_products - per_category.sum(), 0)
+    category = np.repeat(np.arange(len(names)), per_category)
+    n = len(category)
+
+    tickets = np.array([CATEGORIES[c][1] for c in names])[category]
+    price = np.maximum(np.round(tickets * rng.lognormal(-0.3, 0.7, n), 2), 0.85)
+    # Vendedores também concentrados: poucos vendem a maior parte dos produtos.
+    seller = np.floor(n_sellers * rng.random(n) ** 2).astype(np.int64)
+
+    uncategorised = np.array([names[c] is None for c in category])
+    weight = np.round(rng.lognormal(np.log(700), 1.2, n)).clip(0, 40_425)
+    length = np.round(rng.lognormal(np.log(25), 0.45, n)).clip(7, 105)
+    height = np.round(rng.lognormal(np.log(13), 0.7, n)).clip(2, 105)
+    width = np.round(rng.lognormal(np.log(20), 0.45, n)).clip(6, 118)
+    name_length = np.round(rng.normal(48.5, 10.2, n)).clip(5, 76)
+    description_length = np.round(rng.lognormal(np.log(595), 0.75, n)).clip(4, 3_992)
+    photos = np.minimum(rng.geometric(0.45, n), 20).astype(np.float64)
+    for column in (name_length, description_length, photos):
+        column[uncategorised] = np.nan
+
+    table = pd.DataFrame(
+        {
+            "product_id": hex_ids(np.arange(n), "product"),
+            "product_category_name": np.array(names, dtype=object)[category],
+            "product_name_lenght": name_length,
+            "product_description_lenght": description_length,
+            "product_photos_qty": photos,
+            "product_weight_g": weight,
+            "product_length_cm": length,
+            "product_height_cm": height,
+            "product_width_cm": width,
+        }
+    )
+    return {
+        # No arquivo, os produtos aparecem embaralhados.
+        "table": table.iloc[rng.permutation(n)],
+        "category_start": np.r_[0, np.cumsum(per_category)],
+        "category_cdf": _cdf(order_weights),
+        "price": price,
+        "seller": seller,
+    }
+
+
+def _orders_chunk(
+    start: int,
+    stop: int,
+    catalog: Dict[str, np.ndarray],
+    seed: int,
+    chunk: int,
+) -> Dict[str, pd.DataFrame]:
+    rng = _rng(seed, "orders", chunk)
+    index = np.arange(start, stop)
+    n = len(index)
+
+    # Clientes: customer_unique_id recorrente a cada ~1/REPEAT_CUSTOMER_RATE
+    # pedidos; os atributos derivam só do customer_unique_id.
+    unique = (index * (1 - REPEAT_CUSTOMER_RATE)).astype(np.int64)
+    state_names = list(STATES)
+    state = _pick(_cdf([STATES[s][0] for s in state_names]), _uniform(unique, _SALTS["customer_attributes"]))
+    zip_low = np.array([STATES[s][2] for s in state_names])[state]
+    zip_high = np.array([STATES[s][3] for s in state_names])[state]
+    zip_u = _uniform(unique, _SALTS["customer_attributes"] ^ 0xFFFF)
+    customers = pd.DataFrame(
+        {
+            "customer_id": hex_ids(index, "customer"),
+            "customer_unique_id": hex_ids(unique, "customer_unique"),
+            "customer_zip_code_prefix": zip_low + (zip_u * (zip_high - zip_low + 1)).astype(np.int64),
+            "customer_city": np.array([STATES[s][1] for s in state_names], dtype=object)[state],
+            "customer_state": np.array(state_names, dtype=object)[state],
+        }
+    )
+
+    # Pedidos: mês pelo volume mensal real, instante uniforme dentro do mês.
+    months = np.array(list(MONTHLY_ORDERS), dtype="datetime64[M]")
+    month = _pick(_cdf(list(MONTHLY_ORDERS.values())), rng.random(n))
+    month_start = months[month].astype("datetime64[s]")
+    month_seconds = ((months[month] + 1).astype("datetime64[s]") - month_start).astype(np.int64)
+    purchase = month_start + (rng.random(n) * month_seconds).astype("timedelta64[s]")
+
+    status_names = np.array(list(ORDER_STATUS_WEIGHTS), dtype=object)
+    status = status_names[_pick(_cdf(list(ORDER_STATUS_WEIGHTS.values())), rng.random(n))]
+    delivered = status == "delivered"
+    approved_ok = status != "created"
+    shipped_ok = delivered | (status == "shipped")
+
+    def hours(mean: float) -> np.ndarray:
+        return (rng.exponential(mean, n) * 3600).astype("timedelta64[s]")
+
+    approved = purchase + hours(10)
+    carrier = approved + hours(72)
+    delivered_at = carrier + hours(216)
+    estimated = purchase.astype("datetime64[D]") + rng.integers(15, 35, n).astype("timedelta64[D]")
+
+    orders = pd.DataFrame(
+        {
+            "order_id": hex_ids(index, "order"),
+            "customer_id": customers["customer_id"].to_numpy(),
+            "order_status": status,
+            "order_purchase_timestamp": _format_timestamps(purchase, np.ones(n, dtype=bool)),
+            "order_approved_at": _format_timestamps(approved, approved_ok),
+            "order_delivered_carrier_date": _format_timestamps(carrier, shipped_ok),
+            "order_delivered_customer_date": _format_timestamps(delivered_at, delivered),
+            "order_estimated_delivery_date": _format_timestamps(
+                estimated.astype("datetime64[s]"), np.ones(n, dtype=bool)
+            ),
+        }
+    )
+
+    # Itens: pedidos indisponíveis / recém-criados (e parte dos cancelados) sem itens.
+    n_items = _pick(_cdf(ITEMS_PER_ORDER_WEIGHTS), rng.random(n)) + 1
+    no_items = np.isin(status, ["unavailable", "created"]) | (
+        (status == "canceled") & (rng.random(n) < 0.25)
+    )
+    n_items[no_items] = 0
+    owner = np.repeat(np.arange(n), n_items)
+    first = np.repeat(np.cumsum(n_items) - n_items, n_items)
+    item_id = np.arange(len(owner)) - first + 1
+
+    category = _pick(catalog["category_cdf"], rng.random(len(owner)))
+    low = catalog["category_start"][category]
+    size = catalog["category_start"][category + 1] - low
+    # Dentro da categoria: P(rank < x * tamanho) = x ** (1 / 2.5).
+    product = low + np.floor(size * rng.random(len(owner)) ** 2.5).astype(np.int64)
+    repeat = (item_id > 1) & (rng.random(len(owner)) < REPEATED_PRODUCT_RATE)
+    product[repeat] = product[first[repeat]]
+
+    shipping_limit = approved[owner] + np.timedelta64(6, "D")
+    order_items = pd.DataFrame(
+        {
+            "order_id": orders["order_id"].to_numpy()[owner],
+            "order_item_id": item_id,
+            "product_id": hex_ids(product, "product"),
+            "seller_id": hex_ids(catalog["seller"][product], "seller"),
+            "shipping_limit_date": _format_timestamps(shipping_limit, np.ones(len(owner), dtype=bool)),
+            "price": catalog["price"][product],
+            "freight_value": np.round(rng.lognormal(np.log(16), 0.5, len(owner)), 2),
+        }
+    )
+    return {"customers": customers, "orders": orders, "order_items": order_items}
+
+
+def generate(output_dir: Path, scale: float = 1.0, seed: int = 42) -> Dict[str, int]:
+    """
+    Gera os quatro CSVs da Olist em `output_dir` com volumes multiplicados
+    por `scale`. Retorna o número de linhas de cada tabela (também gravado
+    em SUMMARY_FILE).
+    """
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    n_orders = max(int(round(BASE_ORDERS * scale)), 1)
+    n_products = max(int(round(BASE_PRODUCTS * scale)), len(CATEGORIES))
+    n_sellers = max(int(round(BASE_SELLERS * scale)), 1)
+
+    print(f"Gerando dados sintéticos (scale={scale:g}, seed={seed}) em {output_dir}")
+    catalog = _products(n_products, n_sellers, seed)
+    catalog["table"].to_csv(output_dir / config.PRODUCTS_FILE, index=False)
+
+    files = {
+        "customers": config.CUSTOMERS_FILE,
+        "orders": config.ORDERS_FILE,
+        "order_items": config.ORDER_ITEMS_FILE,
+    }
+    rows = {"products": len(catalog["table"])}
+    for chunk, start in enumerate(range(0, n_orders, CHUNK_ORDERS)):
+        stop = min(start + CHUNK_ORDERS, n_orders)
+        tables = _orders_chunk(start, stop, catalog, seed, chunk)
+        for table, file_name in files.items():
+            tables[table].to_csv(
+                output_dir / file_name,
+                mode="w" if chunk == 0 else "a",
+                header=chunk == 0,
+                index=False,
+            )
+            rows[table] = rows.get(table, 0) + len(tables[table])
+
+    with open(output_dir / SUMMARY_FILE, "w", encoding="utf-8") as fh:
+        json.dump({"scale": scale, "seed": seed, "rows": rows}, fh, indent=2)
+
+    for table, count in rows.items():
+        print(f"  {table:<12}: {count} linhas")
+    return rows
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Gera dados sintéticos no formato da Olist.")
+    parser.add_argument("output_dir", type=Path)
+    parser.add_argument("--scale", type=float, default=1.0)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+    generate(args.output_dir, args.scale, args.seed)
+
+
+if __name__ == "__main__":
+    main()
@@ -2,125 +2,283 @@
 Implementa a etapa de Transformação (Transformation):
 - Limpeza de duplicados
 - Tratamento de nulos simples
-- Enriquecimento de colunas (região, datas, etc.)
+- Enriquecimento de colunas (região, datas, etc.; ver derived.py)
 - Geração da camada Silver
+
+Com config.QUALITY_CHECKS ativo, a Silver é validada pelas regras de cada
+DataSource (quality.py) e o relatório fica em SILVER_DIR.
+
+Com config.SILVER_PARTITIONED ativo, orders, order_items e customers também
+são gravadas particionadas (silver_store.py); sem ele, as partições de
+execuções anteriores são removidas.
+
+Com config.SILVER_COMPACT_DTYPES ativo, os DataFrames repassados à Gold usam
+a representação compacta de compact.py (os arquivos Silver não mudam).
+
+Com config.LAYER_WRITER ativo, os CSVs e Parquets Silver são gravados em
+segundo plano e publicados juntos por layer_writer.py.
+
+Com config.SILVER_ARROW_KERNELS ativo, a normalização de texto, o
+mapeamento de região e a remoção de duplicados usam os kernels Arrow de
+arrow_kernels.py (mesma saída do caminho pandas).
 """
 
-from typing import Dict
+import functools
+import os
+from pathlib import Path
+from typing import Dict, Mapping
 import pandas as pd
 
-from . import config
+from . import compact, config, derived, layer_writer, metrics, quality, silver_store
+from .data_sources import BRAZIL_REGIONS
 
 
-def transform_to_silver(
-    dfs_bronze: Dict[str, pd.DataFrame]
-) -> Dict[str, pd.DataFrame]:
-    """
-    Recebe os DataFrames da camada Bronze e retorna a camada Silver.
+@functools.lru_cache(maxsize=None)
+def _arrow_kernels_available() -> bool:
+    try:
+        from . import arrow_kernels  # noqa: F401
+    except ImportError as e:
+        print(f"[WARNING] Kernels Arrow indisponíveis ({e}); usando o caminho pandas.")
+        return False
+    return True
 
-    """
-    print("=== TRANSFORMAÇÃO - CAMADA SILVER ===\n")
 
-    df_customers = dfs_bronze["customers"].copy()
-    df_orders = dfs_bronze["orders"].copy()
-    df_order_items = dfs_bronze["order_items"].copy()
-    df_products = dfs_bronze["products"].copy()
+def _use_arrow_kernels() -> bool:
+    return config.SILVER_ARROW_KERNELS and _arrow_kernels_available()
+
 
-    customers_duplicates = df_customers.duplicated().sum()
-    if customers_duplicates > 0:
-        df_customers = df_customers.drop_duplicates()
-        print(f"Removed {customers_duplicates} duplicate rows from customers")
+def _drop_duplicates(df: pd.DataFrame, table: str) -> pd.DataFrame:
+    if _use_arrow_kernels():
+        from . import arrow_kernels
+
+        duplicated = arrow_kernels.duplicated(df)
+    else:
+        duplicated = df.duplicated()
+    # Uma única passada: a máscara dá a contagem e as linhas mantidas
+    # (equivalente a drop_duplicates).
+    duplicates = duplicated.sum()
+    if duplicates > 0:
+        df = df[~duplicated]
+        print(f"Removed {duplicates} duplicate rows from {table}")
+    metrics.annotate(duplicates_removed=int(duplicates))
+    return df
+
+
+def clean_customers(df_customers: pd.DataFrame) -> pd.DataFrame:
+    df_customers = _drop_duplicates(df_customers.copy(), "customers")
 
     if "customer_state" in df_customers.columns:
-        df_customers["customer_state"] = df_customers["customer_state"].str.upper().str.strip()
-        brazil_regions = {
-            "AC": "North",
-            "AP": "North",
-            "AM": "North",
-            "PA": "North",
-            "RO": "North",
-            "RR": "North",
-            "TO": "North",
-            "AL": "Northeast",
-            "BA": "Northeast",
-            "CE": "Northeast",
-            "MA": "Northeast",
-            "PB": "Northeast",
-            "PE": "Northeast",
-            "PI": "Northeast",
-            "RN": "Northeast",
-            "SE": "Northeast",
-            "DF": "Center-West",
-            "GO": "Center-West",
-            "MT": "Center-West",
-            "MS": "Center-West",
-            "ES": "Southeast",
-            "MG": "Southeast",
-            "RJ": "Southeast",
-            "SP": "Southeast",
-            "PR": "South",
-            "RS": "South",
-            "SC": "South",
-        }
-        df_customers["customer_region"] = df_customers["customer_state"].map(brazil_regions)
-
-    products_duplicates = df_products.duplicated().sum()
-    if products_duplicates > 0:
-        df_products = df_products.drop_duplicates()
-        print(f"Removed {products_duplicates} duplicate rows from products")
+        if _use_arrow_kernels():
+            from . import arrow_kernels
+
+            df_customers["customer_state"] = arrow_kernels.normalize(
+                df_customers["customer_state"], "upper"
+            )
+            df_customers["customer_region"] = arrow_kernels.map_values(
+                df_customers["customer_state"], BRAZIL_REGIONS
+            )
+        else:
+            df_customers["customer_state"] = df_customers["customer_state"].str.upper().str.strip()
+            df_customers["customer_region"] = df_customers["customer_state"].map(BRAZIL_REGIONS)
+
+    return df_customers
+
+
+def clean_products(df_products: pd.DataFrame) -> pd.DataFrame:
+    df_products = _drop_duplicates(df_products.copy(), "products")
 
     if "product_category_name" in df_products.columns:
         missing_cat = df_products["product_category_name"].isnull().sum()
         if missing_cat > 0:
             df_products["product_category_name"].fillna("undefined_category", inplace=True)
             print(f"Filled {missing_cat} missing product_category_name with 'undefined_category'")
+            metrics.annotate(missing_category_filled=int(missing_cat))
 
-        df_products["product_category_name"] = (
-            df_products["product_category_name"].str.lower().str.strip()
-        )
+        if _use_arrow_kernels():
+            from . import arrow_kernels
+
+            df_products["product_category_name"] = arrow_kernels.normalize(
+                df_products["product_category_name"], "lower"
+            )
+        else:
+            df_products["product_category_name"] = (
+                df_products["product_category_name"].str.lower().str.strip()
+            )
 
-    orders_duplicates = df_orders.duplicated().sum()
-    if orders_duplicates > 0:
-        df_orders = df_orders.drop_duplicates()
-        print(f"Removed {orders_duplicates} duplicate rows from orders")
+    return df_products
+
+
+def clean_orders(df_orders: pd.DataFrame) -> pd.DataFrame:
+    df_orders = _drop_duplicates(df_orders.copy(), "orders")
 
     if "order_purchase_timestamp" in df_orders.columns:
-        df_orders["order_purchase_timestamp"] = pd.to_datetime(
-            df_orders["order_purchase_timestamp"]
-        )
-        df_orders["order_purchase_date"] = df_orders["order_purchase_timestamp"].dt.date
-        df_orders["order_purchase_hour"] = df_orders["order_purchase_timestamp"].dt.hour
+        # Único ponto de conversão do timestamp; as etapas seguintes usam as
+        # colunas derivadas (data, hora, ano, ano-mês).
+        derived.add_time_columns(df_orders, "order_purchase_timestamp", "order_purchase")
+
+    return df_orders
 
-    order_items_duplicates = df_order_items.duplicated().sum()
-    if order_items_duplicates > 0:
-        df_order_items = df_order_items.drop_duplicates()
-        print(f"Removed {order_items_duplicates} duplicate rows from order_items")
+
+def clean_order_items(df_order_items: pd.DataFrame) -> pd.DataFrame:
+    return _drop_duplicates(df_order_items.copy(), "order_items")
+
+
+# Limpeza de cada tabela; as tabelas são independentes entre si.
+SILVER_CLEANERS = {
+    "customers": clean_customers,
+    "products": clean_products,
+    "orders": clean_orders,
+    "order_items": clean_order_items,
+}
+
+
+def silver_path(table: str, suffix: str = "csv") -> Path:
+    return config.SILVER_DIR / f"{table}_silver.{suffix}"
+
+
+def save_silver_table(table: str, df: pd.DataFrame) -> None:
+    """
+    Salva uma tabela Silver em CSV e Parquet.
+    """
+    config.ensure_dirs()
+    df.to_csv(silver_path(table), index=False)
+    try:
+        df.to_parquet(
+            silver_path(table, "parquet"), index=False, **layer_writer.parquet_options()
+        )
+    except Exception as e:
+        print(f"[WARNING] Failed to save {table} Silver as Parquet (pyarrow not installed?).")
+        print(e)
 
 
-    df_customers.to_csv(config.SILVER_DIR / "customers_silver.csv", index=False)
-    df_products.to_csv(config.SILVER_DIR / "products_silver.csv", index=False)
-    df_orders.to_csv(config.SILVER_DIR / "orders_silver.csv", index=False)
-    df_order_items.to_csv(config.SILVER_DIR / "order_items_silver.csv", index=False)
+def append_silver_table(table: str, df: pd.DataFrame) -> None:
+    """
+    Acrescenta linhas já limpas a uma tabela Silver existente (micro-batch).
 
+    O CSV recebe as linhas no fim do arquivo; o Parquet é regravado com a
+    tabela Arrow existente concatenada às linhas novas, convertidas para o
+    mesmo schema (se os tipos não forem compatíveis, a tabela é concatenada
+    no pandas).
+    """
+    df.to_csv(silver_path(table), mode="a", header=False, index=False)
+    path = silver_path(table, "parquet")
     try:
-        df_customers.to_parquet(config.SILVER_DIR / "customers_silver.parquet", index=False)
-        df_products.to_parquet(config.SILVER_DIR / "products_silver.parquet", index=False)
-        df_orders.to_parquet(config.SILVER_DIR / "orders_silver.parquet", index=False)
-        df_order_items.to_parquet(config.SILVER_DIR / "order_items_silver.parquet", index=False)
-        print("\nSilver layer saved as CSV and Parquet.")
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        existing = pq.read_table(path)
+        try:
+            new = pa.Table.from_pandas(
+                df[existing.column_names], schema=existing.schema, preserve_index=False
+            )
+            combined = pa.concat_tables([existing, new])
+        except (pa.ArrowInvalid, pa.ArrowTypeError):
+            combined = pa.Table.from_pandas(
+                pd.concat([existing.to_pandas(), df], ignore_index=True), preserve_index=False
+            )
+        tmp = path.with_name(path.name + ".tmp")
+        pq.write_table(combined, tmp)
+        os.replace(tmp, path)
     except Exception as e:
-        print("\n[WARNING] Failed to save Silver as Parquet (pyarrow not installed?).")
+        print(f"[WARNING] Failed to append to {table} Silver Parquet (pyarrow not installed?).")
         print(e)
 
+
+def transform_to_silver(
+    dfs_bronze: Mapping[str, pd.DataFrame]
+) -> Dict[str, pd.DataFrame]:
+    """
+    Recebe os DataFrames da camada Bronze e retorna a camada Silver.
+
+    """
+    print("=== TRANSFORMAÇÃO - CAMADA SILVER ===\n")
+    config.ensure_dirs()
+
+    df_customers = metrics.call("silver:customers", clean_customers, dfs_bronze["customers"])
+    df_products = metrics.call("silver:products", clean_products, dfs_bronze["products"])
+    df_orders = metrics.call("silver:orders", clean_orders, dfs_bronze["orders"])
+    df_order_items = metrics.call(
+        "silver:order_items", clean_order_items, dfs_bronze["order_items"]
+    )
+
+    tables = {
+        "customers": df_customers,
+        "products": df_products,
+        "orders": df_orders,
+        "order_items": df_order_items,
+    }
+    layer = layer_writer.open_layer(config.SILVER_DIR) if config.LAYER_WRITER else None
+
+    if layer is not None:
+        for table, df in tables.items():
+            layer.write_csv(df, silver_path(table), index=False)
+        for table, df in tables.items():
+            layer.write_parquet(df, silver_path(table, "parquet"), index=False)
+        print("\nSilver layer queued as CSV and Parquet (background writer).")
+    else:
+        for table, df in tables.items():
+            df.to_csv(silver_path(table), index=False)
+
+        try:
+            for table, df in tables.items():
+                df.to_parquet(
+                    silver_path(table, "parquet"), index=False, **layer_writer.parquet_options()
+                )
+            print("\nSilver layer saved as CSV and Parquet.")
+        except Exception as e:
+            print("\n[WARNING] Failed to save Silver as Parquet (pyarrow not installed?).")
+            print(e)
+
+    if config.SILVER_PARTITIONED:
+        print("\nSilver particionada:")
+        metrics.call(
+            "silver:partitioned",
+            silver_store.write_partitioned,
+            {
+                "customers": df_customers,
+                "orders": df_orders,
+                "order_items": df_order_items,
+            },
+            writes=[silver_store.partitioned_path(t) for t in config.SILVER_PARTITION_BY],
+        )
+    else:
+        silver_store.remove_partitioned()
+
+    if config.QUALITY_CHECKS:
+        metrics.call(
+            "silver:quality",
+            quality.validate_silver,
+            {
+                "customers": df_customers,
+                "orders": df_orders,
+                "order_items": df_order_items,
+                "products": df_products,
+            },
+            writes=[quality.report_path()],
+        )
+
+    if layer is not None:
+        layer.commit()
+
     print("\nShapes Silver:")
     print(f"  Customers   : {df_customers.shape}")
     print(f"  Orders      : {df_orders.shape}")
     print(f"  Order Items : {df_order_items.shape}")
     print(f"  Products    : {df_products.shape}")
 
-    return {
+    dfs_silver = {
         "customers": df_customers,
         "orders": df_orders,
         "order_items": df_order_items,
         "products": df_products,
     }
+
+    if config.SILVER_COMPACT_DTYPES:
+        memory_before = compact.memory_usage_mb(dfs_silver)
+        dfs_silver = metrics.call("silver:compact", compact.compact_silver, dfs_silver)
+        print(
+            f"\nRepresentação compacta: {memory_before:.1f} MB -> "
+            f"{compact.memory_usage_mb(dfs_silver):.1f} MB"
+        )
+
+    return dfs_silver
@@ -1,220 +1,296 @@
 """
-Geração de visualizações e dashboards a partir da camada Silver/Gold.
+Geração de visualizações e dashboards a partir da camada Gold.
 
-As figuras são salvas em:
+As figuras são desenhadas apenas a partir das tabelas Gold persistidas
+(dados/gold/gold_*.csv) e salvas em:
     dados/gold/figures/*.png
 
+A renderização roda em um pool de processos com o backend Agg. O hash das
+tabelas de entrada de cada figura fica em figures/_manifest.json; se as
+entradas não mudaram desde a última execução, a figura não é redesenhada.
+
 Essas imagens podem ser usadas:
 - na apresentação de slides
 - no README / relatório
 - em notebooks de exploração
 """
 
+import hashlib
+import json
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from typing import Dict
+from typing import Callable, Dict, List, Tuple
 
 import matplotlib.pyplot as plt
 import seaborn as sns
 import pandas as pd
 
-from . import config
+from . import config, layer_writer
+
+
+_MANIFEST_FILE = "_manifest.json"
+
+
+def _plot_top10_product_categories(tables: Dict[str, pd.DataFrame], path: Path) -> None:
+    top10 = tables["gold_category_analysis"].head(10).iloc[::-1]
+    plt.figure(figsize=(10, 6))
+    plt.barh(top10.index, top10["product_count"])
+    plt.title("Top 10 categorias de produto (catálogo)")
+    plt.xlabel("Quantidade de produtos")
+    plt.tight_layout()
+    plt.savefig(path)
+    plt.close()
+
+
+def _plot_customers_by_region(tables: Dict[str, pd.DataFrame], path: Path) -> None:
+    customers_by_region = tables["gold_customers_by_region"]
+    # O CSV Gold tem o cabeçalho "count,count"; as colunas são lidas por posição.
+    customers_by_region.columns = ["customer_region", "count"]
+    plt.figure(figsize=(8, 5))
+    plt.bar(customers_by_region["customer_region"], customers_by_region["count"])
+    plt.title("Distribuição de clientes por região")
+    plt.ylabel("Número de clientes")
+    plt.xticks(rotation=30)
+    plt.tight_layout()
+    plt.savefig(path)
+    plt.close()
+
+
+def _plot_top10_categories_by_orders(tables: Dict[str, pd.DataFrame], path: Path) -> None:
+    category_sales = (
+        tables["gold_revenue_by_category"]
+        .sort_values("total_orders", ascending=False)
+        .head(10)
+        .iloc[::-1]
+    )
+    plt.figure(figsize=(10, 6))
+    plt.barh(category_sales.index, category_sales["total_orders"])
+    plt.title("Top 10 categorias mais vendidas (por numero de pedidos)")
+    plt.xlabel("Total de pedidos (delivered)")
+    plt.tight_layout()
+    plt.savefig(path)
+    plt.close()
+
+
+def _plot_orders_by_year(tables: Dict[str, pd.DataFrame], path: Path) -> None:
+    orders_by_year = tables["gold_orders_by_year"]
+    plt.figure(figsize=(8, 5))
+    plt.plot(orders_by_year["year"], orders_by_year["order_count"], marker="o")
+    plt.title("Número de pedidos por ano")
+    plt.xlabel("Ano")
+    plt.ylabel("Quantidade de pedidos")
+    plt.xticks(orders_by_year["year"].astype(int))
+    plt.tight_layout()
+    plt.savefig(path)
+    plt.close()
+
+
+def _plot_products_numeric_corr(tables: Dict[str, pd.DataFrame], path: Path) -> None:
+    plt.figure(figsize=(8, 6))
+    sns.heatmap(tables["gold_products_numeric_corr"], annot=True, fmt=".2f", cmap="coolwarm")
+    plt.title("Correlacao entre atributos fisicos dos produtos")
+    plt.tight_layout()
+    plt.savefig(path)
+    plt.close()
+
+
+def _plot_orders_by_month(tables: Dict[str, pd.DataFrame], path: Path) -> None:
+    orders_by_month = tables["gold_orders_by_month"]
+    plt.figure(figsize=(12, 5))
+    plt.plot(
+        orders_by_month["year_month"].astype(str),
+        orders_by_month["order_count"],
+        marker="o",
+        linewidth=2,
+        color="steelblue",
+    )
+    plt.title("Evolucao mensal de pedidos (2016-2018)")
+    plt.xlabel("Mes/Ano")
+    plt.ylabel("Quantidade de pedidos")
+    plt.xticks(rotation=45)
+    plt.grid(True, alpha=0.3)
+    plt.tight_layout()
+    plt.savefig(path)
+    plt.close()
+
+
+def _plot_order_status_distribution(tables: Dict[str, pd.DataFrame], path: Path) -> None:
+    status_counts = tables["gold_order_status_distribution"].set_index("status")["count"]
+    plt.figure(figsize=(10, 6))
+    colors = sns.color_palette("Set2", len(status_counts))
+    bars = plt.barh(status_counts.index, status_counts.values, color=colors)
+    plt.title("Distribuicao de status dos pedidos")
+    plt.xlabel("Quantidade de pedidos")
+    plt.ylabel("Status")
+    for bar, value in zip(bars, status_counts.values):
+        percentage = (value / status_counts.sum()) * 100
+        plt.text(value + 500, bar.get_y() + bar.get_height()/2,
+                 f"{value:,} ({percentage:.1f}%)", va="center", fontsize=9)
+    plt.tight_layout()
+    plt.savefig(path)
+    plt.close()
+
+
+def _plot_top10_categories_by_revenue(tables: Dict[str, pd.DataFrame], path: Path) -> None:
+    revenue_by_cat = (
+        tables["gold_revenue_by_category"]["total_revenue"]
+        .sort_values(ascending=False)
+        .head(10)
+        .iloc[::-1]
+    )
+    plt.figure(figsize=(10, 6))
+    colors = sns.color_palette("rocket", len(revenue_by_cat))
+    plt.barh(revenue_by_cat.index, revenue_by_cat.values, color=colors)
+    plt.title("Top 10 categorias por receita total (R$)")
+    plt.xlabel("Receita total (R$)")
+    plt.tight_layout()
+    plt.savefig(path)
+    plt.close()
+
+
+def _plot_price_distribution(tables: Dict[str, pd.DataFrame], path: Path) -> None:
+    histogram = tables["gold_price_histogram"]
+    summary = tables["gold_price_summary"].set_index("metric")["value"]
+    plt.figure(figsize=(10, 5))
+    plt.bar(
+        histogram["bin_start"],
+        histogram["frequency"],
+        width=histogram["bin_end"] - histogram["bin_start"],
+        align="edge",
+        edgecolor="black",
+        alpha=0.7,
+        color="steelblue",
+    )
+    plt.title("Distribuicao de precos dos produtos (ate percentil 95)")
+    plt.xlabel("Preco (R$)")
+    plt.ylabel("Frequencia")
+    plt.axvline(summary["mean"], color="red", linestyle="--", label=f"Media: R${summary['mean']:.2f}")
+    plt.axvline(summary["median"], color="green", linestyle="--", label=f"Mediana: R${summary['median']:.2f}")
+    plt.legend()
+    plt.tight_layout()
+    plt.savefig(path)
+    plt.close()
+
+
+# nome da figura -> (tabelas Gold de entrada, função de desenho)
+FIGURES: Dict[str, Tuple[List[str], Callable[[Dict[str, pd.DataFrame], Path], None]]] = {
+    "top10_product_categories": (["gold_category_analysis"], _plot_top10_product_categories),
+    "customers_by_region": (["gold_customers_by_region"], _plot_customers_by_region),
+    "top10_categories_by_orders": (["gold_revenue_by_category"], _plot_top10_categories_by_orders),
+    "orders_by_year": (["gold_orders_by_year"], _plot_orders_by_year),
+    "products_numeric_corr": (["gold_products_numeric_corr"], _plot_products_numeric_corr),
+    "orders_by_month": (["gold_orders_by_month"], _plot_orders_by_month),
+    "order_status_distribution": (
+        ["gold_order_status_distribution"],
+        _plot_order_status_distribution,
+    ),
+    "top10_categories_by_revenue": (["gold_revenue_by_category"], _plot_top10_categories_by_revenue),
+    "price_distribution": (
+        ["gold_price_histogram", "gold_price_summary"],
+        _plot_price_distribution,
+    ),
+}
 
+# Tabelas Gold cuja primeira coluna é o índice.
+_INDEXED_TABLES = {
+    "gold_category_analysis",
+    "gold_revenue_by_category",
+    "gold_products_numeric_corr",
+}
 
-def generate_all_visualizations(
-    dfs_silver: Dict[str, pd.DataFrame],
-    products_by_category: pd.DataFrame,
-    customers_by_region: pd.DataFrame,
-    product_reco_stats: pd.DataFrame,
-) -> Dict[str, Path]:
+
+def _read_gold_table(gold_dir: Path, table: str) -> pd.DataFrame:
+    index_col = 0 if table in _INDEXED_TABLES else None
+    return pd.read_csv(gold_dir / f"{table}.csv", index_col=index_col)
+
+
+def _inputs_hash(gold_dir: Path, tables: List[str]) -> str:
+    digest = hashlib.sha256()
+    for table in tables:
+        digest.update(table.encode())
+        digest.update((gold_dir / f"{table}.csv").read_bytes())
+    return digest.hexdigest()
+
+
+def _init_worker() -> None:
+    plt.switch_backend("Agg")
+    sns.set_style("whitegrid")
+
+
+def _render(name: str, gold_dir: Path, path: Path) -> str:
+    """
+    Lê as tabelas Gold de entrada e desenha uma figura (executado nos workers).
+    """
+    tables, plot = FIGURES[name]
+    plot({table: _read_gold_table(gold_dir, table) for table in tables}, path)
+    return name
+
+
+def _load_manifest(output_dir: Path) -> Dict[str, str]:
+    path = output_dir / _MANIFEST_FILE
+    if not path.exists():
+        return {}
+    with open(path, encoding="utf-8") as fh:
+        return json.load(fh)
+
+
+def _save_manifest(output_dir: Path, manifest: Dict[str, str]) -> None:
+    with open(output_dir / _MANIFEST_FILE, "w", encoding="utf-8") as fh:
+        json.dump(manifest, fh, indent=2, sort_keys=True)
+
+
+def generate_all_visualizations() -> Dict[str, Path]:
     """
-    Gera e salva os principais gráficos do projeto.
+    Gera e salva os principais gráficos do projeto a partir da Gold persistida.
+
+    Figuras cujas tabelas de entrada não existem são puladas; figuras cujas
+    entradas não mudaram desde a última renderização são reaproveitadas.
 
     Retorna um dicionário {nome_do_grafico: caminho_png}.
     """
-    output_dir = config.GOLD_DIR / "figures"
+    # Também evita o fork do pool com gravações de camadas em andamento.
+    layer_writer.flush()
+    # Uma Gold sem marcador (gravação interrompida) pode misturar tabelas
+    # antigas e novas: as figuras e o cache de entradas não são gerados.
+    layer_writer.wait(config.GOLD_DIR)
+    gold_dir = config.GOLD_DIR
+    output_dir = gold_dir / "figures"
     output_dir.mkdir(parents=True, exist_ok=True)
 
-    sns.set_style("whitegrid")
+    previous = _load_manifest(output_dir) if config.FIGURE_CACHE else {}
+    manifest: Dict[str, str] = {}
+    figure_paths: Dict[str, Path] = {}
+    pending: List[str] = []
 
-    df_customers = dfs_silver["customers"]
-    df_orders = dfs_silver["orders"]
-    df_order_items = dfs_silver["order_items"]
-    df_products = dfs_silver["products"]
+    for name, (tables, _) in FIGURES.items():
+        missing = [t for t in tables if not (gold_dir / f"{t}.csv").exists()]
+        if missing:
+            print(f"Tabela Gold {', '.join(missing)} ausente; gráfico '{name}' não gerado.")
+            continue
 
-    figure_paths: Dict[str, Path] = {}
+        path = output_dir / f"{name}.png"
+        manifest[name] = _inputs_hash(gold_dir, tables)
+        figure_paths[name] = path
+        if previous.get(name) != manifest[name] or not path.exists():
+            pending.append(name)
+
+    workers = min(config.VISUALIZATION_WORKERS, len(pending))
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+            list(pool.map(_render, pending, [gold_dir] * len(pending),
+                          [figure_paths[name] for name in pending]))
+    elif pending:
+        sns.set_style("whitegrid")
+        for name in pending:
+            _render(name, gold_dir, figure_paths[name])
+
+    _save_manifest(output_dir, manifest)
 
-    if not products_by_category.empty:
-        plt.figure(figsize=(10, 6))
-        top10 = products_by_category.head(10).iloc[::-1]
-        plt.barh(top10.index, top10["product_count"])
-        plt.title("Top 10 categorias de produto (catálogo)")
-        plt.xlabel("Quantidade de produtos")
-        plt.tight_layout()
-        path = output_dir / "top10_product_categories.png"
-        plt.savefig(path)
-        plt.close()
-        figure_paths["top10_product_categories"] = path
-
-        if "customer_region" in df_customers.columns:
-            customers_by_region = (
-                df_customers
-                .groupby("customer_region")
-                .size()
-                .reset_index(name="count")
-                .sort_values("count", ascending=False)
-            )
-        else:
-            customers_by_region = pd.DataFrame(columns=["customer_region", "count"])
-
-        if not customers_by_region.empty:
-            plt.figure(figsize=(8, 5))
-            plt.bar(customers_by_region["customer_region"], customers_by_region["count"])
-            plt.title("Distribuição de clientes por região")
-            plt.ylabel("Número de clientes")
-            plt.xticks(rotation=30)
-            plt.tight_layout()
-            path = output_dir / "customers_by_region.png"
-            plt.savefig(path)
-            plt.close()
-            figure_paths["customers_by_region"] = path
-        else:
-            print("Nenhuma informação de região de cliente disponível; gráfico 'customers_by_region' não gerado.")
-
-
-    if not product_reco_stats.empty:
-        # Grafico: Top 10 categorias por vendas (mais informativo que IDs)
-        plt.figure(figsize=(10, 6))
-        category_sales = (
-            product_reco_stats.groupby("product_category_name")
-            .agg(total_orders=("total_orders", "sum"))
-            .sort_values("total_orders", ascending=False)
-            .head(10)
-            .iloc[::-1]
-        )
-        plt.barh(category_sales.index, category_sales["total_orders"])
-        plt.title("Top 10 categorias mais vendidas (por numero de pedidos)")
-        plt.xlabel("Total de pedidos (delivered)")
-        plt.tight_layout()
-        path = output_dir / "top10_categories_by_orders.png"
-        plt.savefig(path)
-        plt.close()
-        figure_paths["top10_categories_by_orders"] = path
-
-    if "order_purchase_timestamp" in df_orders.columns:
-        df_orders_copy = df_orders.copy()
-        df_orders_copy["order_purchase_timestamp"] = pd.to_datetime(
-            df_orders_copy["order_purchase_timestamp"]
-        )
-        df_orders_copy["year"] = df_orders_copy["order_purchase_timestamp"].dt.year
-        orders_by_year = df_orders_copy["year"].value_counts().sort_index()
-
-        plt.figure(figsize=(8, 5))
-        plt.plot(orders_by_year.index, orders_by_year.values, marker="o")
-        plt.title("Número de pedidos por ano")
-        plt.xlabel("Ano")
-        plt.ylabel("Quantidade de pedidos")
-        plt.xticks(orders_by_year.index.astype(int))
-        plt.tight_layout()
-        path = output_dir / "orders_by_year.png"
-        plt.savefig(path)
-        plt.close()
-        figure_paths["orders_by_year"] = path
-
-    numeric_cols = [
-        c
-        for c in ["product_weight_g", "product_length_cm", "product_height_cm", "product_width_cm"]
-        if c in df_products.columns
-    ]
-    if numeric_cols:
-        plt.figure(figsize=(8, 6))
-        sns.heatmap(df_products[numeric_cols].corr(), annot=True, fmt=".2f", cmap="coolwarm")
-        plt.title("Correlacao entre atributos fisicos dos produtos")
-        plt.tight_layout()
-        path = output_dir / "products_numeric_corr.png"
-        plt.savefig(path)
-        plt.close()
-        figure_paths["products_numeric_corr"] = path
-
-
-    if "order_purchase_timestamp" in df_orders.columns:
-        df_orders_temp = df_orders.copy()
-        df_orders_temp["order_purchase_timestamp"] = pd.to_datetime(
-            df_orders_temp["order_purchase_timestamp"]
-        )
-        df_orders_temp = df_orders_temp[
-            df_orders_temp["order_purchase_timestamp"] < "2018-09-01"
-        ]
-        df_orders_temp["year_month"] = df_orders_temp["order_purchase_timestamp"].dt.to_period("M")
-        orders_by_month = df_orders_temp.groupby("year_month").size()
-
-        plt.figure(figsize=(12, 5))
-        plt.plot(orders_by_month.index.astype(str), orders_by_month.values, marker="o", linewidth=2, color="steelblue")
-        plt.title("Evolucao mensal de pedidos (2016-2018)")
-        plt.xlabel("Mes/Ano")
-        plt.ylabel("Quantidade de pedidos")
-        plt.xticks(rotation=45)
-        plt.grid(True, alpha=0.3)
-        plt.tight_layout()
-        path = output_dir / "orders_by_month.png"
-        plt.savefig(path)
-        plt.close()
-        figure_paths["orders_by_month"] = path
-
-    if "order_status" in df_orders.columns:
-        plt.figure(figsize=(10, 6))
-        status_counts = df_orders["order_status"].value_counts()
-        colors = sns.color_palette("Set2", len(status_counts))
-        bars = plt.barh(status_counts.index, status_counts.values, color=colors)
-        plt.title("Distribuicao de status dos pedidos")
-        plt.xlabel("Quantidade de pedidos")
-        plt.ylabel("Status")
-        for bar, value in zip(bars, status_counts.values):
-            percentage = (value / status_counts.sum()) * 100
-            plt.text(value + 500, bar.get_y() + bar.get_height()/2, 
-                     f"{value:,} ({percentage:.1f}%)", va="center", fontsize=9)
-        plt.tight_layout()
-        path = output_dir / "order_status_distribution.png"
-        plt.savefig(path)
-        plt.close()
-        figure_paths["order_status_distribution"] = path
-
-    if not product_reco_stats.empty:
-        plt.figure(figsize=(10, 6))
-        revenue_by_cat = (
-            product_reco_stats.groupby("product_category_name")["total_revenue"]
-            .sum()
-            .sort_values(ascending=False)
-            .head(10)
-            .iloc[::-1]
-        )
-        colors = sns.color_palette("rocket", len(revenue_by_cat))
-        plt.barh(revenue_by_cat.index, revenue_by_cat.values, color=colors)
-        plt.title("Top 10 categorias por receita total (R$)")
-        plt.xlabel("Receita total (R$)")
-        plt.tight_layout()
-        path = output_dir / "top10_categories_by_revenue.png"
-        plt.savefig(path)
-        plt.close()
-        figure_paths["top10_categories_by_revenue"] = path
-
-    if "price" in df_order_items.columns:
-        plt.figure(figsize=(10, 5))
-        prices = df_order_items["price"]
-        prices_filtered = prices[prices <= prices.quantile(0.95)]  # Remove outliers
-        plt.hist(prices_filtered, bins=50, edgecolor="black", alpha=0.7, color="steelblue")
-        plt.title("Distribuicao de precos dos produtos (ate percentil 95)")
-        plt.xlabel("Preco (R$)")
-        plt.ylabel("Frequencia")
-        plt.axvline(prices_filtered.mean(), color="red", linestyle="--", label=f"Media: R${prices_filtered.mean():.2f}")
-        plt.axvline(prices_filtered.median(), color="green", linestyle="--", label=f"Mediana: R${prices_filtered.median():.2f}")
-        plt.legend()
-        plt.tight_layout()
-        path = output_dir / "price_distribution.png"
-        plt.savefig(path)
-        plt.close()
-        figure_paths["price_distribution"] = path
-
-    print("\nVisualizacoes salvas em:", output_dir)
+    print(
+        f"\n{len(pending)} de {len(figure_paths)} figuras renderizadas "
+        f"({len(figure_paths) - len(pending)} sem alterações nas entradas)"
+    )
+    print("Visualizacoes salvas em:", output_dir)
     for name, path in figure_paths.items():
         print(f"  - {name}: {path}")
 